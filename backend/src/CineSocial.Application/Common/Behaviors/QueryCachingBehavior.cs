@@ -75,7 +75,11 @@ public class QueryCachingBehavior<TRequest, TResponse> : IPipelineBehavior<TRequ
         }
     }
 
-    private static string GenerateCacheKey(TRequest request, ICacheableQuery cacheableQuery)
+    /// <summary>
+    /// Cache key of a query. Public so cache entries can be evicted from outside the pipeline;
+    /// scripts/movie_detail_cache.py reproduces it for GetMovieDetailQuery.
+    /// </summary>
+    public static string GenerateCacheKey(TRequest request, ICacheableQuery cacheableQuery)
     {
         // Use SearchCacheKeyGenerator for search queries
         var queryType = request.GetType();
@@ -0,0 +1,87 @@
+using CineSocial.Application.Common.Behaviors;
+using CineSocial.Application.Common.Results;
+using CineSocial.Application.Features.Movies.Queries.GetMovieDetail;
+using Microsoft.Extensions.Hosting;
+using Microsoft.Extensions.Logging;
+using StackExchange.Redis;
+using ZiggyCreatures.Caching.Fusion;
+
+namespace CineSocial.Infrastructure.Caching;
+
+/// <summary>
+/// Evicts cached movie details when the ingestion scripts publish the ids of movies they changed.
+/// The scripts delete the Redis (L2) entries themselves; this drops the in-memory (L1) copy of this instance.
+/// </summary>
+public class MovieCacheInvalidationSubscriber : BackgroundService
+{
+    /// <summary>
+    /// Channel carrying comma-separated movie ids (see scripts/movie_detail_cache.py)
+    /// </summary>
+    public const string Channel = "cinesocial:movies:changed";
+
+    private readonly IConnectionMultiplexer _redis;
+    private readonly IFusionCache _fusionCache;
+    private readonly ILogger<MovieCacheInvalidationSubscriber> _logger;
+
+    public MovieCacheInvalidationSubscriber(
+        IConnectionMultiplexer redis,
+        IFusionCache fusionCache,
+        ILogger<MovieCacheInvalidationSubscriber> logger)
+    {
+        _redis = redis;
+        _fusionCache = fusionCache;
+        _logger = logger;
+    }
+
+    protected override async Task ExecuteAsync(CancellationToken stoppingToken)
+    {
+        ChannelMessageQueue queue;
+        try
+        {
+            queue = await _redis.GetSubscriber().SubscribeAsync(RedisChannel.Literal(Channel));
+        }
+        catch (Exception ex)
+        {
+            // Without the subscription, cached details simply live until they expire
+            _logger.LogError(ex, "Could not subscribe to {Channel}; movie detail cache invalidation is disabled", Channel);
+            return;
+        }
+
+        queue.OnMessage(async message => await EvictAsync(message.Message.ToString(), stoppingToken));
+
+        try
+        {
+            await Task.Delay(Timeout.Infinite, stoppingToken);
+        }
+        catch (OperationCanceledException)
+        {
+        }
+
+        await queue.UnsubscribeAsync();
+    }
+
+    private async Task EvictAsync(string movieIds, CancellationToken cancellationToken)
+    {
+        var evicted = 0;
+        foreach (var value in movieIds.Split(',', StringSplitOptions.RemoveEmptyEntries))
+        {
+            if (!Guid.TryParse(value, out var movieId))
+                continue;
+
+            var query = new GetMovieDetailQuery(movieId);
+            var cacheKey = QueryCachingBehavior<GetMovieDetailQuery, Result<MovieDetailDto>>.GenerateCacheKey(query, query);
+
+            try
+            {
+                await _fusionCache.RemoveAsync(cacheKey, token: cancellationToken);
+                evicted++;
+            }
+            catch (Exception ex)
+            {
+                _logger.LogError(ex, "Error evicting cached details of movie {MovieId}", movieId);
+            }
+        }
+
+        _logger.LogDebug("Evicted cached details of {Count} changed movies", evicted);
+    }
+}
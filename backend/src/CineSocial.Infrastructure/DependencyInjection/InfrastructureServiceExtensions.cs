@@ -138,6 +138,9 @@ public static class InfrastructureServiceExtensions
 
         // Register custom cache service
         services.AddScoped<ICacheService, CacheService>();
+
+        // Evict movie details changed by the ingestion scripts
+        services.AddHostedService<MovieCacheInvalidationSubscriber>();
     }
 
     private static string BuildConnectionString(IConfiguration configuration)
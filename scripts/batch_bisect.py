@@ -0,0 +1,34 @@
+from typing import Callable, List, Optional, Sequence
+
+
+def write_with_bisect(conn, items: Sequence, write_fn: Callable[[Sequence], object],
+                      on_failure: Callable[[object, Exception], None],
+                      on_commit: Optional[Callable[[Sequence, object], None]] = None) -> List:
+    """
+    Writes items in one transaction with write_fn(items). If that fails, the transaction is rolled back
+    and the batch is split in half recursively, so k bad items in a batch of n cost O(k log n) round
+    trips instead of n single-row transactions. Each item that still fails on its own is reported
+    through on_failure(item, error); on_commit(items, result) runs after every successful commit.
+    A dropped connection is re-raised, since retrying on it cannot succeed.
+    Returns the items that were committed, in their original order.
+    """
+    if not items:
+        return []
+
+    try:
+        result = write_fn(items)
+        conn.commit()
+    except Exception as e:
+        if conn.closed:
+            raise
+        conn.rollback()
+        if len(items) == 1:
+            on_failure(items[0], e)
+            return []
+        mid = len(items) // 2
+        return (write_with_bisect(conn, items[:mid], write_fn, on_failure, on_commit) +
+                write_with_bisect(conn, items[mid:], write_fn, on_failure, on_commit))
+
+    if on_commit:
+        on_commit(items, result)
+    return list(items)
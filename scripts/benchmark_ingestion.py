@@ -0,0 +1,512 @@
+"""
+Offline end-to-end benchmark for the ingestion scripts.
+
+Starts a local fake TMDB server that serves recorded movie-details payloads (from the on-disk
+response cache, or synthetic ones if the cache is empty) with configurable latency, jitter and
+429 injection, then runs process_csv_and_insert() and fetch_other_values.main() in fresh
+subprocesses against throwaway databases cloned from a local Postgres template database.
+Reports movies/sec, DB rows/sec, p50/p99 request latency and peak RSS for every configuration.
+
+The template database (--template, default DATABASE_NAME from .env) must have the CineSocial
+schema and no open connections while the benchmark clones it. It is never modified.
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import queue
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+import fetch_other_values as fetch_script
+from tmdb_response_cache import TmdbResponseCache
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+logger.addHandler(stream_handler)
+
+# Tables emptied in the seed database; everything the two scripts write hangs off them
+SEED_TRUNCATE_TABLES = ("Movies", "Genres", "Keywords", "ProductionCompanies", "People", "Collections", "Countries", "Languages")
+
+DATASET_CSV_PATH = fetch_script.PROJECT_ROOT / "data" / "TMDB_movie_dataset_v11.csv"
+
+# How often a benchmark run's subprocess is checked for having died without a result
+RESULT_POLL_SECONDS = 5.0
+
+# Tables counted for DB rows/sec
+COUNTED_TABLES = ("Movies", "Genres", "Keywords", "ProductionCompanies", "People", "Collections", "Countries", "Languages",
+                  "MovieGenres", "MovieProductionCompanies", "MovieCast", "MovieCrew", "MovieKeywords",
+                  "MovieCountries", "MovieLanguages", "MovieCollections", "MovieVideos", "MovieImages")
+
+
+# --- Fake TMDB server ---
+
+def synthetic_payload(n: int) -> dict:
+    """A movie-details response shaped like TMDB's, for when no recorded payloads are available."""
+    return {
+        'id': n,
+        'title': f"Benchmark Movie {n}",
+        'genres': [{'id': 10000 + (n + i) % 19, 'name': f"Genre {(n + i) % 19}"} for i in range(3)],
+        'production_companies': [{'id': 20000 + (n * 7 + i) % 5000, 'name': f"Company {(n * 7 + i) % 5000}", 'logo_path': None, 'origin_country': 'US'} for i in range(2)],
+        'production_countries': [{'iso_3166_1': 'US', 'name': 'United States of America'}],
+        'spoken_languages': [{'iso_639_1': 'en', 'name': 'English', 'english_name': 'English'}],
+        'belongs_to_collection': {'id': 30000 + n % 500, 'name': f"Collection {n % 500}", 'poster_path': None, 'backdrop_path': None} if n % 4 == 0 else None,
+        'keywords': {'keywords': [{'id': 40000 + (n * 13 + i) % 20000, 'name': f"keyword {(n * 13 + i) % 20000}"} for i in range(10)]},
+        'credits': {
+            'cast': [{'id': 50000 + (n * 31 + i) % 200000, 'name': f"Actor {(n * 31 + i) % 200000}", 'character': f"Role {i}", 'order': i,
+                      'profile_path': None, 'popularity': 1.0, 'gender': i % 3, 'known_for_department': 'Acting'} for i in range(30)],
+            'crew': [{'id': 300000 + (n * 17 + i) % 50000, 'name': f"Crew {(n * 17 + i) % 50000}", 'job': job, 'department': 'Production',
+                      'profile_path': None, 'popularity': 1.0, 'gender': 0, 'known_for_department': 'Production'}
+                     for i, job in enumerate(['Director', 'Producer', 'Writer', 'Screenplay', 'Editor'])],
+        },
+        'videos': {'results': [{'key': f"vid{n}x{i}", 'name': f"Trailer {i}", 'site': 'YouTube', 'type': 'Trailer', 'official': True} for i in range(3)]},
+        'images': {
+            'posters': [{'file_path': f"/p{n}_{i}.jpg", 'iso_639_1': 'en', 'vote_average': 5.0, 'vote_count': 3, 'width': 500, 'height': 750} for i in range(15)],
+            'backdrops': [{'file_path': f"/b{n}_{i}.jpg", 'iso_639_1': None, 'vote_average': 5.0, 'vote_count': 3, 'width': 1280, 'height': 720} for i in range(15)],
+            'logos': [],
+        },
+    }
+
+def load_recorded_payloads(cache_dir: Path, limit: int) -> List[dict]:
+    """Loads up to `limit` recorded movie-details payloads from the response cache."""
+    if not (cache_dir / 'index.sqlite3').exists():
+        return []
+    cache = TmdbResponseCache(cache_dir, max_bytes=1 << 62)
+    payloads = []
+    try:
+        for tmdb_id in cache.iter_tmdb_ids(fetch_script.MOVIE_DETAILS_ENDPOINT):
+            raw = cache.get(fetch_script.MOVIE_DETAILS_ENDPOINT, tmdb_id)
+            if raw is not None:
+                payloads.append(json.loads(raw))
+            if len(payloads) >= limit:
+                break
+    finally:
+        cache.close()
+    return payloads
+
+class FakeTmdbServer:
+    """
+    Threaded HTTP server answering /3/movie/<id> with a recorded payload (chosen by id, with the
+    id rewritten) after latency_ms +/- jitter_ms, and a 429 with Retry-After for throttle_rate of requests.
+    """
+
+    def __init__(self, payloads: List[dict], latency_ms: float = 0.0, jitter_ms: float = 0.0, throttle_rate: float = 0.0):
+        self.payloads = payloads
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.requests_served = 0
+        self.requests_throttled = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-tmdb", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/3"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, path: str):
+        """Returns (status, headers, body) for a request path."""
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if random.random() < self.throttle_rate:
+            with self._lock:
+                self.requests_throttled += 1
+            return 429, {'Retry-After': '1'}, b'{"status_code": 25, "status_message": "Your request count is over the allowed limit."}'
+
+        with self._lock:
+            self.requests_served += 1
+        parts = path.split('?', 1)[0].strip('/').split('/')
+        if parts[-1] == 'changes':
+            return 200, {}, b'{"results": [], "page": 1, "total_pages": 1}'
+        try:
+            tmdb_id = int(parts[-1])
+        except ValueError:
+            return 404, {}, b'{"status_code": 34}'
+        payload = dict(self.payloads[tmdb_id % len(self.payloads)], id=tmdb_id)
+        return 200, {}, json.dumps(payload).encode('utf-8')
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so the client's connection pooling is exercised like against the real API
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers, body = server._respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# --- Throwaway databases ---
+
+def admin_connection(db_config: dict):
+    conn = psycopg2.connect(**dict(db_config, database='postgres'))
+    conn.autocommit = True
+    return conn
+
+def create_database(db_config: dict, name: str, template: str):
+    conn = admin_connection(db_config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL('CREATE DATABASE {} TEMPLATE {}').format(sql.Identifier(name), sql.Identifier(template)))
+    finally:
+        conn.close()
+
+def drop_database(db_config: dict, name: str):
+    conn = admin_connection(db_config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL('DROP DATABASE IF EXISTS {}').format(sql.Identifier(name)))
+    finally:
+        conn.close()
+
+def count_rows(db_config: dict) -> Dict[str, int]:
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cursor:
+            counts = {}
+            for table in COUNTED_TABLES:
+                cursor.execute(sql.SQL('SELECT COUNT(*) FROM {}').format(sql.Identifier(table)))
+                counts[table] = cursor.fetchone()[0]
+            return counts
+    finally:
+        conn.close()
+
+def truncate_seed(db_config: dict):
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL('TRUNCATE {} RESTART IDENTITY CASCADE').format(
+                sql.SQL(', ').join(sql.Identifier(t) for t in SEED_TRUNCATE_TABLES)))
+        conn.commit()
+    finally:
+        conn.close()
+
+def write_csv_sample(source: Path, target: Path, rows: int) -> int:
+    """
+    Copies the header and the first `rows` records of the dataset CSV.
+    Returns the number of distinct TMDB IDs among them, i.e. the movies a complete load inserts.
+    """
+    written = 0
+    tmdb_ids = set()
+    with open(source, encoding='utf-8-sig', newline='') as src, open(target, 'w', encoding='utf-8', newline='') as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader)
+        id_column = header.index('id')
+        writer.writerow(header)
+        for record in reader:
+            if written >= rows:
+                break
+            writer.writerow(record)
+            written += 1
+            try:
+                tmdb_id = int(float(record[id_column]))
+            except (ValueError, IndexError):
+                tmdb_id = 0
+            if tmdb_id:
+                tmdb_ids.add(tmdb_id)
+    return len(tmdb_ids)
+
+
+# --- Benchmark runs (each in a fresh process) ---
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _run_csv_load(db_config: dict, csv_path: Path, work_dir: Path, batch_size: int, mode: str, verbose: bool, results):
+    import insert_data_to_db as csv_script
+    if not verbose:
+        csv_script.logger.setLevel(logging.WARNING)
+    csv_script.DB_CONFIG = db_config
+    csv_script.CSV_FILE_PATH = csv_path
+    csv_script.BULK_LOAD_SNAPSHOT_PATH = work_dir / 'bulk_load_snapshot_movies.json'
+    csv_script.LOAD_PROGRESS_PATH = work_dir / 'csv_load_progress.sqlite3'
+
+    started_at = time.perf_counter()
+    if not csv_script.process_csv_and_insert(batch_size, mode):
+        # Exits the subprocess without a result, which run_in_subprocess reports
+        raise RuntimeError(f"CSV load failed (batch size {batch_size}, mode {mode}); see the loader's log")
+    results.put({'elapsed': time.perf_counter() - started_at, 'latencies': [], 'peak_rss_mb': _peak_rss_mb()})
+
+def _run_fetch(db_config: dict, base_url: str, work_dir: Path, batch_size: int, workers: int, writers: int,
+               rate_limit: float, verbose: bool, results):
+    if not verbose:
+        fetch_script.logger.setLevel(logging.WARNING)
+    fetch_script.DB_CONFIG = db_config
+    fetch_script.TMDB_BASE_URL = base_url
+    fetch_script.CHECKPOINT_PATH = work_dir / f'checkpoint_{batch_size}_{workers}.sqlite3'
+    fetch_script.RUN_LOG_PATH = work_dir / 'no_legacy_run_log.json'
+    fetch_script.BULK_LOAD_SNAPSHOT_PATH = work_dir / 'bulk_load_snapshot_other_values.json'
+
+    # Client-observed latency of every TMDB response, 429s included
+    latencies = []
+    create_http_session = fetch_script.create_http_session
+
+    def create_timed_http_session(pool_size: int):
+        session = create_http_session(pool_size)
+        session.hooks['response'].append(lambda response, *args, **kwargs: latencies.append(response.elapsed.total_seconds()))
+        return session
+
+    fetch_script.create_http_session = create_timed_http_session
+
+    started_at = time.perf_counter()
+    fetch_script.main(batch_size, workers, rate_limit=rate_limit, writers=writers, use_cache=False)
+    elapsed = time.perf_counter() - started_at
+
+    store = fetch_script.CheckpointStore(fetch_script.CHECKPOINT_PATH)
+    saved = len(store)
+    store.close()
+    results.put({'elapsed': elapsed, 'latencies': latencies, 'peak_rss_mb': _peak_rss_mb(), 'movies': saved})
+
+def run_in_subprocess(target, *args) -> dict:
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=target, args=args + (results,))
+    process.start()
+    # Read before join(), so a large latency list cannot block the child on a full pipe. A child that
+    # dies before putting its result (exception, import error, OOM kill) must not hang the benchmark.
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            if process.is_alive():
+                continue
+            try:
+                # The result may have been put just before the child exited
+                result = results.get(timeout=1)
+            except queue.Empty:
+                process.join()
+                raise RuntimeError(f"Benchmark subprocess exited with code {process.exitcode} without a result")
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Benchmark subprocess exited with code {process.exitcode}")
+    return result
+
+def check_movie_count(run: str, loaded: int, sampled: int):
+    """A load that lost movies (rows logged as failed, or a partial run) must not be reported as a result."""
+    if loaded != sampled:
+        raise RuntimeError(f"{run} loaded {loaded} movies, but the sample holds {sampled}")
+
+def summarize(scenario: str, batch_size: int, workers: Optional[int], movies: int, rows: int, result: dict, throttled: int = 0) -> dict:
+    elapsed = result['elapsed']
+    p50 = percentile(result['latencies'], 50)
+    p99 = percentile(result['latencies'], 99)
+    return {
+        'scenario': scenario,
+        'batch_size': batch_size,
+        'workers': workers,
+        'movies': movies,
+        'rows': rows,
+        'elapsed_s': round(elapsed, 2),
+        'movies_per_s': round(movies / elapsed, 1) if elapsed else None,
+        'rows_per_s': round(rows / elapsed, 1) if elapsed else None,
+        'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+        'p99_ms': round(p99 * 1000, 1) if p99 is not None else None,
+        'throttled': throttled,
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+    }
+
+def print_report(rows: List[dict]):
+    columns = ('scenario', 'batch_size', 'workers', 'movies', 'elapsed_s', 'movies_per_s', 'rows_per_s', 'p50_ms', 'p99_ms', 'throttled', 'peak_rss_mb')
+    widths = {c: max(len(c), *(len(str(r[c] if r[c] is not None else '-')) for r in rows)) for c in columns}
+    logger.info("  ".join(c.rjust(widths[c]) for c in columns))
+    for r in rows:
+        logger.info("  ".join(str(r[c] if r[c] is not None else '-').rjust(widths[c]) for c in columns))
+
+
+def main(template: str, movies: int, batch_sizes: List[int], workers_list: List[int], csv_mode: str, writers: int,
+         rate_limit: float, latency_ms: float, jitter_ms: float, throttle_rate: float, cache_dir: Path,
+         skip_csv: bool, skip_fetch: bool, json_out: Optional[Path], verbose: bool):
+    base_config = fetch_script.get_db_config('local')
+    template = template or base_config['database']
+    run_id = f"bench_{int(time.time())}"
+    seed_db = f"{run_id}_seed"
+    report = []
+
+    with tempfile.TemporaryDirectory(prefix='cinesocial_bench_') as tmp:
+        work_dir = Path(tmp)
+        csv_path = work_dir / 'movies_sample.csv'
+        sampled = write_csv_sample(DATASET_CSV_PATH, csv_path, movies)
+        logger.info(f"[BENCH] Sampled {sampled} distinct movies from the dataset CSV.")
+
+        create_database(base_config, seed_db, template)
+        truncate_seed(dict(base_config, database=seed_db))
+        logger.info(f"[BENCH] Created empty seed database {seed_db} from template {template}.")
+
+        try:
+            if not skip_csv:
+                for batch_size in batch_sizes:
+                    db_name = f"{run_id}_csv_{batch_size}"
+                    db_config = dict(base_config, database=db_name)
+                    create_database(base_config, db_name, seed_db)
+                    try:
+                        result = run_in_subprocess(_run_csv_load, db_config, csv_path, work_dir, batch_size, csv_mode, verbose)
+                        counts = count_rows(db_config)
+                    finally:
+                        drop_database(base_config, db_name)
+                    check_movie_count(f"csv-{csv_mode} batch={batch_size}", counts['Movies'], sampled)
+                    report.append(summarize(f"csv-{csv_mode}", batch_size, None, counts['Movies'], sum(counts.values()), result))
+                    logger.info(f"[BENCH] csv-{csv_mode} batch={batch_size}: {report[-1]['movies_per_s']} movies/s")
+
+            if not skip_fetch:
+                # The fetch runs need the sampled movies in place; load them once into the seed
+                run_in_subprocess(_run_csv_load, dict(base_config, database=seed_db), csv_path, work_dir, 1000, 'copy', verbose)
+                seed_counts = count_rows(dict(base_config, database=seed_db))
+                check_movie_count("seed load", seed_counts['Movies'], sampled)
+                seeded_rows = sum(seed_counts.values())
+
+                payloads = load_recorded_payloads(cache_dir, 500) or [synthetic_payload(n) for n in range(500)]
+                logger.info(f"[BENCH] Fake TMDB serves {len(payloads)} payloads with {latency_ms}+/-{jitter_ms} ms latency and {throttle_rate:.1%} 429s.")
+
+                for batch_size in batch_sizes:
+                    for workers in workers_list:
+                        server = FakeTmdbServer(payloads, latency_ms, jitter_ms, throttle_rate)
+                        server.start()
+                        db_name = f"{run_id}_fetch_{batch_size}_{workers}"
+                        db_config = dict(base_config, database=db_name)
+                        create_database(base_config, db_name, seed_db)
+                        try:
+                            result = run_in_subprocess(_run_fetch, db_config, server.base_url, work_dir, batch_size, workers,
+                                                       writers, rate_limit, verbose)
+                            counts = count_rows(db_config)
+                        finally:
+                            server.stop()
+                            drop_database(base_config, db_name)
+                        report.append(summarize("fetch", batch_size, workers, result['movies'], sum(counts.values()) - seeded_rows,
+                                                result, server.requests_throttled))
+                        logger.info(f"[BENCH] fetch batch={batch_size} workers={workers}: {report[-1]['movies_per_s']} movies/s")
+        finally:
+            drop_database(base_config, seed_db)
+
+    logger.info("===================================")
+    print_report(report)
+    logger.info("===================================")
+    if json_out:
+        with open(json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"[BENCH] Wrote results to {json_out}.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark both ingestion scripts offline against a fake TMDB server and throwaway local databases.")
+    parser.add_argument(
+        '--template',
+        type=str,
+        default=None,
+        help='Local database cloned for every run; it must have the schema and no open connections. Default is DATABASE_NAME from .env.'
+    )
+    parser.add_argument(
+        '--movies',
+        type=int,
+        default=2000,
+        help='Number of movies sampled from the dataset CSV. Default is 2000.'
+    )
+    parser.add_argument(
+        '--batch-sizes',
+        type=lambda value: [int(v) for v in value.split(',')],
+        default=[25, 50, 100],
+        help='Comma-separated batch sizes to benchmark. Default is 25,50,100.'
+    )
+    parser.add_argument(
+        '--workers',
+        type=lambda value: [int(v) for v in value.split(',')],
+        default=[10, 20],
+        help='Comma-separated fetch worker counts to benchmark. Default is 10,20.'
+    )
+    parser.add_argument(
+        '--csv-mode',
+        type=str,
+        choices=['batch', 'copy'],
+        default='batch',
+        help='Load strategy of the CSV runs. Default is batch.'
+    )
+    parser.add_argument(
+        '--writers',
+        type=int,
+        default=1,
+        help='DB writer threads of the fetch runs. Default is 1.'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        default=1000.0,
+        help='Client request ceiling of the fetch runs, in requests per second. Default is 1000.'
+    )
+    parser.add_argument(
+        '--latency-ms',
+        type=float,
+        default=50.0,
+        help='Latency the fake TMDB server adds to every response. Default is 50.'
+    )
+    parser.add_argument(
+        '--jitter-ms',
+        type=float,
+        default=20.0,
+        help='Uniform jitter applied to the latency. Default is 20.'
+    )
+    parser.add_argument(
+        '--throttle-rate',
+        type=float,
+        default=0.0,
+        help='Fraction of requests answered with 429 and Retry-After: 1. Default is 0.'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=Path,
+        default=fetch_script.RESPONSE_CACHE_DIR,
+        help=f'Response cache the recorded payloads are read from; synthetic payloads are used if it is empty. Default is {fetch_script.RESPONSE_CACHE_DIR}.'
+    )
+    parser.add_argument('--skip-csv', action='store_true', help='Do not benchmark the CSV loader.')
+    parser.add_argument('--skip-fetch', action='store_true', help='Do not benchmark the fetch script.')
+    parser.add_argument('--json-out', type=Path, default=None, help='Also write the results to this JSON file.')
+    parser.add_argument('--verbose', action='store_true', help="Keep the scripts' own INFO logging.")
+    args = parser.parse_args()
+
+    main(args.template, args.movies, args.batch_sizes, args.workers, args.csv_mode, args.writers,
+         args.rate_limit, args.latency_ms, args.jitter_ms, args.throttle_rate, args.cache_dir,
+         args.skip_csv, args.skip_fetch, args.json_out, args.verbose)
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Sequence
+
+import psycopg2
+from psycopg2 import sql
+
+# Secondary indexes that are neither unique nor backing a constraint: safe to drop and rebuild.
+# Unique indexes stay in place because the loaders rely on them for ON CONFLICT.
+INDEXES_QUERY = '''
+    SELECT i.relname, t.relname, pg_get_indexdef(ix.indexrelid)
+    FROM pg_index ix
+    JOIN pg_class i ON i.oid = ix.indexrelid
+    JOIN pg_class t ON t.oid = ix.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = current_schema()
+      AND t.relname = ANY(%s)
+      AND NOT ix.indisunique
+      AND NOT ix.indisprimary
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)
+    ORDER BY t.relname, i.relname
+'''
+
+FOREIGN_KEYS_QUERY = '''
+    SELECT c.conname, t.relname, pg_get_constraintdef(c.oid)
+    FROM pg_constraint c
+    JOIN pg_class t ON t.oid = c.conrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    WHERE n.nspname = current_schema()
+      AND c.contype = 'f'
+      AND t.relname = ANY(%s)
+    ORDER BY t.relname, c.conname
+'''
+
+
+class BulkLoadSchema:
+    """
+    Deferred index and foreign key maintenance for first-time loads into empty tables.
+    begin() records the definitions of the non-unique secondary indexes and foreign keys of the given
+    tables in a local JSON snapshot, then drops them. finish() rebuilds the indexes on parallel
+    connections, re-adds the foreign keys as NOT VALID, validates them in parallel and deletes the
+    snapshot. If a load dies before finish(), the snapshot is still on disk and restore_pending()
+    puts the exact schema back on the next start.
+    """
+
+    def __init__(self, db_config: dict, tables: Sequence[str], snapshot_path: Path, workers: int = 4,
+                 maintenance_work_mem: str = '512MB'):
+        self.db_config = db_config
+        self.tables = list(tables)
+        self.snapshot_path = Path(snapshot_path)
+        self.workers = max(1, workers)
+        self.maintenance_work_mem = maintenance_work_mem
+
+    def has_pending_snapshot(self) -> bool:
+        return self.snapshot_path.exists()
+
+    def non_empty_tables(self, conn) -> List[str]:
+        """Returns the tables that already contain rows."""
+        non_empty = []
+        with conn.cursor() as cursor:
+            for table in self.tables:
+                cursor.execute(sql.SQL('SELECT EXISTS (SELECT 1 FROM {})').format(sql.Identifier(table)))
+                if cursor.fetchone()[0]:
+                    non_empty.append(table)
+        conn.rollback()
+        return non_empty
+
+    def begin(self, conn, skip_non_empty: bool = False) -> dict:
+        """
+        Snapshots and drops the secondary indexes and foreign keys. Returns the snapshot.
+        Tables that already contain rows are an error, or with skip_non_empty are left untouched
+        (listed under 'skipped' in the snapshot), e.g. link tables another loader filled first.
+        """
+        if self.has_pending_snapshot():
+            raise RuntimeError(f"A bulk-load snapshot already exists at {self.snapshot_path}; restore it first")
+        non_empty = self.non_empty_tables(conn)
+        if non_empty and not skip_non_empty:
+            raise RuntimeError(f"Bulk initial load requires empty tables, but these contain rows: {', '.join(non_empty)}")
+        tables = [table for table in self.tables if table not in non_empty]
+
+        with conn.cursor() as cursor:
+            cursor.execute(INDEXES_QUERY, (tables,))
+            indexes = [{'name': name, 'table': table, 'definition': definition} for name, table, definition in cursor.fetchall()]
+            cursor.execute(FOREIGN_KEYS_QUERY, (tables,))
+            foreign_keys = [{'name': name, 'table': table, 'definition': definition} for name, table, definition in cursor.fetchall()]
+        snapshot = {'tables': tables, 'skipped': non_empty, 'indexes': indexes, 'foreign_keys': foreign_keys}
+
+        # The snapshot must be durable before anything is dropped
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        try:
+            with conn.cursor() as cursor:
+                for fk in foreign_keys:
+                    cursor.execute(sql.SQL('ALTER TABLE {} DROP CONSTRAINT {}').format(
+                        sql.Identifier(fk['table']), sql.Identifier(fk['name'])))
+                for index in indexes:
+                    cursor.execute(sql.SQL('DROP INDEX {}').format(sql.Identifier(index['name'])))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            self.snapshot_path.unlink()
+            raise
+        return snapshot
+
+    def restore_pending(self) -> dict:
+        """Restores the schema from a leftover snapshot (interrupted load). Returns it, or {} if there was none."""
+        if not self.has_pending_snapshot():
+            return {}
+        return self.finish()
+
+    def finish(self) -> dict:
+        """Rebuilds the dropped indexes and foreign keys from the snapshot, then deletes it. Returns the snapshot."""
+        with open(self.snapshot_path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+
+        # Every step is idempotent, so a restore that is itself interrupted can simply be run again
+        statements = [index['definition'].replace('CREATE INDEX ', 'CREATE INDEX IF NOT EXISTS ', 1)
+                      for index in snapshot['indexes']]
+        self._run_parallel(statements)
+
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            with conn.cursor() as cursor:
+                for fk in snapshot['foreign_keys']:
+                    cursor.execute('SELECT 1 FROM pg_constraint WHERE conname = %s AND conrelid = to_regclass(%s)',
+                                   (fk['name'], sql.Identifier(fk['table']).as_string(conn)))
+                    if cursor.fetchone() is None:
+                        cursor.execute(sql.SQL('ALTER TABLE {} ADD CONSTRAINT {} {} NOT VALID').format(
+                            sql.Identifier(fk['table']), sql.Identifier(fk['name']), sql.SQL(fk['definition'])))
+            conn.commit()
+        finally:
+            conn.close()
+
+        statements = []
+        for fk in snapshot['foreign_keys']:
+            statements.append(sql.SQL('ALTER TABLE {} VALIDATE CONSTRAINT {}').format(
+                sql.Identifier(fk['table']), sql.Identifier(fk['name'])))
+        for table in snapshot['tables']:
+            statements.append(sql.SQL('ANALYZE {}').format(sql.Identifier(table)))
+        self._run_parallel(statements)
+
+        self.snapshot_path.unlink()
+        return snapshot
+
+    def _run_parallel(self, statements: list):
+        """Runs independent DDL statements on up to `workers` autocommit connections."""
+        if not statements:
+            return
+
+        def run(statement):
+            conn = psycopg2.connect(**self.db_config)
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute('SET maintenance_work_mem = %s', (self.maintenance_work_mem,))
+                    cursor.execute(statement)
+            finally:
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(statements))) as executor:
+            # list() surfaces the first failure
+            list(executor.map(run, statements))
+
+
+def restore_bulk_load_schema(bulk_schema: BulkLoadSchema, logger: logging.Logger, interrupted: bool = False) -> bool:
+    """
+    Rebuilds the indexes and foreign keys dropped by a bulk load, reporting through the loader's logger.
+    A failure leaves the snapshot for the next run and returns False.
+    """
+    if interrupted:
+        logger.warning(f"[BULK] Found the schema snapshot of an interrupted bulk load ({bulk_schema.snapshot_path}). Restoring it first...")
+    started_at = time.perf_counter()
+    try:
+        snapshot = bulk_schema.finish()
+    except Exception as e:
+        logger.error(f"[BULK] Could not restore indexes and constraints: {e}. They will be restored on the next run.")
+        return False
+    logger.info(f"[BULK] Rebuilt {len(snapshot['indexes'])} indexes and validated {len(snapshot['foreign_keys'])} foreign keys in {time.perf_counter() - started_at:.1f}s.")
+    return True
@@ -0,0 +1,19 @@
+from datetime import date, timedelta
+from typing import Iterator, List, Tuple
+
+# TMDB's /movie/changes endpoint accepts at most 14 days per query
+CHANGES_WINDOW_DAYS = 14
+
+
+def change_windows(since: date, until: date) -> Iterator[Tuple[date, date]]:
+    """Splits [since, until] (both inclusive) into consecutive (start_date, end_date) windows of at most CHANGES_WINDOW_DAYS days."""
+    window_start = since
+    while window_start <= until:
+        window_end = min(until, window_start + timedelta(days=CHANGES_WINDOW_DAYS - 1))
+        yield window_start, window_end
+        window_start = window_end + timedelta(days=1)
+
+
+def changed_movie_ids(page: dict) -> List[int]:
+    """Movie IDs of one /movie/changes response page; adult titles are never in the catalog."""
+    return [item['id'] for item in page.get('results', []) if not item.get('adult')]
@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import threading
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from tmdb_id_set import TmdbIdSet
+
+
+class ProgressStore:
+    """
+    Key/value progress (offsets, sync dates) of a loader backed by a local SQLite file.
+    Each set_meta is its own transaction, and SQLite's journal keeps the file intact if the process dies mid-write.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._set_meta(key, value)
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute('INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value', (key, value))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CheckpointStore(ProgressStore):
+    """
+    Append-only checkpoint of processed TMDB IDs backed by a local SQLite file.
+    Each commit only appends the IDs of one batch, membership checks are primary-key lookups,
+    and SQLite's journal keeps the file intact if the process dies mid-write.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__(path)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS completed_ids (tmdb_id INTEGER PRIMARY KEY) WITHOUT ROWID')
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM completed_ids').fetchone()[0]
+
+    def __contains__(self, tmdb_id: int) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM completed_ids WHERE tmdb_id = ?', (tmdb_id,)).fetchone() is not None
+
+    def add_many(self, tmdb_ids: Iterable[int]):
+        """Appends a batch of IDs in a single transaction."""
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR IGNORE INTO completed_ids (tmdb_id) VALUES (?)', ((i,) for i in tmdb_ids))
+                self._set_meta('last_update', datetime.now(timezone.utc).isoformat())
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def iter_id_pages(self, page_size: int = 50000) -> Iterator[array]:
+        """
+        Yields every checkpointed ID in ascending order, page_size at a time as array('q') pages.
+        Each page is a separate primary-key range query, so the lock is never held while the caller works.
+        """
+        last_id = None
+        while True:
+            with self._lock:
+                if last_id is None:
+                    cursor = self._conn.execute('SELECT tmdb_id FROM completed_ids ORDER BY tmdb_id LIMIT ?', (page_size,))
+                else:
+                    cursor = self._conn.execute('SELECT tmdb_id FROM completed_ids WHERE tmdb_id > ? ORDER BY tmdb_id LIMIT ?',
+                                                (last_id, page_size))
+                page = array('q', (tmdb_id for (tmdb_id,) in cursor))
+            if not page:
+                return
+            yield page
+            last_id = page[-1]
+
+    def iter_ids(self) -> Iterator[int]:
+        """Yields every checkpointed ID in ascending order."""
+        for page in self.iter_id_pages():
+            yield from page
+
+    def load_ids(self) -> TmdbIdSet:
+        """Loads every checkpointed ID into a compact in-memory set for bulk filtering."""
+        ids = array('q')
+        for page in self.iter_id_pages():
+            ids.extend(page)
+        return TmdbIdSet.from_sorted(ids)
+
+    def import_json_run_log(self, json_path: Path) -> int:
+        """
+        One-time import of a legacy JSON run log ({"completed_tmdb_ids": [...]}).
+        Returns the number of imported IDs, or 0 if the file is missing or was already imported.
+        """
+        json_path = Path(json_path)
+        if self.get_meta('json_imported_from') or not json_path.exists():
+            return 0
+
+        with open(json_path, 'r', encoding='utf-8') as f:
+            tmdb_ids = json.load(f).get('completed_tmdb_ids', [])
+        self.add_many(tmdb_ids)
+        self.set_meta('json_imported_from', str(json_path))
+        return len(tmdb_ids)
@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+import mmap
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; only needed for .zst input
+    zstandard = None
+
+# Inputs decompressed on the fly; they cannot be split into byte ranges for parallel parsing
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+# Read size when skipping through a compressed stream to a resume offset
+SKIP_CHUNK_BYTES = 1 << 20
+
+
+class CsvInput:
+    """
+    The CSV dataset as a stream of rows that knows the byte offset it has consumed, so a load can
+    record the offset of its last committed row and a restart can continue from there.
+    Plain files are memory-mapped (seeking is instant); .gz and .zst files are decompressed on the
+    fly without a temporary copy, and offsets count uncompressed bytes, so resuming one decompresses
+    and discards the part already loaded but never parses it. zstandard is only needed for .zst.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.compressed = self.path.suffix in COMPRESSED_SUFFIXES
+        self._file = open(self.path, 'rb')
+        if self.path.suffix == '.gz':
+            self._stream = gzip.GzipFile(fileobj=self._file, mode='rb')
+        elif self.path.suffix == '.zst':
+            if zstandard is None:
+                self._file.close()
+                raise RuntimeError("zstandard is not installed (pip install zstandard)")
+            self._stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(self._file))
+        else:
+            self._stream = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = self._stream.readline()
+        self.fieldnames: List[str] = next(csv.reader([header.decode('utf-8-sig')]))
+        # Offset of the first data row; resume offsets are never smaller
+        self.data_start = len(header)
+        self.offset = self.data_start
+
+    def seek(self, offset: int):
+        """Moves to a row boundary previously read from `offset`."""
+        if offset <= self.offset:
+            return
+        if isinstance(self._stream, mmap.mmap):
+            self._stream.seek(offset)
+            self.offset = offset
+            return
+        while self.offset < offset:
+            chunk = self._stream.read(min(SKIP_CHUNK_BYTES, offset - self.offset))
+            if not chunk:
+                raise ValueError(f"{self.path} ends before resume offset {offset}")
+            self.offset += len(chunk)
+
+    def _lines(self) -> Iterator[str]:
+        for line in iter(self._stream.readline, b''):
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        """
+        Yields each row as a dict, like csv.DictReader. The csv reader pulls lines only as a row needs
+        them, so while a row is being handled `offset` is exactly the end of that row.
+        """
+        fieldnames = self.fieldnames
+        for record in csv.reader(self._lines()):
+            if record:  # blank lines, which DictReader skips too
+                yield dict(zip(fieldnames, record))
+
+    def close(self):
+        self._stream.close()
+        self._file.close()
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+
+class DatabasePool:
+    """
+    Thread-safe PostgreSQL connection pool shared by the ingestion scripts.
+    Connections are opened once and reused across batches, so a long run pays for the TLS handshake
+    only max_size times. Connections idle for longer than health_check_interval are pinged before
+    being handed out, and dropped connections are discarded and replaced transparently.
+    Callers block (instead of failing) when every connection is in use.
+    """
+
+    def __init__(self, db_config: dict, max_size: int = 4, min_size: int = 1, health_check_interval: float = 30.0):
+        self.max_size = max(1, max_size)
+        self.health_check_interval = health_check_interval
+        self.reconnect_count = 0
+        self._pool = ThreadedConnectionPool(min(min_size, self.max_size), self.max_size, **db_config)
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(id(conn), 0.0)
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def _get_healthy(self):
+        for _ in range(self.max_size + 1):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+            # Dead connection (server restart, idle timeout, network drop): discard and try another
+            with self._lock:
+                self._last_used.pop(id(conn), None)
+                self.reconnect_count += 1
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Could not obtain a healthy database connection from the pool")
+
+    def _put(self, conn):
+        discard = bool(conn.closed)
+        if not discard and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                discard = True
+        with self._lock:
+            if discard:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=discard)
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrows a healthy connection, blocking while all of them are in use. Must be given back with release()."""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("Timed out waiting for a free database connection")
+        try:
+            return self._get_healthy()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        """Returns a borrowed connection. Uncommitted work is rolled back; dead connections are discarded."""
+        try:
+            self._put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Borrows a healthy connection for the duration of the block."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        self._pool.closeall()
+
+
+def create_db_pool(db_config: dict, max_size: int, logger: logging.Logger) -> DatabasePool:
+    """Opens the connection pool of a loader, logging a connection error through its logger before re-raising it."""
+    try:
+        return DatabasePool(db_config, max_size=max_size)
+    except Exception as e:
+        logger.error(f"Database connection error: {e}")
+        raise
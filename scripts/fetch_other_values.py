@@ -1,19 +1,35 @@
 import requests
-import psycopg2
-from psycopg2.extras import execute_batch
-from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from psycopg2.extras import execute_values
+from datetime import datetime, timezone, date
 import time
 import logging
 import sys
 import uuid
 import json
-import os
 import argparse
+import heapq
+import random
+from email.utils import parsedate_to_datetime
 from typing import Optional, List, Dict, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import threading
+import queue
 from pathlib import Path
 
+from bulk_load import BulkLoadSchema, restore_bulk_load_schema
+from changes_feed import change_windows, changed_movie_ids
+from checkpoint_store import CheckpointStore
+from db_pool import DatabasePool, create_db_pool
+from ingestion_metrics import IngestionMetrics
+from movie_detail_cache import MovieDetailCacheInvalidator
+from movie_records import MAX_RECORD_BYTES, MovieRecord
+from stage_profiler import StageProfiler, parse_window
+from tmdb_id_set import TmdbIdSet, MovieIdList
+from tmdb_response_cache import TmdbResponseCache
+from work_leases import LeaseBook, LeaseManager
+from write_session import UnnestInsert, WriteSession
+
 # --- Logger Setup ---
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -39,6 +55,10 @@ PROJECT_ROOT = SCRIPT_DIR.parent
 INFRASTRUCTURE_DIR = PROJECT_ROOT / "infrastructure"
 ENV_FILE = INFRASTRUCTURE_DIR / ".env"
 RUN_LOG_PATH = SCRIPT_DIR / "run_log_other_values.json"
+CHECKPOINT_PATH = SCRIPT_DIR / "run_checkpoint_other_values.sqlite3"
+RESPONSE_CACHE_DIR = SCRIPT_DIR / "tmdb_cache"
+PROFILE_DIR = SCRIPT_DIR / "profiles"
+BULK_LOAD_SNAPSHOT_PATH = SCRIPT_DIR / "bulk_load_snapshot_other_values.json"
 
 # Load .env file
 def load_env_file(env_path: Path) -> Dict[str, str]:
@@ -63,7 +83,13 @@ ENV_VARS = load_env_file(ENV_FILE)
 
 # --- Constants ---
 TMDB_ACCESS_TOKEN = ENV_VARS['TMDB_ACCESS_TOKEN']
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+# TMDB_BASE_URL can be pointed at a local stub server through .env for testing
+TMDB_BASE_URL = ENV_VARS.get('TMDB_BASE_URL', "https://api.themoviedb.org/3")
+MOVIE_DETAILS_APPEND = "videos,images,keywords,credits"
+# --credits-only: genres, keywords and companies come from the CSV loader, so only credits are appended
+CREDITS_ONLY_APPEND = "credits"
+# Cache namespace for movie detail responses; changing the appended sections starts a new namespace
+MOVIE_DETAILS_ENDPOINT = f"movie?append_to_response={MOVIE_DETAILS_APPEND}"
 HEADERS = {
     "Authorization": f"Bearer {TMDB_ACCESS_TOKEN}",
     "accept": "application/json"
@@ -118,219 +144,1121 @@ def get_db_config(db_type: str = 'local') -> dict:
 # Global DB_CONFIG will be set in main
 DB_CONFIG = None
 
-# --- Database & API Functions ---
+# Shared DB connection pool, created once per run in main
+DB_POOL: Optional[DatabasePool] = None
+
+# Shared keep-alive HTTP session, created once per run in main
+HTTP_SESSION: Optional[requests.Session] = None
+
+# Global rate limiter shared by all fetch threads, created once per run in main
+RATE_LIMITER = None
+
+# On-disk cache of raw TMDB responses, opened once per run in main (None when disabled)
+RESPONSE_CACHE: Optional[TmdbResponseCache] = None
+
+# When set, responses are only read from RESPONSE_CACHE, the network is never touched and related data is replaced
+REPLAY_MODE = False
+
+# When set (incremental --since runs), cached responses are bypassed and related data is replaced instead of skipped
+REFRESH_MODE = False
+
+# TmdbId -> internal Id caches for shared entities, warmed once per run in main
+DIMENSION_CACHES: Dict[str, 'DimensionIdCache'] = {}
+
+# Prometheus metrics; a no-op unless enabled in main with --metrics-port or --pushgateway
+METRICS = IngestionMetrics()
+
+# Per-stage timing; a no-op unless enabled in main with --profile
+PROFILER = StageProfiler()
+
+# Invalidates the API's cached details of movies whose related data was committed (None unless --invalidate-cache)
+CACHE_INVALIDATOR: Optional[MovieDetailCacheInvalidator] = None
+
+# --- Rate Limiting & Retries ---
+
+class RetryableFetchError(Exception):
+    """Raised for TMDB responses worth retrying (429, 5xx, network errors)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class WriterFailedError(Exception):
+    """Raised in the dispatcher when a DB writer thread died, so the run stops instead of waiting on a queue nobody drains."""
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every fetch thread, so the configured rate is a true global cap.
+    The rate is halved on throttling, cut on server errors and recovers additively on success.
+    A Retry-After header pauses the whole bucket until the server says we may continue.
+    """
 
-def get_db_connection():
-    """Establishes a PostgreSQL connection."""
+    def __init__(self, max_rate: float, min_rate: float = 1.0, recovery_step: float = 0.1):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.recovery_step = recovery_step
+        self.rate = max_rate
+        self.capacity = max(1.0, max_rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait_time = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    def on_failure(self, status_code: Optional[int], retry_after: Optional[float] = None):
+        with self._lock:
+            now = time.monotonic()
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+                self._tokens = 0
+            # Concurrent failures from one overload episode should only cut the rate once
+            if now - self._last_decrease < 1.0:
+                return
+            self._last_decrease = now
+            factor = 0.5 if status_code == 429 else 0.8
+            self.rate = max(self.min_rate, self.rate * factor)
+            logger.warning(f"[RATE] TMDB returned {status_code or 'a network error'}; rate lowered to {self.rate:.1f} req/s.")
+
+class RetryQueue:
+    """Bounded queue of movies waiting for another fetch attempt, ordered by when they become due."""
+
+    def __init__(self, max_size: int, max_attempts: int, base_delay: float = 1.0, max_delay: float = 120.0):
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._heap = []
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, movie: Tuple[str, int], attempt: int, retry_after: Optional[float] = None) -> bool:
+        """Schedules another attempt. Returns False if the movie has exhausted its attempts or the queue is full."""
+        if attempt >= self.max_attempts or len(self._heap) >= self.max_size:
+            return False
+        delay = retry_after or min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay *= random.uniform(1.0, 1.25)
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._sequence, attempt + 1, movie))
+        self._sequence += 1
+        return True
+
+    def pop_ready(self) -> Optional[Tuple[Tuple[str, int], int]]:
+        """Returns (movie, attempt) for the next movie that is due, or None."""
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            _, _, attempt, movie = heapq.heappop(self._heap)
+            return movie, attempt
+        return None
+
+    def seconds_until_ready(self) -> float:
+        if not self._heap:
+            return 0.0
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
     try:
-        return psycopg2.connect(**DB_CONFIG)
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        raise
-
-def load_run_log() -> dict:
-    """Loads the run log to resume processing."""
-    if os.path.exists(RUN_LOG_PATH):
-        try:
-            with open(RUN_LOG_PATH, 'r', encoding='utf-8') as f:
-                log = json.load(f)
-                logger.info(f"Loaded run log. {len(log.get('completed_tmdb_ids', []))} movies already processed.")
-                return log
-        except (json.JSONDecodeError, IOError) as e:
-            logger.error(f"Error loading run log: {e}. Starting fresh.")
-    return {"completed_tmdb_ids": []}
-
-def save_run_log(log: dict):
-    """Saves the run log."""
+        return max(0.0, float(value))
+    except ValueError:
+        pass
     try:
-        log['last_update'] = datetime.now(timezone.utc).isoformat()
-        with open(RUN_LOG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(log, f, indent=2)
-    except IOError as e:
-        logger.error(f"Error saving run log: {e}")
-
-def get_movies_to_process_from_db(completed_ids: set) -> List[Tuple[str, int]]:
-    """Fetches movies from the DB that have not been processed yet."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+# --- Database & API Functions ---
+
+def open_checkpoint_store() -> CheckpointStore:
+    """Opens the checkpoint store, importing the legacy JSON run log on first use."""
+    store = CheckpointStore(CHECKPOINT_PATH)
     try:
-        logger.info("Fetching all movie IDs from the database...")
-        cursor.execute('SELECT "Id", "TmdbId" FROM "Movies"')
-        all_movies = cursor.fetchall()
-        
-        movies_to_process = [m for m in all_movies if m[1] not in completed_ids]
-        logger.info(f"Found {len(all_movies)} total movies. {len(movies_to_process)} movies need processing.")
+        imported = store.import_json_run_log(RUN_LOG_PATH)
+        if imported:
+            logger.info(f"[CHECKPOINT] Imported {imported} movie IDs from legacy run log {RUN_LOG_PATH}.")
+    except (json.JSONDecodeError, IOError) as e:
+        logger.error(f"[CHECKPOINT] Error importing legacy run log: {e}. Continuing without it.")
+    logger.info(f"[CHECKPOINT] Loaded checkpoint store {CHECKPOINT_PATH}. {len(store)} movies already processed.")
+    return store
+
+def get_movies_to_process_from_db(completed_ids: TmdbIdSet, min_popularity: Optional[float] = None,
+                                  top_n: Optional[int] = None) -> MovieIdList:
+    """
+    Streams movies from the DB through a server-side cursor and keeps the ones that have not been processed yet,
+    most popular first so the titles users actually open are enriched in the first minutes of a run.
+    With min_popularity or top_n only the movies above the cutoff or the top_n most popular ones are considered.
+    """
+    # The known popularities come from a backward scan of IX_Movies_Popularity (VoteCount ties are an
+    # incremental sort), so the ordering does not need a sort of the whole table. DESC NULLS LAST
+    # cannot use the ascending index, hence the separate query for movies without a popularity.
+    known = 'SELECT "Id", "TmdbId" FROM "Movies" WHERE "Popularity" IS NOT NULL'
+    known_params = ()
+    if min_popularity is not None:
+        known += ' AND "Popularity" >= %s'
+        known_params = (min_popularity,)
+    queries = [(known + ' ORDER BY "Popularity" DESC, "VoteCount" DESC NULLS LAST LIMIT %s', known_params)]
+    if min_popularity is None:
+        queries.append(('SELECT "Id", "TmdbId" FROM "Movies" WHERE "Popularity" IS NULL '
+                        'ORDER BY "VoteCount" DESC NULLS LAST LIMIT %s', ()))
+
+    conn = DB_POOL.acquire()
+    try:
+        logger.info("Fetching movie IDs from the database, most popular first...")
+        total_movies = 0
+        movies_to_process = MovieIdList()
+        for query, params in queries:
+            # LIMIT NULL is no limit
+            limit = None if top_n is None else top_n - total_movies
+            if limit is not None and limit <= 0:
+                break
+            cursor = conn.cursor(name='movies_to_process')
+            cursor.itersize = 100000
+            try:
+                cursor.execute(query, params + (limit,))
+                for internal_uuid, tmdb_id in cursor:
+                    total_movies += 1
+                    if tmdb_id not in completed_ids:
+                        movies_to_process.append(internal_uuid, tmdb_id)
+            finally:
+                cursor.close()
+
+        logger.info(f"Found {total_movies} total movies. {len(movies_to_process)} movies need processing.")
         return movies_to_process
     finally:
-        cursor.close()
-        conn.close()
+        DB_POOL.release(conn)
+
+def create_http_session(pool_size: int) -> requests.Session:
+    """Creates a session whose connection pool keeps up to pool_size TLS connections alive for reuse."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(HEADERS)
+    return session
 
 def fetch_movie_details(movie_id: int) -> Optional[dict]:
-    """Fetches detailed movie data from TMDB API."""
+    """
+    Fetches detailed movie data, from the response cache if possible and otherwise from the TMDB API.
+    Returns None for permanent failures and raises RetryableFetchError for 429, 5xx and network errors.
+    """
+    if RESPONSE_CACHE and not REFRESH_MODE:
+        with PROFILER.stage('cache_read'):
+            cached = RESPONSE_CACHE.get(MOVIE_DETAILS_ENDPOINT, movie_id)
+            if cached is not None:
+                return json.loads(cached)
+    if REPLAY_MODE:
+        logger.warning(f"Movie TMDB ID {movie_id} is not in the response cache; skipped in replay mode.")
+        return None
+
     url = f"{TMDB_BASE_URL}/movie/{movie_id}"
-    params = {"append_to_response": "videos,images,keywords,credits"}
+    params = {"append_to_response": MOVIE_DETAILS_APPEND}
+    wait_started = time.monotonic()
+    with PROFILER.stage('rate_limit_wait'):
+        RATE_LIMITER.acquire()
+    request_started = time.monotonic()
+    METRICS.observe_rate_limit_wait(request_started - wait_started)
     try:
-        response = requests.get(url, headers=HEADERS, params=params, timeout=15)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.error(f"API Error {response.status_code} for movie TMDB ID {movie_id}")
-            return None
+        with PROFILER.stage('http'):
+            response = HTTP_SESSION.get(url, params=params, timeout=15)
     except requests.RequestException as e:
-        logger.error(f"Request error for movie TMDB ID {movie_id}: {e}")
-        return None
+        METRICS.observe_request('error', time.monotonic() - request_started)
+        RATE_LIMITER.on_failure(None)
+        raise RetryableFetchError(f"Request error for movie TMDB ID {movie_id}: {e}")
+    METRICS.observe_request(response.status_code, time.monotonic() - request_started)
 
-def fetch_movie_details_wrapper(internal_uuid: str, tmdb_id: int, sleep_time: float = 0.05) -> Optional[dict]:
-    """Thread-safe wrapper for fetching movie details with rate limiting."""
+    if response.status_code == 200:
+        RATE_LIMITER.on_success()
+        if RESPONSE_CACHE:
+            with PROFILER.stage('cache_write'):
+                RESPONSE_CACHE.put(MOVIE_DETAILS_ENDPOINT, movie_id, response.content)
+        with PROFILER.stage('json_decode'):
+            return response.json()
+    if response.status_code == 429 or response.status_code >= 500:
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        RATE_LIMITER.on_failure(response.status_code, retry_after)
+        raise RetryableFetchError(
+            f"API Error {response.status_code} for movie TMDB ID {movie_id}",
+            status_code=response.status_code,
+            retry_after=retry_after
+        )
+    logger.error(f"API Error {response.status_code} for movie TMDB ID {movie_id}")
+    return None
+
+def fetch_movie_details_wrapper(internal_uuid: str, tmdb_id: int) -> Optional[MovieRecord]:
+    """
+    Thread-safe wrapper fetching movie details and projecting them right away into a compact record
+    tagged with the internal movie id, so the full decoded response never waits in the queues.
+    """
     details = fetch_movie_details(tmdb_id)
-    if details:
-        details['internal_uuid'] = internal_uuid
-    time.sleep(sleep_time)  # Rate limiting
-    return details
-
-def batch_save_related_data(movies_data: List[dict]):
-    """Saves all related movie data (genres, cast, crew, etc.) to the database."""
-    if not movies_data:
-        return
+    if not details:
+        return None
+    with PROFILER.stage('project'):
+        return MovieRecord.from_tmdb(details, internal_uuid)
+
+# --- Incremental Sync ---
+
+def fetch_changed_movie_ids(since: date, until: date) -> set:
+    """Reads TMDB's changed-ids feed for [since, until] in 14-day windows and returns every changed movie ID."""
+    changed_ids = set()
+    for window_start, window_end in change_windows(since, until):
+        page, total_pages = 1, 1
+        while page <= total_pages:
+            params = {"start_date": window_start.isoformat(), "end_date": window_end.isoformat(), "page": page}
+            data = fetch_json_with_retries(f"{TMDB_BASE_URL}/movie/changes", params)
+            changed_ids.update(changed_movie_ids(data))
+            total_pages = data.get('total_pages', 1)
+            page += 1
+        logger.info(f"[SYNC] {window_start} .. {window_end}: {len(changed_ids)} changed movies so far.")
+    return changed_ids
+
+def fetch_json_with_retries(url: str, params: dict, max_attempts: int = 5) -> dict:
+    """GETs a TMDB JSON resource through the rate limiter, retrying 429/5xx/network errors with backoff."""
+    for attempt in range(max_attempts):
+        RATE_LIMITER.acquire()
+        retry_after = None
+        try:
+            response = HTTP_SESSION.get(url, params=params, timeout=15)
+            if response.status_code == 200:
+                RATE_LIMITER.on_success()
+                return response.json()
+            if response.status_code != 429 and response.status_code < 500:
+                response.raise_for_status()
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            RATE_LIMITER.on_failure(response.status_code, retry_after)
+            logger.warning(f"API Error {response.status_code} for {url} {params}; attempt {attempt + 1}/{max_attempts}.")
+        except requests.HTTPError:
+            raise
+        except requests.RequestException as e:
+            RATE_LIMITER.on_failure(None)
+            logger.warning(f"Request error for {url} {params}: {e}; attempt {attempt + 1}/{max_attempts}.")
+        time.sleep(retry_after or min(60, 2 ** attempt))
+    raise RuntimeError(f"Giving up on {url} {params} after {max_attempts} attempts")
 
-    conn = get_db_connection()
+def get_movies_by_tmdb_ids(tmdb_ids: set) -> MovieIdList:
+    """Returns (internal id, TMDB id) for the given TMDB IDs that exist in our catalog."""
+    conn = DB_POOL.acquire()
     cursor = conn.cursor()
+    movies = MovieIdList()
+    try:
+        cursor.execute('SELECT "Id", "TmdbId" FROM "Movies" WHERE "TmdbId" = ANY(%s) '
+                       'ORDER BY "Popularity" DESC NULLS LAST, "VoteCount" DESC NULLS LAST', (sorted(tmdb_ids),))
+        for internal_uuid, tmdb_id in cursor:
+            movies.append(internal_uuid, tmdb_id)
+        return movies
+    finally:
+        cursor.close()
+        DB_POOL.release(conn)
+
+def get_movies_in_range(range_start: int, range_end: int) -> MovieIdList:
+    """Returns (internal id, TMDB id) for the catalog movies with range_start <= TmdbId < range_end, most popular first."""
+    conn = DB_POOL.acquire()
+    cursor = conn.cursor()
+    movies = MovieIdList()
+    try:
+        cursor.execute('SELECT "Id", "TmdbId" FROM "Movies" WHERE "TmdbId" >= %s AND "TmdbId" < %s '
+                       'ORDER BY "Popularity" DESC NULLS LAST, "VoteCount" DESC NULLS LAST', (range_start, range_end))
+        for internal_uuid, tmdb_id in cursor:
+            movies.append(internal_uuid, tmdb_id)
+        return movies
+    finally:
+        cursor.close()
+        DB_POOL.release(conn)
+
+def iter_leased_movies(lease_manager: LeaseManager, lease_book: LeaseBook, keep):
+    """
+    Claims TmdbId ranges from the lease table one at a time, as the dispatcher runs out of work,
+    and yields the movies of each range for which keep((internal_uuid, tmdb_id)) is true.
+    Stops when no free or expired range is left.
+    """
+    while True:
+        lease = lease_manager.claim()
+        if lease is None:
+            return
+        movies = get_movies_in_range(lease.range_start, lease.range_end).filter(keep)
+        logger.info(f"[LEASE] Claimed TmdbId range from {lease.range_start} (attempt {lease.attempts}): {len(movies)} movies to process.")
+        lease_book.add(lease, movies.tmdb_ids())
+        yield from movies
+
+def parse_since(value: str, checkpoint_store: CheckpointStore) -> date:
+    """Parses --since: an ISO date, or 'last' for the day the previous incremental sync finished."""
+    if value == 'last':
+        last_sync = checkpoint_store.get_meta('last_incremental_sync')
+        if not last_sync:
+            raise ValueError("--since last was given but no previous incremental sync is recorded")
+        return date.fromisoformat(last_sync)
+    return date.fromisoformat(value)
+
+# --- Dimension ID Cache ---
+
+class DimensionIdCache:
+    """
+    In-process natural key -> internal Id map for one shared entity table (genres, people, ...).
+    The natural key is the unique TmdbId column, or the ISO code for countries and languages.
+    Warmed from the DB in bulk so link rows can be written with resolved ids instead of
+    a per-row INSERT ... SELECT lookup, and known entities are never re-sent to the server.
+    """
+
+    def __init__(self, table: str, columns: Tuple[str, ...], template: str, key_column: str = 'TmdbId'):
+        self.table = table
+        self.columns = columns
+        self.template = template
+        self.key_column = key_column
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def warm(self, conn, itersize: int = 50000):
+        """Loads every existing key -> Id pair with a server-side cursor."""
+        with conn.cursor(name=f"warm_{self.table.lower()}") as cursor:
+            cursor.itersize = itersize
+            cursor.execute(f'SELECT "{self.key_column}", "Id" FROM "{self.table}"')
+            ids = {tmdb_id: internal_id for tmdb_id, internal_id in cursor}
+        with self._lock:
+            self._ids.update(ids)
+        logger.info(f"[CACHE] Warmed {len(ids)} {self.table} ids.")
+
+    def resolve(self, cursor, rows: Dict[int, tuple], upsert: bool = False) -> Tuple[Dict[int, object], Dict[int, object]]:
+        """
+        Resolves internal ids for the given key -> insert-values mapping, inserting unknown entities.
+        With upsert=True every given entity is written and existing rows get their columns refreshed.
+        Returns (all resolved ids, newly learned ids). Newly learned ids must only be added to the
+        cache with remember() once the surrounding transaction has committed.
+        """
+        column_list = ', '.join(f'"{c}"' for c in self.columns)
+
+        if upsert:
+            update_list = ', '.join(f'"{c}" = EXCLUDED."{c}"' for c in self.columns if c not in ('Id', self.key_column, 'IsDeleted', 'CreatedAt'))
+            returned = execute_values(
+                cursor,
+                f'INSERT INTO "{self.table}" ({column_list}) VALUES %s ON CONFLICT ("{self.key_column}") DO UPDATE SET {update_list} RETURNING "{self.key_column}", "Id"',
+                [rows[tmdb_id] for tmdb_id in sorted(rows)],
+                template=self.template,
+                page_size=len(rows),
+                fetch=True
+            )
+            learned = dict(returned)
+            return dict(learned), learned
+
+        with self._lock:
+            resolved = {tmdb_id: self._ids[tmdb_id] for tmdb_id in rows if tmdb_id in self._ids}
+
+        missing = sorted(tmdb_id for tmdb_id in rows if tmdb_id not in resolved)
+        if not missing:
+            return resolved, {}
+
+        # Inserted in key order so concurrent DB writers lock rows in the same order
+        returned = execute_values(
+            cursor,
+            f'INSERT INTO "{self.table}" ({column_list}) VALUES %s ON CONFLICT ("{self.key_column}") DO NOTHING RETURNING "{self.key_column}", "Id"',
+            [rows[tmdb_id] for tmdb_id in missing],
+            template=self.template,
+            page_size=len(missing),
+            fetch=True
+        )
+        learned = dict(returned)
+
+        # Rows that conflicted were inserted by someone else; look their ids up in one query
+        conflicted = [tmdb_id for tmdb_id in missing if tmdb_id not in learned]
+        if conflicted:
+            cursor.execute(f'SELECT "{self.key_column}", "Id" FROM "{self.table}" WHERE "{self.key_column}" = ANY(%s)', (conflicted,))
+            learned.update(cursor.fetchall())
+
+        resolved.update(learned)
+        return resolved, learned
+
+    def remember(self, learned: Dict[int, object]):
+        with self._lock:
+            self._ids.update(learned)
 
-    # Prepare data containers
-    genre_values, movie_genre_values = [], []
-    company_values, movie_company_values = [], []
-    country_values, movie_country_values = [], []
-    language_values, movie_language_values = [], []
-    keyword_values, movie_keyword_values = [], []
+def create_dimension_caches() -> Dict[str, DimensionIdCache]:
+    """Creates the caches for every shared entity table written by batch_save_related_data."""
+    return {
+        'genres': DimensionIdCache('Genres', ('TmdbId', 'Name'), '(%s, %s)'),
+        'companies': DimensionIdCache('ProductionCompanies', ('TmdbId', 'Name', 'LogoPath', 'OriginCountry'), '(%s, %s, %s, %s)'),
+        'keywords': DimensionIdCache('Keywords', ('TmdbId', 'Name'), '(%s, %s)'),
+        'collections': DimensionIdCache('Collections', ('TmdbId', 'Name', 'PosterPath', 'BackdropPath'), '(%s, %s, %s, %s)'),
+        'countries': DimensionIdCache('Countries', ('Iso31661', 'Name'), '(%s, %s)', key_column='Iso31661'),
+        'languages': DimensionIdCache('Languages', ('Iso6391', 'Name', 'EnglishName'), '(%s, %s, %s)', key_column='Iso6391'),
+        'people': DimensionIdCache(
+            'People',
+            ('Id', 'TmdbId', 'Name', 'ProfilePath', 'Popularity', 'Gender', 'KnownForDepartment', 'IsDeleted', 'CreatedAt'),
+            '(%s, %s, %s, %s, %s, %s, %s, FALSE, NOW())'
+        ),
+    }
+
+def warm_dimension_caches(caches: Dict[str, DimensionIdCache]):
+    """Warms every dimension cache over a single connection."""
+    conn = DB_POOL.acquire()
+    try:
+        for cache in caches.values():
+            cache.warm(conn)
+        conn.commit()
+    finally:
+        DB_POOL.release(conn)
+
+# --- Saving ---
+
+# Link tables fully owned by batch_save_related_data; replaced per movie in refresh mode
+MOVIE_LINK_TABLES = ("MovieGenres", "MovieProductionCompanies", "MovieCast", "MovieCrew", "MovieKeywords",
+                     "MovieCountries", "MovieLanguages", "MovieCollections", "MovieVideos", "MovieImages")
+
+# Link tables whose rows the fetched responses fully cover (--credits-only responses have no keywords, videos or images)
+REPLACED_LINK_TABLES = MOVIE_LINK_TABLES
+CREDITS_ONLY_LINK_TABLES = tuple(t for t in MOVIE_LINK_TABLES if t not in ("MovieKeywords", "MovieVideos", "MovieImages"))
+
+# Link table inserts, prepared on every DB writer's connection (one EXECUTE per table per flush)
+LINK_INSERTS = {insert.table: insert for insert in (
+    UnnestInsert("MovieGenres", (("MovieId", "uuid"), ("GenreId", "integer"))),
+    UnnestInsert("MovieProductionCompanies", (("MovieId", "uuid"), ("ProductionCompanyId", "integer"))),
+    UnnestInsert("MovieCast", (("Id", "uuid"), ("MovieId", "uuid"), ("PersonId", "uuid"), ("Character", "text"), ("CastOrder", "integer"))),
+    UnnestInsert("MovieCrew", (("Id", "uuid"), ("MovieId", "uuid"), ("PersonId", "uuid"), ("Job", "text"), ("Department", "text"))),
+    UnnestInsert("MovieKeywords", (("MovieId", "uuid"), ("KeywordId", "integer"))),
+    UnnestInsert("MovieCountries", (("MovieId", "uuid"), ("CountryId", "integer"))),
+    UnnestInsert("MovieLanguages", (("MovieId", "uuid"), ("LanguageId", "integer"))),
+    UnnestInsert("MovieCollections", (("MovieId", "uuid"), ("CollectionId", "integer"))),
+    UnnestInsert("MovieVideos", (("Id", "uuid"), ("MovieId", "uuid"), ("VideoKey", "text"), ("Name", "text"), ("Site", "text"),
+                                 ("Type", "text"), ("Official", "boolean"))),
+    UnnestInsert("MovieImages", (("Id", "uuid"), ("MovieId", "uuid"), ("FilePath", "text"), ("ImageType", "text"), ("Language", "text"),
+                                 ("VoteAverage", "double precision"), ("VoteCount", "integer"), ("Width", "integer"), ("Height", "integer"))),
+)}
+
+# Tables whose secondary indexes and foreign keys are deferred by --bulk-initial-load.
+# Unique TmdbId indexes stay: the dimension upserts rely on them. Link tables that already hold rows
+# (insert_data_to_db.py fills MovieGenres, MovieKeywords and MovieProductionCompanies from the CSV) keep theirs.
+BULK_LOAD_TABLES = ("People",) + MOVIE_LINK_TABLES
+
+def _write_related_data(cursor, movies_data: List[MovieRecord]) -> Tuple[dict, Dict[str, int]]:
+    """
+    Writes the related data of a group of movies in the current transaction.
+    Returns the dimension ids it learned and the number of rows written per table.
+    """
+    PROFILER.mark()
+    # Prepare data containers (entities are keyed by TmdbId, so duplicates collapse)
+    genre_values, movie_genre_values = {}, set()
+    company_values, movie_company_values = {}, set()
+    country_values, movie_country_values = {}, set()
+    language_values, movie_language_values = {}, set()
+    keyword_values, movie_keyword_values = {}, set()
     video_values, image_values = [], []
-    person_values, cast_values, crew_values = [], [], []
-    collection_values, movie_collection_values = [], []
+    person_values, cast_values, crew_values = {}, [], []
+    collection_values, movie_collection_values = {}, set()
+
+    for movie in movies_data:
+        movie_id = movie.internal_uuid # This is the crucial internal ID
+
+        for genre in movie.genres:
+            genre_values[genre[0]] = genre
+            movie_genre_values.add((movie_id, genre[0]))
+
+        for company in movie.companies:
+            company_values[company[0]] = company
+            movie_company_values.add((movie_id, company[0]))
+
+        # Cast & Crew (People)
+        for person, character, order in movie.cast:
+            if person[0] not in person_values:
+                person_values[person[0]] = (str(uuid.uuid4()),) + person
+            cast_values.append((str(uuid.uuid4()), movie_id, person[0], character, order))
+
+        for person, job, department in movie.crew:
+            if person[0] not in person_values:
+                person_values[person[0]] = (str(uuid.uuid4()),) + person
+            crew_values.append((str(uuid.uuid4()), movie_id, person[0], job, department))
+
+        for keyword in movie.keywords:
+            keyword_values[keyword[0]] = keyword
+            movie_keyword_values.add((movie_id, keyword[0]))
+
+        # Countries & Languages (keyed by ISO code)
+        for country in movie.countries:
+            country_values[country[0]] = country
+            movie_country_values.add((movie_id, country[0]))
+
+        for language in movie.languages:
+            language_values[language[0]] = language
+            movie_language_values.add((movie_id, language[0]))
+
+        if movie.collection:
+            collection_values[movie.collection[0]] = movie.collection
+            movie_collection_values.add((movie_id, movie.collection[0]))
+
+        video_values.extend((str(uuid.uuid4()), movie_id) + video for video in movie.videos)
+        image_values.extend((str(uuid.uuid4()), movie_id) + image for image in movie.images)
+
+    PROFILER.lap('build_rows')
+
+    # --- Batch Inserts ---
+    # Shared entities are resolved through the dimension caches: only unknown ones are inserted
+    # (ON CONFLICT DO NOTHING), and link rows are written with the resolved internal ids.
+    # In refresh mode shared entities are upserted and each movie's link rows are replaced.
+    # The link rows of every table then go out in a single round trip of prepared EXECUTEs.
+    learned_ids = {}
+    link_rows = {}
+
+    if genre_values:
+        genre_ids, learned_ids['genres'] = DIMENSION_CACHES['genres'].resolve(cursor, genre_values, upsert=REFRESH_MODE)
+        link_rows["MovieGenres"] = [(m, genre_ids[g]) for m, g in movie_genre_values]
+
+    if company_values:
+        company_ids, learned_ids['companies'] = DIMENSION_CACHES['companies'].resolve(cursor, company_values, upsert=REFRESH_MODE)
+        link_rows["MovieProductionCompanies"] = [(m, company_ids[c]) for m, c in movie_company_values]
+
+    if person_values:
+        person_ids, learned_ids['people'] = DIMENSION_CACHES['people'].resolve(cursor, person_values, upsert=REFRESH_MODE)
+        link_rows["MovieCast"] = [(c[0], c[1], person_ids[c[2]], c[3], c[4]) for c in cast_values]
+        link_rows["MovieCrew"] = [(c[0], c[1], person_ids[c[2]], c[3], c[4]) for c in crew_values]
+
+    if keyword_values:
+        keyword_ids, learned_ids['keywords'] = DIMENSION_CACHES['keywords'].resolve(cursor, keyword_values, upsert=REFRESH_MODE)
+        link_rows["MovieKeywords"] = [(m, keyword_ids[k]) for m, k in movie_keyword_values]
+
+    if country_values:
+        country_ids, learned_ids['countries'] = DIMENSION_CACHES['countries'].resolve(cursor, country_values, upsert=REFRESH_MODE)
+        link_rows["MovieCountries"] = [(m, country_ids[c]) for m, c in movie_country_values]
+
+    if language_values:
+        language_ids, learned_ids['languages'] = DIMENSION_CACHES['languages'].resolve(cursor, language_values, upsert=REFRESH_MODE)
+        link_rows["MovieLanguages"] = [(m, language_ids[l]) for m, l in movie_language_values]
+
+    if collection_values:
+        collection_ids, learned_ids['collections'] = DIMENSION_CACHES['collections'].resolve(cursor, collection_values, upsert=REFRESH_MODE)
+        link_rows["MovieCollections"] = [(m, collection_ids[c]) for m, c in movie_collection_values]
+
+    link_rows["MovieVideos"] = video_values
+    link_rows["MovieImages"] = image_values
+
+    statements = []
+    # Refresh and replay runs, and reclaimed lease ranges (an earlier owner may have written part of them), replace
+    # existing rows: cast, crew, video and image rows have no natural key, so ON CONFLICT cannot skip them
+    movie_ids = [m.internal_uuid for m in movies_data if REFRESH_MODE or REPLAY_MODE or m.replace_existing]
+    if movie_ids:
+        statements.extend(cursor.mogrify(f'DELETE FROM "{table}" WHERE "MovieId" = ANY(%s::uuid[])', (movie_ids,))
+                          for table in REPLACED_LINK_TABLES)
+    statements.extend(LINK_INSERTS[table].execute_sql(cursor, rows) for table, rows in link_rows.items() if rows)
+    if statements:
+        cursor.execute(b'; '.join(statements))
+
+    PROFILER.lap('db_insert')
+
+    row_counts = {DIMENSION_CACHES[name].table: len(learned) for name, learned in learned_ids.items()}
+    row_counts.update({
+        "MovieGenres": len(movie_genre_values), "MovieProductionCompanies": len(movie_company_values),
+        "MovieCast": len(cast_values), "MovieCrew": len(crew_values), "MovieKeywords": len(movie_keyword_values),
+        "MovieCountries": len(movie_country_values), "MovieLanguages": len(movie_language_values),
+        "MovieCollections": len(movie_collection_values), "MovieVideos": len(video_values), "MovieImages": len(image_values),
+    })
+    return learned_ids, row_counts
+
+def batch_save_related_data(session: WriteSession, movies_data: List[MovieRecord]) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Saves all related movie data (genres, cast, crew, etc.) of a flush in the writer's open transaction,
+    which is committed every --commit-every flushes.
+    A failing flush is bisected so one bad movie does not discard the rest of the transaction.
+    Returns the TMDB IDs of the movies whose data was committed by this call (possibly of earlier
+    flushes), of the movies lost with the connection and of the movies the database rejected.
+    """
+    def remember_learned(movies, result):
+        # Only ids from committed transactions may enter the dimension caches
+        learned_ids, row_counts = result
+        for name, learned in learned_ids.items():
+            DIMENSION_CACHES[name].remember(learned)
+        for table, rows in row_counts.items():
+            METRICS.add_rows(table, rows)
+        if CACHE_INVALIDATOR:
+            with PROFILER.stage('cache_invalidate'):
+                CACHE_INVALIDATOR.invalidate((m.internal_uuid, m.popularity) for m in movies)
+
+    def log_failed_movie(movie_data, error):
+        movie_data.save_error = str(error)
+        logger.error(f"Failed to save related data: TMDB_ID={movie_data.id}, Title='{movie_data.title}'. Reason: {error}")
+
+    committed, failed = session.write(movies_data, _write_related_data, log_failed_movie, on_commit=remember_learned)
+    return settle_session_result(session, committed, failed)
+
+def settle_session_result(session: WriteSession, committed: List[MovieRecord], failed: List[MovieRecord]) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Logs the outcome of a write or commit of the session and maps it to TMDB IDs: (committed, lost, rejected).
+    Rejected movies failed on their own (save_error is set) and would fail again; lost ones may succeed on a retry.
+    """
+    if session.last_error:
+        logger.error(f"Database connection lost during batch save: {session.last_error}")
+        session.last_error = None
+    if committed:
+        logger.info(f"Committed related data of {len(committed)} movies (commit {session.commit_count}).")
+    return ([m.id for m in committed], [m.id for m in failed if m.save_error is None],
+            [m.id for m in failed if m.save_error is not None])
+
+# --- Pipeline ---
+
+class CheckpointTracker:
+    """Thread-safe bookkeeping of committed and failed TMDB IDs shared by the DB writer threads."""
+
+    def __init__(self, store: CheckpointStore):
+        self.store = store
+        self.failed_tmdb_ids = []
+        self.flush_count = 0
+        # Fetched movies whose save has finished, committed or not (for the checkpoint lag)
+        self.settled_count = 0
+        # Set in lease mode, so claimed ranges are completed once all their movies are settled
+        self.lease_book: Optional[LeaseBook] = None
+        self._lock = threading.Lock()
+
+    def mark_committed(self, tmdb_ids: List[int]):
+        with self._lock:
+            self.flush_count += 1
+            self.settled_count += len(tmdb_ids)
+            self.store.add_many(tmdb_ids)
+            METRICS.add_committed(len(tmdb_ids))
+            flush_num = self.flush_count
+        if self.lease_book:
+            self.lease_book.settle(tmdb_ids, committed=True)
+        return flush_num
+
+    def mark_failed(self, tmdb_ids: List[int], fetched: bool = False, permanent: bool = False):
+        """Records movies that were not saved; permanent failures (see LeaseBook) do not hold back their lease range."""
+        with self._lock:
+            if fetched:
+                self.settled_count += len(tmdb_ids)
+            self.failed_tmdb_ids.extend(tmdb_ids)
+        if self.lease_book:
+            self.lease_book.settle(tmdb_ids, committed=False, permanent=permanent)
+
+def db_writer_loop(results_queue: queue.Queue, checkpoint: CheckpointTracker, flush_size: int, flush_interval: float,
+                   commit_every: int = 1, synchronous_commit: bool = True):
+    """
+    DB writer thread: drains fetched movies from the queue and saves them in flushes triggered
+    by size (flush_size movies) or time (flush_interval seconds since the first buffered movie).
+    Flushes are committed commit_every at a time, or flush_interval seconds after the first
+    uncommitted one, over a connection held for the whole run (see WriteSession).
+    Stops after flushing and committing what is left when it receives a None sentinel.
+    """
+    session = WriteSession(DB_POOL, LINK_INSERTS.values(), commit_every, synchronous_commit, max_pending_age=flush_interval)
+    buffer = []
+    deadline = None
+    stopping = False
+
+    def settle(committed_ids: List[int], failed_ids: List[int], rejected_ids: List[int]):
+        # Only movies whose related data was actually (durably) committed are checkpointed
+        if committed_ids:
+            with PROFILER.stage('checkpoint'):
+                flush_num = checkpoint.mark_committed(committed_ids)
+            logger.info(f"--- Flush {flush_num}: saved {len(committed_ids)} movies (queue depth {results_queue.qsize()}). Progress saved. ---")
+        if failed_ids:
+            checkpoint.mark_failed(failed_ids, fetched=True)
+            logger.error(f"--- {len(failed_ids)} movies were not saved. They will be retried on the next run. ---")
+        if rejected_ids:
+            checkpoint.mark_failed(rejected_ids, fetched=True, permanent=True)
+            logger.error(f"--- {len(rejected_ids)} movies were rejected by the database (see the errors above) and were not saved. ---")
 
     try:
-        for movie_data in movies_data:
-            movie_id = movie_data['internal_uuid'] # This is the crucial internal ID
-
-            # Genres
-            for genre in movie_data.get('genres', []):
-                genre_values.append((genre['id'], genre['name']))
-                movie_genre_values.append((movie_id, genre['id']))
-
-            # Production Companies
-            for company in movie_data.get('production_companies', []):
-                company_values.append((company['id'], company['name'], company.get('logo_path'), company.get('origin_country')))
-                movie_company_values.append((movie_id, company['id']))
-
-            # Cast & Crew (People)
-            credits = movie_data.get('credits', {})
-            for person in credits.get('cast', [])[:20]: # Top 20 cast
-                person_values.append((str(uuid.uuid4()), person['id'], person['name'], person.get('profile_path'), person.get('popularity'), person.get('gender'), person.get('known_for_department')))
-                cast_values.append((str(uuid.uuid4()), movie_id, person['id'], person.get('character'), person.get('order')))
-            
-            for person in credits.get('crew', []):
-                if person.get('job') in ['Director', 'Producer', 'Writer', 'Screenplay']:
-                    person_values.append((str(uuid.uuid4()), person['id'], person['name'], person.get('profile_path'), person.get('popularity'), person.get('gender'), person.get('known_for_department')))
-                    crew_values.append((str(uuid.uuid4()), movie_id, person['id'], person.get('job'), person.get('department')))
-
-            # Keywords
-            for keyword in movie_data.get('keywords', {}).get('keywords', []):
-                keyword_values.append((keyword['id'], keyword['name']))
-                movie_keyword_values.append((movie_id, keyword['id']))
-
-        # --- Batch Inserts ---
-        # Note: ON CONFLICT DO NOTHING is used to prevent errors if the entity already exists.
-        
-        if genre_values:
-            execute_batch(cursor, 'INSERT INTO "Genres" ("TmdbId", "Name") VALUES (%s, %s) ON CONFLICT ("TmdbId") DO NOTHING', list(set(genre_values)))
-        if movie_genre_values:
-            execute_batch(cursor, 'INSERT INTO "MovieGenres" ("MovieId", "GenreId") SELECT %s, "Id" FROM "Genres" WHERE "TmdbId" = %s ON CONFLICT DO NOTHING', movie_genre_values)
-
-        if company_values:
-            execute_batch(cursor, 'INSERT INTO "ProductionCompanies" ("TmdbId", "Name", "LogoPath", "OriginCountry") VALUES (%s, %s, %s, %s) ON CONFLICT ("TmdbId") DO NOTHING', list(set(company_values)))
-        if movie_company_values:
-            execute_batch(cursor, 'INSERT INTO "MovieProductionCompanies" ("MovieId", "ProductionCompanyId") SELECT %s, "Id" FROM "ProductionCompanies" WHERE "TmdbId" = %s ON CONFLICT DO NOTHING', movie_company_values)
-
-        if person_values:
-            execute_batch(cursor, 'INSERT INTO "People" ("Id", "TmdbId", "Name", "ProfilePath", "Popularity", "Gender", "KnownForDepartment", "IsDeleted", "CreatedAt") VALUES (%s, %s, %s, %s, %s, %s, %s, FALSE, NOW()) ON CONFLICT ("TmdbId") DO NOTHING', list(set(person_values)))
-        if cast_values:
-            execute_batch(cursor, 'INSERT INTO "MovieCast" ("Id", "MovieId", "PersonId", "Character", "CastOrder") SELECT %s, %s, "Id", %s, %s FROM "People" WHERE "TmdbId" = %s ON CONFLICT DO NOTHING', [(c[0], c[1], c[3], c[4], c[2]) for c in cast_values])
-        if crew_values:
-            execute_batch(cursor, 'INSERT INTO "MovieCrew" ("Id", "MovieId", "PersonId", "Job", "Department") SELECT %s, %s, "Id", %s, %s FROM "People" WHERE "TmdbId" = %s ON CONFLICT DO NOTHING', [(c[0], c[1], c[3], c[4], c[2]) for c in crew_values])
-
-        if keyword_values:
-            execute_batch(cursor, 'INSERT INTO "Keywords" ("TmdbId", "Name") VALUES (%s, %s) ON CONFLICT ("TmdbId") DO NOTHING', list(set(keyword_values)))
-        if movie_keyword_values:
-            execute_batch(cursor, 'INSERT INTO "MovieKeywords" ("MovieId", "KeywordId") SELECT %s, "Id" FROM "Keywords" WHERE "TmdbId" = %s ON CONFLICT DO NOTHING', movie_keyword_values)
+        while not stopping:
+            due_at = min((d for d in (deadline, session.due_at()) if d is not None), default=None)
+            timeout = None if due_at is None else max(0.0, due_at - time.monotonic())
+            try:
+                item = results_queue.get(timeout=timeout)
+                if item is None:
+                    stopping = True
+                else:
+                    if not buffer:
+                        deadline = time.monotonic() + flush_interval
+                    buffer.append(item)
+            except queue.Empty:
+                pass
 
-        conn.commit()
-        logger.info(f"Successfully saved related data for a batch of {len(movies_data)} movies.")
-
-    except psycopg2.Error as e:
-        conn.rollback()
-        logger.error(f"Database error during batch save: {e}")
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"An unexpected error occurred during batch save: {e}")
+            if buffer and (stopping or len(buffer) >= flush_size or time.monotonic() >= deadline):
+                flush_started = time.monotonic()
+                batch_num = PROFILER.next_batch()
+                with PROFILER.stage('flush'):
+                    saved = batch_save_related_data(session, buffer)
+                METRICS.observe_flush(len(buffer), time.monotonic() - flush_started)
+                settle(*saved)
+                PROFILER.end_batch(batch_num)
+                buffer = []
+                deadline = None
+            elif not stopping and session.due_at() is not None and time.monotonic() >= session.due_at():
+                # The queue went quiet: do not hold an open transaction or unconfirmed commits any longer
+                with PROFILER.stage('commit'):
+                    settle(*settle_session_result(session, *session.commit()))
     finally:
-        cursor.close()
-        conn.close()
+        with PROFILER.stage('commit'):
+            settle(*settle_session_result(session, *session.close()))
+
+# How often the dispatcher, blocked on a full results queue, checks that the writers are still alive
+WRITER_CHECK_SECONDS = 1.0
+
+def run_db_writer(writer_errors: List[BaseException], *args):
+    """Thread target around db_writer_loop that records why a writer died for the dispatcher."""
+    try:
+        db_writer_loop(*args)
+    except BaseException as e:
+        logger.exception(f"[DB] {threading.current_thread().name} stopped: {e}")
+        writer_errors.append(e)
+
+def put_result(results_queue: queue.Queue, item, writer_threads: List[threading.Thread], writer_errors: List[BaseException]):
+    """
+    Puts item on the bounded results queue, waiting in WRITER_CHECK_SECONDS steps while it is full.
+    Raises WriterFailedError as soon as a writer has died: the survivors alone may never drain the queue.
+    """
+    while True:
+        if writer_errors or not all(thread.is_alive() for thread in writer_threads):
+            error = writer_errors[0] if writer_errors else 'exited unexpectedly'
+            raise WriterFailedError(f"A DB writer thread died ({error})")
+        try:
+            results_queue.put(item, timeout=WRITER_CHECK_SECONDS)
+            return
+        except queue.Full:
+            pass
+
+def stop_db_writers(results_queue: queue.Queue, writer_threads: List[threading.Thread]):
+    """Sends one None sentinel per live writer and waits for them; gives up on the queue once no writer is left to drain it."""
+    for _ in [thread for thread in writer_threads if thread.is_alive()]:
+        while True:
+            try:
+                results_queue.put(None, timeout=WRITER_CHECK_SECONDS)
+                break
+            except queue.Full:
+                if not any(thread.is_alive() for thread in writer_threads):
+                    break
+    for thread in writer_threads:
+        thread.join()
+
+def log_profile_summary():
+    """Logs the per-stage timing table and writes the profiles captured for the batch window."""
+    logger.info("[PROFILE] Time per stage (flush = save + commit, build_rows/db_insert are inside it):")
+    for line in PROFILER.summary_lines():
+        logger.info(f"[PROFILE] {line}")
+    for kind, path in PROFILER.close().items():
+        logger.info(f"[PROFILE] Wrote {kind} to {path}")
 
 # --- Main Execution ---
 
-def main(batch_size: int, workers: int = 20):
-    """Main function to orchestrate fetching and saving related movie data."""
-    run_log = load_run_log()
-    completed_tmdb_ids = set(run_log.get('completed_tmdb_ids', []))
+def main(batch_size: int, workers: int = 20, pool_size: Optional[int] = None,
+         rate_limit: float = 40.0, max_retries: int = 5, retry_queue_size: int = 1000,
+         writers: int = 1, flush_interval: float = 5.0, queue_size: Optional[int] = None,
+         use_cache: bool = True, cache_dir: Path = RESPONSE_CACHE_DIR, cache_max_gb: float = 20.0,
+         cache_ttl_days: Optional[float] = 30.0, replay: bool = False, since: Optional[str] = None,
+         db_pool_size: Optional[int] = None, bulk_initial_load: bool = False,
+         metrics_port: Optional[int] = None, pushgateway: Optional[str] = None,
+         profile: bool = False, profile_window: Optional[Tuple[int, int]] = None, profile_mode: str = 'cprofile',
+         profile_dir: Path = PROFILE_DIR, leases: bool = False, lease_size: int = 500, lease_seconds: float = 300.0,
+         lease_job: str = 'related-data', lease_reset: bool = False, min_popularity: Optional[float] = None,
+         top_n: Optional[int] = None, invalidate_cache: bool = False, redis_connection: Optional[str] = None,
+         warm_top_k: int = 0, api_url: Optional[str] = None, commit_every: int = 1, synchronous_commit: bool = True,
+         credits_only: bool = False):
+    """
+    Main function to orchestrate fetching and saving related movie data.
+    Fetch workers and DB writer threads run concurrently, connected by a bounded queue.
+    With replay=True the DB is rebuilt from the response cache without any network access.
+    With since set, only catalog movies in TMDB's change feed since that date are refetched and replaced.
+    With bulk_initial_load the secondary indexes and foreign keys of the still empty people and link tables
+    are dropped for the run and rebuilt in parallel at the end; link tables the CSV load already filled keep theirs.
+    Prometheus metrics are served on metrics_port and/or pushed to pushgateway when either is set.
+    With profile set, wall/CPU time per stage per flush is recorded and summarized at the end, and the
+    flushes in profile_window are captured with cProfile or a stack sampler (profile_mode) into profile_dir.
+    With leases set, work is claimed in TmdbId ranges of about lease_size movies from the "IngestionLeases"
+    table (job lease_job), so any number of processes on any number of hosts can share the catalog.
+    Movies are processed most popular first; a full run can be limited to movies with at least
+    min_popularity or to the top_n most popular movies.
+    With invalidate_cache set, the API's cached details of every committed movie are invalidated in Redis
+    (redis_connection), and the warm_top_k most popular of them are requested from api_url at the end.
+    Each DB writer commits commit_every flushes per transaction; with synchronous_commit off the commits
+    do not wait for the WAL flush, and movies are only checkpointed after a periodic durable commit.
+    With credits_only, only credits are appended to the details request (the CSV loader links genres,
+    keywords and companies), and keywords, videos and images are never replaced.
+    """
+    global DB_POOL, HTTP_SESSION, RATE_LIMITER, DIMENSION_CACHES, RESPONSE_CACHE, REPLAY_MODE, REFRESH_MODE, PROFILER, CACHE_INVALIDATOR
+    global MOVIE_DETAILS_APPEND, MOVIE_DETAILS_ENDPOINT, REPLACED_LINK_TABLES
+
+    REPLAY_MODE = replay
+    REFRESH_MODE = since is not None
+    if credits_only:
+        MOVIE_DETAILS_APPEND = CREDITS_ONLY_APPEND
+        MOVIE_DETAILS_ENDPOINT = f"movie?append_to_response={MOVIE_DETAILS_APPEND}"
+        REPLACED_LINK_TABLES = CREDITS_ONLY_LINK_TABLES
+        logger.info(f"Fetching credits only (append_to_response={MOVIE_DETAILS_APPEND}); keywords, videos and images are left as they are.")
+    if profile:
+        PROFILER = StageProfiler(True, 'fetch_other_values', profile_window, profile_mode, profile_dir)
+    if metrics_port or pushgateway:
+        try:
+            METRICS.enable('fetch-other-values', metrics_port, pushgateway)
+            logger.info(f"[METRICS] Exposing metrics on port {metrics_port}" if metrics_port else f"[METRICS] Pushing metrics to {pushgateway}")
+        except (RuntimeError, OSError) as e:
+            logger.warning(f"[METRICS] Metrics disabled: {e}")
+    if use_cache or replay:
+        # Replay uses whatever is cached, however old
+        ttl_seconds = None if replay or not cache_ttl_days else cache_ttl_days * 86400
+        RESPONSE_CACHE = TmdbResponseCache(cache_dir, int(cache_max_gb * 1024 ** 3), ttl_seconds)
+        logger.info(f"[CACHE] Using response cache {cache_dir} ({RESPONSE_CACHE.total_bytes / 1024 ** 2:.0f} MB).")
+
+    # One connection per DB writer plus one for the main thread's queries
+    db_pool_size = db_pool_size or writers + 1
+    # The main thread and the DB writer threads share the pool
+    DB_POOL = create_db_pool(DB_CONFIG, db_pool_size, logger)
+    logger.info(f"[DB] Connection pool ready ({db_pool_size} connections max).")
 
-    movies_to_process = get_movies_to_process_from_db(completed_tmdb_ids)
+    pool_size = pool_size or workers
+    HTTP_SESSION = create_http_session(pool_size)
+    RATE_LIMITER = AdaptiveRateLimiter(rate_limit)
+
+    bulk_schema = BulkLoadSchema(DB_CONFIG, BULK_LOAD_TABLES, BULK_LOAD_SNAPSHOT_PATH)
+    if bulk_schema.has_pending_snapshot() and not restore_bulk_load_schema(bulk_schema, logger, interrupted=True):
+        DB_POOL.close()
+        return
+
+    checkpoint_store = open_checkpoint_store()
+    sync_started_on = datetime.now(timezone.utc).date()
+    lease_manager = lease_book = None
+    if leases and REFRESH_MODE:
+        logger.warning("[LEASE] --leases is ignored with --since; incremental syncs are small enough for one process.")
+    if (min_popularity is not None or top_n is not None) and (REFRESH_MODE or leases):
+        # A range or sync marked done must cover every movie in it, so cutoffs only apply to plain full runs
+        logger.warning("--min-popularity and --top-n are ignored with --since and --leases.")
+    if REFRESH_MODE:
+        since_date = parse_since(since, checkpoint_store)
+        changed_ids = fetch_changed_movie_ids(since_date, sync_started_on)
+        movies_to_process = get_movies_by_tmdb_ids(changed_ids) if changed_ids else MovieIdList()
+        logger.info(f"[SYNC] {len(changed_ids)} movies changed on TMDB since {since_date}; {len(movies_to_process)} of them are in our catalog.")
+    elif leases:
+        lease_manager = LeaseManager(DB_CONFIG, lease_job, lease_seconds)
+        if lease_reset:
+            logger.info(f"[LEASE] Deleted {lease_manager.reset()} ranges of job '{lease_job}'.")
+        ranges, seeded = lease_manager.ensure_leases(lease_size)
+        logger.info(f"[LEASE] Node {lease_manager.node_id}: job '{lease_job}' has {ranges} ranges{' (just created)' if seeded else ''}. Progress: {lease_manager.progress()}")
+        lease_book = LeaseBook(lease_manager)
+        # Ranges are filtered against the checkpoint as they are claimed
+        completed_ids = checkpoint_store.load_ids()
+        movies_to_process = None
+    else:
+        movies_to_process = get_movies_to_process_from_db(checkpoint_store.load_ids(), min_popularity, top_n)
 
-    if not movies_to_process:
+    if replay:
+        cached_ids = TmdbIdSet(RESPONSE_CACHE.iter_tmdb_ids(MOVIE_DETAILS_ENDPOINT))
+        if lease_book is None:
+            movies_to_process = movies_to_process.filter(lambda m: m[1] in cached_ids)
+            logger.info(f"[REPLAY] {len(movies_to_process)} pending movies are available in the response cache.")
+
+    if lease_book is None and not movies_to_process:
         logger.info("All movies are already up-to-date.")
+        if REFRESH_MODE:
+            checkpoint_store.set_meta('last_incremental_sync', sync_started_on.isoformat())
+        checkpoint_store.close()
+        HTTP_SESSION.close()
+        DB_POOL.close()
+        if RESPONSE_CACHE:
+            RESPONSE_CACHE.close()
         return
 
-    total_batches = (len(movies_to_process) + batch_size - 1) // batch_size
-    logger.info(f"Starting to process {len(movies_to_process)} movies in {total_batches} batches of size {batch_size}.")
-    logger.info(f"Using {workers} parallel workers for faster processing.")
+    DIMENSION_CACHES = create_dimension_caches()
+    warm_dimension_caches(DIMENSION_CACHES)
+
+    retry_queue = RetryQueue(retry_queue_size, max_retries)
+
+    bulk_started = False
+    if bulk_initial_load:
+        try:
+            with DB_POOL.connection() as conn:
+                snapshot = bulk_schema.begin(conn, skip_non_empty=True)
+        except Exception as e:
+            logger.error(f"[BULK] {e}")
+            if lease_manager:
+                lease_manager.close()
+            checkpoint_store.close()
+            HTTP_SESSION.close()
+            DB_POOL.close()
+            if RESPONSE_CACHE:
+                RESPONSE_CACHE.close()
+            return
+        bulk_started = True
+        logger.info(f"[BULK] Dropped {len(snapshot['indexes'])} secondary indexes and {len(snapshot['foreign_keys'])} foreign keys for the load. Snapshot: {BULK_LOAD_SNAPSHOT_PATH}")
+        if snapshot['skipped']:
+            logger.info(f"[BULK] {', '.join(snapshot['skipped'])} already hold rows (e.g. links from the CSV load), so their indexes and foreign keys stay in place.")
+
+    if invalidate_cache:
+        try:
+            CACHE_INVALIDATOR = MovieDetailCacheInvalidator(redis_connection, api_url, warm_top_k)
+            CACHE_INVALIDATOR.ping()
+            logger.info(f"[API-CACHE] Invalidating cached movie details in Redis {redis_connection}"
+                        + (f"; the {warm_top_k} most popular changed movies will be pre-warmed through {api_url}." if warm_top_k else "."))
+        except Exception as e:
+            # Cached details then simply live until they expire
+            logger.warning(f"[API-CACHE] Cache invalidation disabled: {e}")
+            CACHE_INVALIDATOR = None
+
+    # A full queue blocks the dispatcher, which stops submitting fetches until the writers catch up
+    results_queue = queue.Queue(maxsize=queue_size or batch_size * writers * 2)
+    checkpoint = CheckpointTracker(checkpoint_store)
+    checkpoint.lease_book = lease_book
 
-    for i in range(0, len(movies_to_process), batch_size):
-        batch = movies_to_process[i:i + batch_size]
-        current_batch_num = (i // batch_size) + 1
-        logger.info(f"--- Processing Batch {current_batch_num}/{total_batches} ---")
+    if lease_book:
+        logger.info(f"[LEASE] Claiming ranges as work runs out, with {lease_seconds:.0f}s leases renewed every {lease_seconds / 3:.0f}s. Flushing every {batch_size} movies or {flush_interval}s.")
+    else:
+        logger.info(f"Starting to process {len(movies_to_process)} movies, flushing every {batch_size} movies or {flush_interval}s.")
+    logger.info(f"Using {workers} parallel workers, {pool_size} pooled HTTP connections, {writers} DB writers and a global limit of {rate_limit} req/s.")
+    if commit_every > 1 or not synchronous_commit:
+        logger.info(f"[DB] Committing every {commit_every} flushes per writer"
+                    + (", with synchronous_commit off and a durable commit before each checkpoint." if not synchronous_commit else "."))
+    # Finished fetches wait in the queue, in the dispatcher (workers * 2 in flight) and in the writers' open transactions
+    max_records = results_queue.maxsize + workers * 2 + batch_size * writers * commit_every
+    logger.info(f"[MEMORY] At most {max_records} movie records held at once, bounded by {max_records * MAX_RECORD_BYTES / 2**20:.0f} MB.")
 
-        # Parallel fetching with ThreadPoolExecutor
-        detailed_movies_batch = []
+    # Filled by a writer thread that dies; the dispatcher then aborts the run
+    writer_errors: List[BaseException] = []
+    writer_threads = [
+        threading.Thread(target=run_db_writer, args=(writer_errors, results_queue, checkpoint, batch_size, flush_interval, commit_every, synchronous_commit),
+                         name=f"db-writer-{n}", daemon=True)
+        for n in range(writers)
+    ]
+    for thread in writer_threads:
+        thread.start()
+
+    # Keep a steady number of requests in flight instead of draining the pool at each batch boundary
+    max_in_flight = workers * 2
+    if lease_book:
+        lease_manager.start_heartbeat()
+        pending_movies = iter_leased_movies(
+            lease_manager, lease_book,
+            lambda m: m[1] not in completed_ids and (not replay or m[1] in cached_ids)
+        )
+    else:
+        pending_movies = iter(movies_to_process)
+    fetched_count = 0
+    writer_failed = False
+
+    try:
         with ThreadPoolExecutor(max_workers=workers) as executor:
-            # Submit all tasks for the batch
-            future_to_movie = {
-                executor.submit(fetch_movie_details_wrapper, internal_uuid, tmdb_id): (internal_uuid, tmdb_id)
-                for internal_uuid, tmdb_id in batch
-            }
-
-            # Collect results as they complete
-            for future in as_completed(future_to_movie):
-                internal_uuid, tmdb_id = future_to_movie[future]
-                try:
-                    details = future.result()
-                    if details:
-                        detailed_movies_batch.append(details)
-                except Exception as e:
-                    logger.error(f"Error processing movie TMDB ID {tmdb_id}: {e}")
-
-        logger.info(f"Fetched details for {len(detailed_movies_batch)}/{len(batch)} movies in this batch.")
-
-        if detailed_movies_batch:
-            batch_save_related_data(detailed_movies_batch)
-
-        # Update and save the run log after each batch
-        for _, tmdb_id in batch:
-            completed_tmdb_ids.add(tmdb_id)
-        run_log['completed_tmdb_ids'] = list(completed_tmdb_ids)
-        save_run_log(run_log)
-        logger.info(f"--- Finished Batch {current_batch_num}/{total_batches}. Progress saved. ---")
+            in_flight = {}
+
+            def submit_more():
+                while len(in_flight) < max_in_flight:
+                    # Retries that are due take precedence over new movies
+                    ready = retry_queue.pop_ready()
+                    if ready:
+                        movie, attempt = ready
+                    else:
+                        movie = next(pending_movies, None)
+                        if movie is None:
+                            return
+                        attempt = 0
+                    internal_uuid, tmdb_id = movie
+                    future = executor.submit(fetch_movie_details_wrapper, internal_uuid, tmdb_id)
+                    in_flight[future] = (movie, attempt)
+
+            submit_more()
+            while in_flight or len(retry_queue):
+                if not in_flight:
+                    time.sleep(retry_queue.seconds_until_ready())
+                    submit_more()
+                    continue
+
+                done, _ = wait(in_flight, timeout=retry_queue.seconds_until_ready() or None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    movie, attempt = in_flight.pop(future)
+                    tmdb_id = movie[1]
+                    try:
+                        details = future.result()
+                        if details:
+                            if lease_book and lease_book.needs_replace(tmdb_id):
+                                details.replace_existing = True
+                            put_result(results_queue, details, writer_threads, writer_errors)
+                            fetched_count += 1
+                        else:
+                            # Not found, or replay without a cached response: fetching again cannot help
+                            checkpoint.mark_failed([tmdb_id], permanent=True)
+                    except WriterFailedError:
+                        raise
+                    except RetryableFetchError as e:
+                        if retry_queue.push(movie, attempt, e.retry_after):
+                            logger.warning(f"{e}. Retry {attempt + 1}/{max_retries} scheduled.")
+                            continue
+                        logger.error(f"{e}. Not retried again in this run (attempts: {attempt + 1}, queued retries: {len(retry_queue)}).")
+                        checkpoint.mark_failed([tmdb_id])
+                    except Exception as e:
+                        logger.error(f"Error processing movie TMDB ID {tmdb_id}: {e}")
+                        checkpoint.mark_failed([tmdb_id])
+
+                submit_more()
+                METRICS.set_queue_depth('results', results_queue.qsize())
+                METRICS.set_queue_depth('retry', len(retry_queue))
+                METRICS.set_queue_depth('in_flight', len(in_flight))
+                METRICS.set_checkpoint_lag(fetched_count - checkpoint.settled_count)
+    except WriterFailedError as e:
+        # Movies still queued or in flight were never checkpointed and are fetched again on the next run
+        logger.error(f"[DB] {e}. Aborting the run.")
+        writer_failed = True
+    finally:
+        stop_db_writers(results_queue, writer_threads)
+        if bulk_started:
+            restore_bulk_load_schema(bulk_schema, logger)
+        if lease_manager:
+            # Ranges still held (interrupted run) are handed back right away instead of waiting for expiry
+            lease_manager.close()
+        HTTP_SESSION.close()
+        DB_POOL.close()
+        METRICS.set_checkpoint_lag(0)
+        METRICS.close()
+
+    if writer_failed:
+        if RESPONSE_CACHE:
+            RESPONSE_CACHE.close()
+        checkpoint_store.close()
+        sys.exit(1)
 
     logger.info("===================================")
+    if RESPONSE_CACHE:
+        logger.info(f"[CACHE] {RESPONSE_CACHE.hits} hits, {RESPONSE_CACHE.misses} misses, {RESPONSE_CACHE.total_bytes / 1024 ** 2:.0f} MB on disk.")
+        RESPONSE_CACHE.close()
     logger.info("All processing complete!")
-    logger.info(f"Total movies updated: {len(completed_tmdb_ids)}")
+    logger.info(f"Fetched {fetched_count} movies in this run.")
+    logger.info(f"Total movies updated: {len(checkpoint_store)}")
+    if lease_book:
+        logger.info(f"[LEASE] This node completed {lease_book.completed} ranges and handed back {lease_book.released} with failures.")
+        if lease_book.rejected:
+            logger.warning(f"[LEASE] {lease_book.rejected} movies failed permanently and were recorded in the \"FailedIds\" of their completed ranges.")
+        if lease_manager.lost_leases:
+            logger.warning(f"[LEASE] {lease_manager.lost_leases} ranges expired while held and were reclaimed by other nodes.")
+    if checkpoint.failed_tmdb_ids:
+        logger.warning(f"{len(checkpoint.failed_tmdb_ids)} movies could not be fetched or saved and were not checkpointed.")
+    elif REFRESH_MODE:
+        # The next "--since last" run starts from the day this one started, so nothing slips between runs
+        checkpoint_store.set_meta('last_incremental_sync', sync_started_on.isoformat())
+        logger.info(f"[SYNC] Incremental sync complete. Recorded {sync_started_on} for the next '--since last' run.")
+    if CACHE_INVALIDATOR:
+        if CACHE_INVALIDATOR.warm_top_k:
+            warmed = CACHE_INVALIDATOR.warm()
+            logger.info(f"[API-CACHE] Pre-warmed {warmed} of the most popular changed movies through {api_url}.")
+        logger.info(f"[API-CACHE] Invalidated {CACHE_INVALIDATOR.invalidated} movies ({CACHE_INVALIDATOR.deleted} cached entries deleted, {CACHE_INVALIDATOR.errors} errors).")
+        CACHE_INVALIDATOR.close()
     logger.info("===================================")
+    if PROFILER.enabled:
+        log_profile_summary()
+    checkpoint_store.close()
 
 
 if __name__ == '__main__':
@@ -339,7 +1267,7 @@ if __name__ == '__main__':
         '--batch-size',
         type=int,
         default=25,
-        help='The number of movies to process in each batch. Default is 25.'
+        help='The number of movies each DB writer saves per flush. Default is 25.'
     )
     parser.add_argument(
         '--workers',
@@ -347,6 +1275,212 @@ if __name__ == '__main__':
         default=20,
         help='The number of parallel workers for fetching movie details. Default is 20. Recommended: 10-20 for optimal performance.'
     )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=None,
+        help='The number of keep-alive HTTP connections kept open to TMDB. Default is the number of workers.'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        default=40.0,
+        help='Global ceiling for TMDB requests per second across all workers. Lowered automatically on 429/5xx responses. Default is 40.'
+    )
+    parser.add_argument(
+        '--max-retries',
+        type=int,
+        default=5,
+        help='How many times a movie is retried after 429, 5xx or network errors before it is left for the next run. Default is 5.'
+    )
+    parser.add_argument(
+        '--retry-queue-size',
+        type=int,
+        default=1000,
+        help='Maximum number of movies waiting for a retry at once. Default is 1000.'
+    )
+    parser.add_argument(
+        '--writers',
+        type=int,
+        default=1,
+        help='The number of DB writer threads saving fetched movies while fetching continues. Default is 1.'
+    )
+    parser.add_argument(
+        '--flush-interval',
+        type=float,
+        default=5.0,
+        help='Maximum seconds a DB writer holds a partial batch before flushing it. Default is 5.'
+    )
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=None,
+        help='Maximum number of fetched movies waiting for a DB writer. Default is batch-size * writers * 2.'
+    )
+    parser.add_argument(
+        '--commit-every',
+        type=int,
+        default=1,
+        help='Number of flushes each DB writer groups into one transaction. A partial transaction is committed '
+             'after --flush-interval seconds, and a failing flush only costs its own bad movies. Default is 1.'
+    )
+    parser.add_argument(
+        '--synchronous-commit',
+        choices=['on', 'off'],
+        default='on',
+        help='PostgreSQL synchronous_commit of the DB writer sessions. With "off" commits do not wait for the WAL '
+             'flush; a durable commit every 2s confirms them before they are checkpointed. Default is on.'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not read or write the on-disk TMDB response cache.'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        type=Path,
+        default=RESPONSE_CACHE_DIR,
+        help=f'Directory of the on-disk TMDB response cache. Default is {RESPONSE_CACHE_DIR}.'
+    )
+    parser.add_argument(
+        '--cache-max-gb',
+        type=float,
+        default=20.0,
+        help='Size budget of the response cache; least recently used responses are evicted beyond it. Default is 20.'
+    )
+    parser.add_argument(
+        '--cache-ttl-days',
+        type=float,
+        default=30.0,
+        help='Cached responses older than this are refetched. 0 disables expiry. Default is 30.'
+    )
+    parser.add_argument(
+        '--replay',
+        action='store_true',
+        help='Rebuild related data from the response cache only, without touching the network. The link rows of every replayed movie are replaced, never duplicated. Movies already in the checkpoint are skipped.'
+    )
+    parser.add_argument(
+        '--since',
+        type=str,
+        default=None,
+        help='Incremental mode: refetch only catalog movies TMDB reports as changed since this date (YYYY-MM-DD, or "last" for the previous successful sync) and replace all of their related data.'
+    )
+    parser.add_argument(
+        '--db-pool-size',
+        type=int,
+        default=None,
+        help='Maximum number of pooled database connections. Default is writers + 1.'
+    )
+    parser.add_argument(
+        '--bulk-initial-load',
+        action='store_true',
+        help='First load into the people and link tables: drop the secondary indexes and foreign keys of those still empty during the run and rebuild them in parallel at the end. Tables that already hold rows, such as the genre, keyword and company links written by insert_data_to_db.py, keep theirs. An interrupted load is restored on the next start.'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='Serve Prometheus metrics on this port (the ingestion scrape job expects 9108). Requires prometheus-client. Default is off.'
+    )
+    parser.add_argument(
+        '--pushgateway',
+        type=str,
+        default=None,
+        help='Push Prometheus metrics to this Pushgateway (host:port, localhost:9091 with docker-compose.telemetry.yml) every 15 seconds and at the end of the run. Default is off.'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Record wall and CPU time per stage (rate-limit wait, HTTP, JSON decode, row building, inserts, checkpoint) per flush and print a summary at the end.'
+    )
+    parser.add_argument(
+        '--profile-window',
+        type=parse_window,
+        default=None,
+        help='With --profile, also capture flushes START:END (1-based, e.g. 10:20) with --profile-mode. Default is none.'
+    )
+    parser.add_argument(
+        '--profile-mode',
+        type=str,
+        choices=['cprofile', 'sample'],
+        default='cprofile',
+        help='"cprofile" writes a .pstats file of the DB writer thread; "sample" writes wall-clock stack samples of all threads in folded format for flamegraph.pl/speedscope. Default is cprofile.'
+    )
+    parser.add_argument(
+        '--profile-dir',
+        type=Path,
+        default=PROFILE_DIR,
+        help=f'Directory for the per-flush stage breakdown and captured profiles. Default is {PROFILE_DIR}.'
+    )
+    parser.add_argument(
+        '--leases',
+        action='store_true',
+        help='Share the work with other processes/hosts through the IngestionLeases table: claim TmdbId ranges with a heartbeat, and reclaim ranges of crashed nodes once their lease expires.'
+    )
+    parser.add_argument(
+        '--lease-size',
+        type=int,
+        default=500,
+        help='Movies per leased range, used when the ranges of a job are first created. Default is 500.'
+    )
+    parser.add_argument(
+        '--lease-seconds',
+        type=float,
+        default=300.0,
+        help='Lease duration in seconds; leases are renewed every third of it and can be reclaimed once expired. Default is 300.'
+    )
+    parser.add_argument(
+        '--lease-job',
+        type=str,
+        default='related-data',
+        help='Name of the set of ranges shared by the cooperating processes. Default is related-data.'
+    )
+    parser.add_argument(
+        '--lease-reset',
+        action='store_true',
+        help='Delete the ranges of --lease-job before starting, to go over the whole catalog again. Run it on one node only.'
+    )
+    parser.add_argument(
+        '--min-popularity',
+        type=float,
+        default=None,
+        help='Only enrich movies whose TMDB popularity is at least this value. Default is no cutoff.'
+    )
+    parser.add_argument(
+        '--top-n',
+        type=int,
+        default=None,
+        help='Only enrich the N most popular movies of the catalog (already processed ones are skipped). Default is all.'
+    )
+    parser.add_argument(
+        '--invalidate-cache',
+        action='store_true',
+        help="Invalidate the API's cached GetMovieDetail entries of every committed movie in Redis and notify the API instances to drop their in-memory copies."
+    )
+    parser.add_argument(
+        '--redis',
+        type=str,
+        default=ENV_VARS.get('REDIS_CONNECTION_STRING', 'localhost:6379'),
+        help='Redis used by the API, as "host:port[,password=...]" or a redis:// URL. Default is REDIS_CONNECTION_STRING from .env, else localhost:6379.'
+    )
+    parser.add_argument(
+        '--warm-top-k',
+        type=int,
+        default=0,
+        help='With --invalidate-cache, request the K most popular changed movies from the API at the end of the run to pre-warm its cache. Default is 0 (off).'
+    )
+    parser.add_argument(
+        '--api-url',
+        type=str,
+        default=ENV_VARS.get('API_URL', 'http://localhost:5000'),
+        help='Base URL of the API used by --warm-top-k. Default is API_URL from .env, else http://localhost:5000.'
+    )
+    parser.add_argument(
+        '--credits-only',
+        action='store_true',
+        help='Only append credits to the movie details request, for catalogs whose genres, keywords and companies were linked by insert_data_to_db.py. '
+             'Much smaller responses; keywords, videos and images are not fetched and never replaced. Uses its own response cache namespace.'
+    )
     parser.add_argument(
         '--db',
         type=str,
@@ -359,4 +1493,11 @@ if __name__ == '__main__':
     # Set global DB_CONFIG based on database type
     DB_CONFIG = get_db_config(args.db)
 
-    main(args.batch_size, args.workers)
+    main(args.batch_size, args.workers, args.pool_size, args.rate_limit, args.max_retries, args.retry_queue_size,
+         args.writers, args.flush_interval, args.queue_size,
+         not args.no_cache, args.cache_dir, args.cache_max_gb, args.cache_ttl_days, args.replay, args.since,
+         args.db_pool_size, args.bulk_initial_load, args.metrics_port, args.pushgateway,
+         args.profile, args.profile_window, args.profile_mode, args.profile_dir,
+         args.leases, args.lease_size, args.lease_seconds, args.lease_job, args.lease_reset,
+         args.min_popularity, args.top_n, args.invalidate_cache, args.redis, args.warm_top_k, args.api_url,
+         args.commit_every, args.synchronous_commit == 'on', args.credits_only)
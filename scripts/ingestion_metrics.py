@@ -0,0 +1,118 @@
+import threading
+from typing import Optional
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, push_to_gateway, start_http_server
+except ImportError:  # prometheus_client is optional; metrics are then a no-op
+    CollectorRegistry = None
+
+# Seconds between pushes when a Pushgateway is used instead of scraping
+PUSH_INTERVAL = 15.0
+
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+FLUSH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+FLUSH_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class IngestionMetrics:
+    """
+    Prometheus metrics shared by the ingestion scripts: TMDB request counts and latency by status,
+    rate-limit waits, queue depths, DB flush size and duration, rows written per table and checkpoint lag.
+    Every method is a cheap no-op unless enable() was called and prometheus_client is installed,
+    so the scripts can record unconditionally.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._push_stop = threading.Event()
+        self._push_thread = None
+
+    @staticmethod
+    def available() -> bool:
+        return CollectorRegistry is not None
+
+    def enable(self, service: str, port: Optional[int] = None, pushgateway: Optional[str] = None):
+        """
+        Creates the metrics and exposes them on http://0.0.0.0:<port>/metrics and/or pushes them to a Pushgateway.
+        Pushed metrics are grouped under job="cinesocial-ingestion" and the service label, matching the scrape job.
+        """
+        if not self.available():
+            raise RuntimeError("prometheus_client is not installed (pip install prometheus-client)")
+
+        self.registry = CollectorRegistry()
+        self.requests = Counter('cinesocial_ingestion_tmdb_requests_total', 'TMDB API requests by HTTP status',
+                                ['status'], registry=self.registry)
+        self.request_duration = Histogram('cinesocial_ingestion_tmdb_request_duration_seconds', 'TMDB API request latency by HTTP status',
+                                          ['status'], buckets=REQUEST_BUCKETS, registry=self.registry)
+        self.rate_limit_wait = Counter('cinesocial_ingestion_rate_limit_wait_seconds_total', 'Time spent waiting for the rate limiter',
+                                       registry=self.registry)
+        self.queue_depth = Gauge('cinesocial_ingestion_queue_depth', 'Items waiting in an internal queue',
+                                 ['queue'], registry=self.registry)
+        self.flush_size = Histogram('cinesocial_ingestion_db_flush_size', 'Movies per DB flush',
+                                    buckets=FLUSH_SIZE_BUCKETS, registry=self.registry)
+        self.flush_duration = Histogram('cinesocial_ingestion_db_flush_duration_seconds', 'Duration of a DB flush, commit included',
+                                        buckets=FLUSH_DURATION_BUCKETS, registry=self.registry)
+        self.rows_written = Counter('cinesocial_ingestion_rows_written_total', 'Rows written per table in committed transactions (conflicting rows included)',
+                                    ['table'], registry=self.registry)
+        self.movies_committed = Counter('cinesocial_ingestion_movies_committed_total', 'Movies committed and checkpointed',
+                                        registry=self.registry)
+        self.checkpoint_lag = Gauge('cinesocial_ingestion_checkpoint_lag', 'Fetched movies whose related data is not committed yet',
+                                    registry=self.registry)
+        self.enabled = True
+
+        if port:
+            start_http_server(port, registry=self.registry)
+        if pushgateway:
+            self._pushgateway = pushgateway
+            self._service = service
+            self._push_thread = threading.Thread(target=self._push_loop, name="metrics-push", daemon=True)
+            self._push_thread.start()
+
+    def _push(self):
+        try:
+            push_to_gateway(self._pushgateway, job='cinesocial-ingestion', registry=self.registry,
+                            grouping_key={'service': self._service})
+        except OSError:
+            # A Pushgateway outage must never stop an ingestion run
+            pass
+
+    def _push_loop(self):
+        while not self._push_stop.wait(PUSH_INTERVAL):
+            self._push()
+
+    def close(self):
+        """Stops the push loop after a final push, so the last values of the run are kept."""
+        if self._push_thread:
+            self._push_stop.set()
+            self._push_thread.join()
+            self._push()
+
+    def observe_request(self, status, seconds: float):
+        if self.enabled:
+            self.requests.labels(str(status)).inc()
+            self.request_duration.labels(str(status)).observe(seconds)
+
+    def observe_rate_limit_wait(self, seconds: float):
+        if self.enabled and seconds > 0:
+            self.rate_limit_wait.inc(seconds)
+
+    def set_queue_depth(self, queue: str, depth: int):
+        if self.enabled:
+            self.queue_depth.labels(queue).set(depth)
+
+    def observe_flush(self, movies: int, seconds: float):
+        if self.enabled:
+            self.flush_size.observe(movies)
+            self.flush_duration.observe(seconds)
+
+    def add_rows(self, table: str, rows: int):
+        if self.enabled and rows:
+            self.rows_written.labels(table).inc(rows)
+
+    def add_committed(self, movies: int):
+        if self.enabled and movies:
+            self.movies_committed.inc(movies)
+
+    def set_checkpoint_lag(self, movies: int):
+        if self.enabled:
+            self.checkpoint_lag.set(movies)
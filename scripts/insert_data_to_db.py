@@ -7,7 +7,26 @@ import logging
 import sys
 import os
 import argparse
+import hashlib
+import io
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from batch_bisect import write_with_bisect
+from bulk_load import BulkLoadSchema, restore_bulk_load_schema
+from checkpoint_store import ProgressStore
+from csv_input import COMPRESSED_SUFFIXES, CsvInput
+from db_pool import create_db_pool
+from ingestion_metrics import IngestionMetrics
+from movie_detail_cache import MovieDetailCacheInvalidator
+from name_index import TMDB_MOVIE_GENRES, NameIdIndex, read_seed_file
+from stage_profiler import StageProfiler, parse_window
+from tmdb_id_set import TmdbHashMap, TmdbIdSet
 
 # --- Main Logger Setup ---
 logger = logging.getLogger(__name__)
@@ -46,6 +65,9 @@ DATA_DIR = PROJECT_ROOT / "data"
 INFRASTRUCTURE_DIR = PROJECT_ROOT / "infrastructure"
 ENV_FILE = INFRASTRUCTURE_DIR / ".env"
 CSV_FILE_PATH = DATA_DIR / "TMDB_movie_dataset_v11.csv"
+BULK_LOAD_SNAPSHOT_PATH = SCRIPT_DIR / "bulk_load_snapshot_movies.json"
+LOAD_PROGRESS_PATH = SCRIPT_DIR / "csv_load_progress.sqlite3"
+PROFILE_DIR = SCRIPT_DIR / "profiles"
 
 # Load .env file
 def load_env_file(env_path: Path):
@@ -117,21 +139,30 @@ def get_db_config(db_type: str = 'local') -> dict:
 # Global DB_CONFIG will be set in main
 DB_CONFIG = None
 
-def get_db_connection():
-    """PostgreSQL connection"""
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        raise
+# Shared DB connection pool, created in process_csv_and_insert
+DB_POOL = None
+
+# Prometheus metrics; a no-op unless enabled with --metrics-port or --pushgateway
+METRICS = IngestionMetrics()
+
+# Per-stage timing; a no-op unless enabled with --profile
+PROFILER = StageProfiler()
+
+# Invalidates the API's cached details of movies changed by --refresh (None unless --invalidate-cache)
+CACHE_INVALIDATOR: Optional[MovieDetailCacheInvalidator] = None
 
-def get_existing_tmdb_ids(cursor) -> set:
-    """Get all existing TMDB IDs from database"""
+# Resolves the CSV's genre/keyword/company names into link rows (None with --skip-links)
+LINKS: Optional['MovieLinkCollector'] = None
+
+# Tables whose secondary indexes and foreign keys are deferred by --bulk-initial-load.
+# The unique TmdbId index stays: duplicate detection relies on it.
+BULK_LOAD_TABLES = ("Movies",)
+
+def get_existing_tmdb_ids(conn) -> TmdbIdSet:
+    """Get all existing TMDB IDs from database, streamed into a compact sorted id set"""
     logger.info("Fetching existing movie TMDB IDs from the database...")
-    cursor.execute('SELECT "TmdbId" FROM "Movies"')
-    existing_ids = {row[0] for row in cursor.fetchall()}
-    logger.info(f"Found {len(existing_ids)} existing movies.")
+    existing_ids = TmdbIdSet.from_query(conn, 'SELECT "TmdbId" FROM "Movies"')
+    logger.info(f"Found {len(existing_ids)} existing movies ({existing_ids.memory_bytes() / 1024 ** 2:.1f} MB).")
     return existing_ids
 
 def safe_int(value, default=0):
@@ -160,10 +191,51 @@ def safe_date(value):
     except ValueError:
         return None
 
-def execute_insert_batch(conn, cursor, movies_to_insert):
+MOVIE_COLUMNS = (
+    "Id", "TmdbId", "Title", "OriginalTitle", "Overview", "ReleaseDate",
+    "Runtime", "Budget", "Revenue", "PosterPath", "BackdropPath",
+    "ImdbId", "OriginalLanguage", "Popularity", "VoteAverage", "VoteCount",
+    "Status", "Tagline", "Homepage", "Adult", "IsDeleted", "CreatedAt", "UpdatedAt"
+)
+
+def build_movie_values(row: dict, tmdb_id: int) -> tuple:
+    """Converts a CSV row into the value tuple for the "Movies" table (same order as MOVIE_COLUMNS)."""
+    now = datetime.now(timezone.utc)
+    return (
+        str(uuid.uuid4()), tmdb_id, row.get('title'), row.get('original_title'),
+        row.get('overview'), safe_date(row.get('release_date')), safe_int(row.get('runtime')),
+        safe_int(row.get('budget')), safe_int(row.get('revenue')), row.get('poster_path'),
+        row.get('backdrop_path'), row.get('imdb_id'), row.get('original_language'),
+        safe_float(row.get('popularity')), safe_float(row.get('vote_average')),
+        safe_int(row.get('vote_count')), row.get('status'), row.get('tagline'),
+        row.get('homepage'), safe_bool(row.get('adult')), False,
+        now, now
+    )
+
+def log_throughput(label: str, rows: int, started_at: float):
+    """Logs the number of rows written and the resulting rows/sec."""
+    elapsed = max(time.perf_counter() - started_at, 1e-9)
+    logger.info(f"[{label}] {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)")
+
+def log_failed_movie(movie_data: tuple, error: Exception):
+    """Records a movie row that could not be inserted even on its own."""
+    tmdb_id = movie_data[1]
+    title = movie_data[2]
+    error_logger.error(f"Failed to insert movie: TMDB_ID={tmdb_id}, Title='{title}'. Reason: {error}")
+    error_logger.error(f"Full data: {movie_data}")
+
+def count_link_rows(rows, link_counts: Optional[Dict[str, int]]):
+    """on_commit callback of write_with_bisect: records the link rows written along with the movies."""
+    for table, count in (link_counts or {}).items():
+        METRICS.add_rows(table, count)
+
+def execute_insert_batch(conn, cursor, movies_to_insert, stats: dict):
     """
     Executes the batch insert for the provided list of movies.
-    If the batch fails, it falls back to inserting movies one by one to identify and log the problematic rows.
+    If the batch fails, it is split in half recursively until the problematic rows are isolated and logged,
+    so a few bad rows cost O(k log n) round trips instead of one per row.
+    Movies whose TmdbId is already in the database are skipped by ON CONFLICT and counted in stats['skipped'],
+    which lets a resumed load re-send the rows of its last uncheckpointed batch instead of preloading every id.
     """
     if not movies_to_insert:
         return 0
@@ -174,105 +246,762 @@ def execute_insert_batch(conn, cursor, movies_to_insert):
             "Runtime", "Budget", "Revenue", "PosterPath", "BackdropPath",
             "ImdbId", "OriginalLanguage", "Popularity", "VoteAverage", "VoteCount",
             "Status", "Tagline", "Homepage", "Adult", "IsDeleted", "CreatedAt", "UpdatedAt"
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ) VALUES %s
+        ON CONFLICT ("TmdbId") DO NOTHING
+        RETURNING 1
     '''
-    
-    try:
-        logger.info(f"Attempting to insert a batch of {len(movies_to_insert)} movies...")
-        psycopg2.extras.execute_batch(cursor, insert_query, movies_to_insert)
+    inserted_count = 0
+
+    def insert_rows(rows):
+        with PROFILER.stage('execute_values'):
+            inserted = psycopg2.extras.execute_values(cursor, insert_query, rows, page_size=len(rows), fetch=True)
+        link_counts = None
+        if LINKS:
+            with PROFILER.stage('link_rows'):
+                link_counts = LINKS.write(cursor, rows)
+        return len(inserted), link_counts
+
+    def count_inserted(rows, result):
+        nonlocal inserted_count
+        inserted_count += result[0]
+        count_link_rows(rows, result[1])
+
+    logger.info(f"Attempting to insert a batch of {len(movies_to_insert)} movies...")
+    # A dropped connection is re-raised so the caller can retry the batch on a fresh connection
+    committed = write_with_bisect(
+        conn,
+        movies_to_insert,
+        insert_rows,
+        log_failed_movie,
+        on_commit=count_inserted
+    )
+    stats['skipped'] += len(committed) - inserted_count
+
+    if len(committed) == len(movies_to_insert):
+        logger.info(f"Successfully inserted batch of {inserted_count} movies"
+                    + (f" ({len(committed) - inserted_count} already existed)." if inserted_count < len(committed) else "."))
+    else:
+        logger.warning(f"Finished processing failed batch: {inserted_count} inserted, {len(movies_to_insert) - len(committed)} failed and logged.")
+    return inserted_count
+
+def write_batch(movies_to_insert, stats: dict) -> int:
+    """Inserts one batch on a pooled connection, retrying once on a fresh connection if the current one dropped."""
+    flush_started = time.monotonic()
+    for attempt in range(2):
+        conn = DB_POOL.acquire()
+        cursor = conn.cursor()
+        try:
+            inserted = execute_insert_batch(conn, cursor, movies_to_insert, stats)
+            METRICS.observe_flush(len(movies_to_insert), time.monotonic() - flush_started)
+            METRICS.add_rows("Movies", inserted)
+            METRICS.add_committed(inserted)
+            return inserted
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if attempt or not conn.closed:
+                raise
+            logger.warning(f"[DB] Connection dropped during batch insert ({e}). Retrying on a fresh connection.")
+        finally:
+            cursor.close()
+            DB_POOL.release(conn)
+
+# --- COPY Bulk Load ---
+
+def _copy_escape(value) -> str:
+    """Formats a single value for PostgreSQL's COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    return (text.replace('\\', '\\\\')
+                .replace('\t', '\\t')
+                .replace('\n', '\\n')
+                .replace('\r', '\\r'))
+
+class CopyRowStream(io.TextIOBase):
+    """
+    File-like object that lazily renders row tuples in COPY text format.
+    Lets copy_expert stream an arbitrarily large row generator without materialising it.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ''
+        self.row_count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += '\t'.join(_copy_escape(v) for v in row) + '\n'
+            self.row_count += 1
+
+        if size < 0:
+            chunk, self._buffer = self._buffer, ''
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+def execute_copy_load(conn, cursor, movie_rows) -> int:
+    """
+    Streams movie rows into a temporary staging table with COPY FROM STDIN and merges them
+    into "Movies" with a single set-based INSERT ... SELECT ... ON CONFLICT ("TmdbId") DO NOTHING.
+    The link rows spooled while the rows were streamed are merged in the same transaction.
+    Returns the number of rows actually inserted into "Movies".
+    """
+    column_list = ', '.join(f'"{c}"' for c in MOVIE_COLUMNS)
+
+    cursor.execute('CREATE TEMP TABLE "MoviesStaging" (LIKE "Movies" INCLUDING DEFAULTS) ON COMMIT DROP')
+
+    stream = CopyRowStream(movie_rows)
+    copy_started_at = time.perf_counter()
+    cursor.copy_expert(f'COPY "MoviesStaging" ({column_list}) FROM STDIN', stream, size=1 << 16)
+    log_throughput("COPY", stream.row_count, copy_started_at)
+
+    merge_started_at = time.perf_counter()
+    cursor.execute(f'''
+        INSERT INTO "Movies" ({column_list})
+        SELECT {column_list} FROM "MoviesStaging"
+        ON CONFLICT ("TmdbId") DO NOTHING
+    ''')
+    inserted = cursor.rowcount
+    link_counts = LINKS.write_spooled(cursor) if LINKS else {}
+    conn.commit()
+    log_throughput("MERGE", inserted, merge_started_at)
+    count_link_rows(None, link_counts)
+
+    logger.info(f"Staged {stream.row_count} rows, merged {inserted} new movies into \"Movies\".")
+    return inserted
+
+# --- Refresh (content-hash change detection) ---
+
+# One 64-bit hash per movie of the CSV fields it was last loaded with, so a refresh only writes changed rows
+CREATE_CONTENT_HASHES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS "MovieContentHashes" (
+        "TmdbId" integer NOT NULL,
+        "ContentHash" bigint NOT NULL,
+        CONSTRAINT "PK_MovieContentHashes" PRIMARY KEY ("TmdbId")
+    )
+'''
+
+# Columns covered by the hash: everything the CSV provides, i.e. all but "Id", "IsDeleted" and the timestamps
+HASHED_COLUMNS = slice(MOVIE_COLUMNS.index("TmdbId"), MOVIE_COLUMNS.index("IsDeleted"))
+
+# Columns a refresh overwrites on existing movies; "Id", "CreatedAt" and the soft-delete flag are kept
+REFRESHED_COLUMNS = tuple(c for c in MOVIE_COLUMNS if c not in ("Id", "TmdbId", "IsDeleted", "CreatedAt"))
+
+def content_hash(movie_values: tuple) -> int:
+    """64-bit BLAKE2b hash of the CSV-provided fields of a "Movies" value tuple, as a signed bigint."""
+    text = '\x1f'.join('\x00' if v is None else str(v) for v in movie_values[HASHED_COLUMNS])
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+def get_content_hashes(conn) -> TmdbHashMap:
+    """Creates the hash table if needed and loads every stored hash into a compact sorted map."""
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_CONTENT_HASHES_TABLE)
+    conn.commit()
+    logger.info("[REFRESH] Fetching stored content hashes from the database...")
+    hashes = TmdbHashMap.from_query(conn, 'SELECT "TmdbId", "ContentHash" FROM "MovieContentHashes" ORDER BY "TmdbId"')
+    logger.info(f"[REFRESH] Found {len(hashes)} content hashes ({hashes.memory_bytes() / 1024 ** 2:.1f} MB).")
+    return hashes
+
+def iter_refresh_rows(movie_rows, existing_tmdb_ids: TmdbIdSet, stored_hashes: TmdbHashMap, stats: dict):
+    """
+    Yields "Movies" value tuples extended with their content hash, for new movies and for existing movies
+    whose CSV fields differ from the last load. Unchanged movies are counted and never reach the database.
+    """
+    for movie_values in movie_rows:
+        tmdb_id = movie_values[1]
+        row_hash = content_hash(movie_values)
+        if tmdb_id in existing_tmdb_ids:
+            if stored_hashes.get(tmdb_id) == row_hash:
+                stats['unchanged'] += 1
+                if LINKS:
+                    LINKS.discard([movie_values])
+                continue
+            stats['changed'] += 1
+        yield movie_values + (row_hash,)
+
+def execute_refresh_batch(cursor, refresh_rows) -> Tuple[int, list]:
+    """
+    Writes a batch of refresh rows set-based: COPY into a staging table, one UPDATE ... FROM for the movies
+    that exist, one INSERT ... SELECT for the new ones and one upsert of all their content hashes.
+    Returns the number of inserted movies and the ("Id", "Popularity") of the updated ones. The caller commits.
+    """
+    column_list = ', '.join(f'"{c}"' for c in MOVIE_COLUMNS)
+    assignments = ', '.join(f'"{c}" = s."{c}"' for c in REFRESHED_COLUMNS)
+
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS "MoviesRefreshStaging" (LIKE "Movies", "ContentHash" bigint NOT NULL) ON COMMIT DELETE ROWS')
+    with PROFILER.stage('copy_staging'):
+        cursor.copy_expert(f'COPY "MoviesRefreshStaging" ({column_list}, "ContentHash") FROM STDIN', CopyRowStream(refresh_rows), size=1 << 16)
+    with PROFILER.stage('update_from'):
+        cursor.execute(f'''
+            UPDATE "Movies" m SET {assignments}
+            FROM "MoviesRefreshStaging" s
+            WHERE m."TmdbId" = s."TmdbId"
+            RETURNING m."Id", m."Popularity"
+        ''')
+        updated = cursor.fetchall()
+    with PROFILER.stage('insert_select'):
+        cursor.execute(f'''
+            INSERT INTO "Movies" ({column_list})
+            SELECT {column_list} FROM "MoviesRefreshStaging"
+            ON CONFLICT ("TmdbId") DO NOTHING
+        ''')
+        inserted = cursor.rowcount
+        cursor.execute('''
+            INSERT INTO "MovieContentHashes" ("TmdbId", "ContentHash")
+            SELECT "TmdbId", "ContentHash" FROM "MoviesRefreshStaging"
+            ON CONFLICT ("TmdbId") DO UPDATE SET "ContentHash" = EXCLUDED."ContentHash"
+        ''')
+    return inserted, updated
+
+def write_refresh_batch(refresh_rows, stats: dict) -> int:
+    """
+    Writes one batch of new and changed movies on a pooled connection, bisecting failures and retrying
+    once on a fresh connection like write_batch. Adds the updated movies to stats; returns the inserted count.
+    """
+    flush_started = time.monotonic()
+    committed = {'inserted': 0, 'updated': 0}
+
+    def count_committed(rows, result):
+        (inserted, updated), link_counts = result
+        count_link_rows(rows, link_counts)
+        committed['inserted'] += inserted
+        committed['updated'] += len(updated)
+        METRICS.add_rows("MovieContentHashes", len(rows))
+        if CACHE_INVALIDATOR and updated:
+            with PROFILER.stage('cache_invalidate'):
+                CACHE_INVALIDATOR.invalidate(updated)
+
+    for attempt in range(2):
+        conn = DB_POOL.acquire()
+        cursor = conn.cursor()
+        try:
+            logger.info(f"Attempting to write a refresh batch of {len(refresh_rows)} new or changed movies...")
+            write_with_bisect(conn, refresh_rows,
+                              lambda rows: (execute_refresh_batch(cursor, rows), LINKS.write(cursor, rows) if LINKS else None),
+                              log_failed_movie, on_commit=count_committed)
+            written = committed['inserted'] + committed['updated']
+            METRICS.observe_flush(len(refresh_rows), time.monotonic() - flush_started)
+            METRICS.add_rows("Movies", written)
+            METRICS.add_committed(written)
+            stats['updated'] += committed['updated']
+            return committed['inserted']
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if attempt or not conn.closed:
+                raise
+            logger.warning(f"[DB] Connection dropped during refresh batch ({e}). Retrying on a fresh connection.")
+        finally:
+            cursor.close()
+            DB_POOL.release(conn)
+
+# --- Link Rows (genres, keywords, production companies) ---
+
+# CSV name-list column -> (dimension table, its "Name" length, link table, link column)
+CSV_LINKS = {
+    'genres': ("Genres", 100, "MovieGenres", "GenreId"),
+    'keywords': ("Keywords", 200, "MovieKeywords", "KeywordId"),
+    'production_companies': ("ProductionCompanies", 200, "MovieProductionCompanies", "ProductionCompanyId"),
+}
+
+def parse_seed_file_arg(value: str) -> Tuple[str, Path]:
+    """Parses --seed-names COLUMN=PATH."""
+    column, _, path = value.partition('=')
+    if column not in CSV_LINKS or not path:
+        raise argparse.ArgumentTypeError(f"expected COLUMN=PATH with COLUMN one of {', '.join(CSV_LINKS)}, got {value!r}")
+    return column, Path(path)
+
+def load_name_indexes(conn, seed_files: Dict[str, Path]) -> Dict[str, NameIdIndex]:
+    """
+    Seeds the dimension tables (TMDB's fixed genre list, plus any --seed-names export) and loads a
+    name index per CSV name-list column. Seeding only inserts missing TmdbIds, so it is safe to repeat.
+    """
+    indexes = {}
+    for column, (table, name_length, _, _) in CSV_LINKS.items():
+        index = NameIdIndex(table, name_length)
+        seeded = index.seed(conn, TMDB_MOVIE_GENRES.items()) if column == 'genres' else 0
+        if column in seed_files:
+            seeded += index.seed(conn, read_seed_file(seed_files[column]))
         conn.commit()
-        logger.info(f"Successfully inserted batch of {len(movies_to_insert)} movies.")
-        return len(movies_to_insert)
-    except psycopg2.Error as e:
-        conn.rollback()
-        logger.warning(f"Batch insert failed: {e}. Switching to single-insert mode for this batch.")
-        
-        successful_in_batch = 0
-        for movie_data in movies_to_insert:
-            try:
-                cursor.execute(insert_query, movie_data)
-                conn.commit()
-                successful_in_batch += 1
-            except psycopg2.Error as single_e:
-                conn.rollback()
-                tmdb_id = movie_data[1]
-                title = movie_data[2]
-                error_logger.error(f"Failed to insert movie: TMDB_ID={tmdb_id}, Title='{title}'. Reason: {single_e}")
-                error_logger.error(f"Full data: {movie_data}")
-
-        logger.info(f"Finished processing failed batch: {successful_in_batch} inserted, {len(movies_to_insert) - successful_in_batch} failed and logged.")
-        return successful_in_batch
-
-def process_csv_and_insert(batch_size: int):
-    """Reads the movie dataset from CSV and inserts new movies into the database in batches."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+        index.load(conn)
+        logger.info(f"[LINKS] {table}: {len(index)} names ({seeded} seeded, {index.ambiguous} shared by several TMDB ids).")
+        if not len(index):
+            logger.warning(f"[LINKS] {table} is empty, so the '{column}' column cannot be resolved. Pass --seed-names {column}=<TMDB id export>.")
+        indexes[column] = index
+    return indexes
+
+class MovieLinkCollector:
+    """
+    Resolves the genre, keyword and production company names of the CSV rows being loaded into link
+    rows. They are held per movie until the batch containing the movie is written (write, then discard),
+    or, for --mode copy, spooled to a temporary file and merged after the movies (write_spooled).
+    Link rows are joined against "Movies" on insert, so movies that were skipped (duplicate TmdbId)
+    or refreshed in place (they keep their existing Id) get none.
+    """
+
+    def __init__(self, indexes: Dict[str, NameIdIndex], spool: bool = False):
+        self.indexes = indexes
+        self._links = {}  # movie Id -> one list of dimension ids per CSV_LINKS column
+        self._spool = tempfile.TemporaryFile('w+', encoding='utf-8') if spool else None
+
+    def add(self, movie_id: str, names: tuple):
+        """Registers a movie with its CSV name-list cells (in CSV_LINKS order)."""
+        links = tuple(self.indexes[column].resolve(cell) if cell else [] for column, cell in zip(CSV_LINKS, names))
+        if self._spool is None:
+            self._links[movie_id] = links
+            return
+        for n, dimension_ids in enumerate(links):
+            for dimension_id in dimension_ids:
+                self._spool.write(f"{n}\t{movie_id}\t{dimension_id}\n")
+
+    def discard(self, movie_rows):
+        for movie_values in movie_rows:
+            self._links.pop(movie_values[0], None)
+
+    def _insert_sql(self, n: int, source: str) -> str:
+        _, _, link_table, link_column = list(CSV_LINKS.values())[n]
+        return (f'INSERT INTO "{link_table}" ("MovieId", "{link_column}") SELECT s."MovieId", s."DimensionId" FROM {source} '
+                f'JOIN "Movies" m ON m."Id" = s."MovieId" ON CONFLICT DO NOTHING')
+
+    def write(self, cursor, movie_rows) -> Dict[str, int]:
+        """Inserts the link rows of movie_rows in the caller's transaction, one round trip for all tables. Returns rows sent per table."""
+        statements, counts = [], {}
+        for n, (_, _, link_table, _) in enumerate(CSV_LINKS.values()):
+            movie_ids, dimension_ids = [], []
+            for movie_values in movie_rows:
+                links = self._links.get(movie_values[0])
+                if links:
+                    movie_ids.extend([movie_values[0]] * len(links[n]))
+                    dimension_ids.extend(links[n])
+            if movie_ids:
+                source = cursor.mogrify('unnest(%s::uuid[], %s::integer[]) AS s("MovieId", "DimensionId")', (movie_ids, dimension_ids)).decode('utf-8')
+                statements.append(self._insert_sql(n, source))
+                counts[link_table] = len(movie_ids)
+        if statements:
+            cursor.execute('; '.join(statements))
+        return counts
+
+    def write_spooled(self, cursor) -> Dict[str, int]:
+        """COPYs the spooled link rows into a staging table and merges them. Returns rows inserted per table."""
+        self._spool.flush()
+        self._spool.seek(0)
+        cursor.execute('CREATE TEMP TABLE "MovieLinksStaging" ("Kind" smallint, "MovieId" uuid, "DimensionId" integer) ON COMMIT DROP')
+        cursor.copy_expert('COPY "MovieLinksStaging" FROM STDIN', self._spool, size=1 << 16)
+        counts = {}
+        for n, (_, _, link_table, _) in enumerate(CSV_LINKS.values()):
+            cursor.execute(self._insert_sql(n, f'(SELECT * FROM "MovieLinksStaging" WHERE "Kind" = {n}) s'))
+            counts[link_table] = cursor.rowcount
+        return counts
+
+    def unresolved(self) -> Dict[str, int]:
+        return {index.table: index.unresolved for index in self.indexes.values()}
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+
+# --- Parallel CSV Parsing ---
+
+def find_row_boundaries(path: Path, chunk_bytes: int, start_offset: int = 0) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Splits the CSV from start_offset (a row boundary, e.g. a resume offset) into byte ranges of roughly
+    chunk_bytes that start and end on row boundaries.
+    Quoted fields may contain newlines, so a newline only ends a row when it is preceded by an even
+    number of quote characters (RFC 4180 escapes quotes by doubling them, which keeps parity intact).
+    Returns the header field names and the list of (start, end) byte ranges.
+    """
+    file_size = path.stat().st_size
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+        fieldnames = next(csv.reader([header_line.decode('utf-8-sig')]))
+        if start_offset > f.tell():
+            f.seek(start_offset)
+        boundaries = [f.tell()]
+        quote_parity = 0
+        block_start = f.tell()
+        next_target = boundaries[0] + chunk_bytes
+
+        while next_target < file_size:
+            block = f.read(1 << 24)
+            if not block:
+                break
+            search_from = max(0, next_target - block_start)
+            while search_from < len(block):
+                newline = block.find(b'\n', search_from)
+                if newline < 0:
+                    break
+                if (quote_parity + block.count(b'"', 0, newline)) % 2 == 0:
+                    boundaries.append(block_start + newline + 1)
+                    next_target = boundaries[-1] + chunk_bytes
+                    search_from = max(newline + 1, next_target - block_start)
+                else:
+                    search_from = newline + 1
+            quote_parity = (quote_parity + block.count(b'"')) % 2
+            block_start += len(block)
+
+    if boundaries[-1] < file_size:
+        boundaries.append(file_size)
+    return fieldnames, list(zip(boundaries, boundaries[1:]))
+
+def _fast_int(value):
+    return int(value) if value and value.isdigit() else safe_int(value)
+
+def _fast_float(value):
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return safe_float(value)
+
+def _fast_date(value):
+    if value and len(value) == 10:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return safe_date(value)
+
+def parse_csv_chunk(task: Tuple[str, int, int, List[str], bool]) -> Tuple[List[tuple], int, Optional[List[tuple]]]:
+    """
+    Process-pool worker: parses one byte range of the CSV into "Movies" value tuples.
+    Type conversion runs column by column with fast paths (isdigit/fromisoformat) before the
+    exception-driven safe_* fallbacks. Returns the rows, the number of rows without a TMDB ID and,
+    if with_links is set, the CSV_LINKS name-list cells of each row.
+    """
+    path, start, end, fieldnames, with_links = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+
+    width = len(fieldnames)
+    records = [r + [None] * (width - len(r)) if len(r) < width else r for r in csv.reader(io.StringIO(text, newline=''))]
+    if not records:
+        return [], 0, [] if with_links else None
+
+    columns = dict(zip(fieldnames, zip(*records)))
+    column = lambda name: columns.get(name) or [None] * len(records)
+
+    tmdb_ids = [_fast_int(v) for v in column('id')]
+    release_dates = [_fast_date(v) for v in column('release_date')]
+    runtimes = [_fast_int(v) for v in column('runtime')]
+    budgets = [_fast_int(v) for v in column('budget')]
+    revenues = [_fast_int(v) for v in column('revenue')]
+    popularities = [_fast_float(v) for v in column('popularity')]
+    vote_averages = [_fast_float(v) for v in column('vote_average')]
+    vote_counts = [_fast_int(v) for v in column('vote_count')]
+    adults = [safe_bool(v) for v in column('adult')]
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    missing_ids = 0
+    link_cells = list(zip(*(column(name) for name in CSV_LINKS))) if with_links else None
+    link_names = [] if with_links else None
+    for i, (title, original_title, overview, poster_path, backdrop_path, imdb_id, original_language, status, tagline, homepage) in enumerate(zip(
+            column('title'), column('original_title'), column('overview'), column('poster_path'), column('backdrop_path'),
+            column('imdb_id'), column('original_language'), column('status'), column('tagline'), column('homepage'))):
+        if not tmdb_ids[i]:
+            missing_ids += 1
+            continue
+        if with_links:
+            link_names.append(link_cells[i])
+        rows.append((
+            str(uuid.uuid4()), tmdb_ids[i], title, original_title,
+            overview, release_dates[i], runtimes[i],
+            budgets[i], revenues[i], poster_path,
+            backdrop_path, imdb_id, original_language,
+            popularities[i], vote_averages[i],
+            vote_counts[i], status, tagline,
+            homepage, adults[i], False,
+            now, now
+        ))
+    return rows, missing_ids, link_names
+
+def iter_parsed_chunks(path: Path, parse_workers: int, chunk_bytes: int, start_offset: int = 0):
+    """
+    Parses the CSV from start_offset in a process pool and yields each chunk's rows, in file order, with
+    the chunk's start offset. At most 2 * parse_workers chunks are in flight, so a slow writer applies
+    backpressure to the parsers.
+    """
+    fieldnames, ranges = find_row_boundaries(path, chunk_bytes, start_offset)
+    logger.info(f"[PARSE] Split {path.name} into {len(ranges)} chunks for {parse_workers} parser processes.")
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        pending = deque()
+        tasks = iter(ranges)
+        for start, end in tasks:
+            pending.append(executor.submit(parse_csv_chunk, (str(path), start, end, fieldnames, LINKS is not None)))
+            if len(pending) >= parse_workers * 2:
+                break
+        for start, _ in ranges:
+            rows, missing_ids, link_names = pending.popleft().result()
+            next_task = next(tasks, None)
+            if next_task:
+                pending.append(executor.submit(parse_csv_chunk, (str(path), next_task[0], next_task[1], fieldnames, LINKS is not None)))
+            yield start, rows, missing_ids, link_names
+
+def iter_new_movie_rows_parallel(path: Path, parse_workers: int, chunk_bytes: int, existing_tmdb_ids: TmdbIdSet, stats: dict,
+                                 start_offset: int = 0):
+    """
+    Parallel counterpart of iter_new_movie_rows: yields "Movies" value tuples for TMDB IDs not in the database yet.
+    stats['offset'] is the start of the chunk being yielded: every row before it has been handed out.
+    """
+    for start, rows, missing_ids, link_names in iter_parsed_chunks(path, parse_workers, chunk_bytes, start_offset):
+        stats['offset'] = start
+        if missing_ids:
+            logger.warning(f"Skipping {missing_ids} rows due to missing TMDB ID.")
+        for i, movie_values in enumerate(rows):
+            tmdb_id = movie_values[1]
+            if tmdb_id in existing_tmdb_ids:
+                stats['skipped'] += 1
+                continue
+            existing_tmdb_ids.add(tmdb_id)
+            if LINKS:
+                LINKS.add(movie_values[0], link_names[i])
+            yield movie_values
+
+def iter_new_movie_rows(reader, existing_tmdb_ids: TmdbIdSet, stats: dict):
+    """Yields "Movies" value tuples for CSV rows whose TMDB ID is not in the database yet."""
+    for i, row in enumerate(reader, 1):
+        tmdb_id = safe_int(row.get('id'))
+        if not tmdb_id:
+            logger.warning(f"Skipping row {i} due to missing TMDB ID.")
+            continue
+
+        if tmdb_id in existing_tmdb_ids:
+            stats['skipped'] += 1
+            continue
+
+        existing_tmdb_ids.add(tmdb_id)
+        movie_values = build_movie_values(row, tmdb_id)
+        if LINKS:
+            LINKS.add(movie_values[0], tuple(row.get(column) for column in CSV_LINKS))
+        yield movie_values
+
+def csv_identity(path: Path, refresh: bool) -> str:
+    """Identifies the load a stored byte offset belongs to; a replaced file or a switch to or from --refresh starts over."""
+    stat = path.stat()
+    return f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{'refresh' if refresh else 'insert'}"
+
+def process_csv_and_insert(batch_size: int, mode: str = 'batch', parse_workers: int = 0, chunk_mb: int = 16,
+                           bulk_initial_load: bool = False, metrics_port: int = None, pushgateway: str = None,
+                           profile: bool = False, profile_window: Tuple[int, int] = None, profile_mode: str = 'cprofile',
+                           profile_dir: Path = PROFILE_DIR, refresh: bool = False, invalidate_cache: bool = False,
+                           redis_connection: Optional[str] = None, warm_top_k: int = 0, api_url: Optional[str] = None,
+                           links: bool = True, seed_files: Optional[Dict[str, Path]] = None, restart: bool = False) -> bool:
+    """
+    Reads the movie dataset from CSV and inserts new movies into the database.
+    mode='batch' inserts in batches of batch_size; mode='copy' streams every row through COPY in one pass.
+    With parse_workers > 1 the CSV is parsed in a process pool, chunk_mb megabytes per task.
+    With bulk_initial_load the secondary indexes and foreign keys of an empty Movies table are dropped
+    for the load and rebuilt in parallel afterwards, even if the load fails.
+    Prometheus metrics are served on metrics_port and/or pushed to pushgateway when either is set.
+    With profile set, wall/CPU time per stage per batch is recorded and summarized at the end, and the
+    batches in profile_window are captured with cProfile or a stack sampler (profile_mode) into profile_dir.
+    With refresh set, existing movies are updated too, but only those whose CSV fields changed since
+    the last refresh (by content hash); new and changed movies are written in staged, set-based batches.
+    With invalidate_cache set, the API's cached details of updated movies are invalidated in Redis
+    (redis_connection), and the warm_top_k most popular of them are requested from api_url at the end.
+    With links set, the genre, keyword and production company names of every inserted movie are resolved
+    through name indexes of the dimension tables (seeded from seed_files) and written as link rows in the
+    same transaction, so the TMDB API crawl is only needed for credits.
+    The byte offset of the last committed batch is kept in LOAD_PROGRESS_PATH, and an interrupted load of
+    the same file continues from it (unless restart is set) without reloading the existing TMDB IDs.
+    CSV_FILE_PATH may be plain (memory-mapped) or .gz/.zst compressed (streamed, parsed in one process).
+    Errors are logged rather than raised; returns whether the whole file was loaded.
+    """
+    global DB_POOL, PROFILER, CACHE_INVALIDATOR, LINKS
+    if refresh and bulk_initial_load:
+        logger.error("--refresh updates existing movies, but --bulk-initial-load requires an empty Movies table. Use one or the other.")
+        return False
+    DB_POOL = create_db_pool(DB_CONFIG, 1, logger)
+    if profile:
+        PROFILER = StageProfiler(True, 'insert_data_to_db', profile_window, profile_mode, profile_dir)
+    if metrics_port or pushgateway:
+        try:
+            METRICS.enable('insert-data-to-db', metrics_port, pushgateway)
+            logger.info(f"[METRICS] Exposing metrics on port {metrics_port}" if metrics_port else f"[METRICS] Pushing metrics to {pushgateway}")
+        except (RuntimeError, OSError) as e:
+            logger.warning(f"[METRICS] Metrics disabled: {e}")
+    if invalidate_cache and refresh:
+        try:
+            CACHE_INVALIDATOR = MovieDetailCacheInvalidator(redis_connection, api_url, warm_top_k)
+            CACHE_INVALIDATOR.ping()
+            logger.info(f"[API-CACHE] Invalidating cached details of updated movies in Redis {redis_connection}.")
+        except Exception as e:
+            logger.warning(f"[API-CACHE] Cache invalidation disabled: {e}")
+            CACHE_INVALIDATOR = None
+    elif invalidate_cache:
+        logger.info("[API-CACHE] Without --refresh only new movies are inserted, so there is no cached detail to invalidate.")
 
     movies_to_insert = []
+    stats = {'skipped': 0, 'unchanged': 0, 'changed': 0, 'updated': 0}
     skipped_count = 0
     total_inserted_count = 0
+    batch_num = 1
+    bulk_schema = BulkLoadSchema(DB_CONFIG, BULK_LOAD_TABLES, BULK_LOAD_SNAPSHOT_PATH)
+    bulk_started = False
+    progress = None
+    csv_input = None
+    succeeded = False
     
     try:
-        existing_tmdb_ids = get_existing_tmdb_ids(cursor)
-        
-        logger.info(f"Starting to process CSV file: {CSV_FILE_PATH} with batch size: {batch_size}")
-        
-        with open(CSV_FILE_PATH, mode='r', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for i, row in enumerate(reader, 1):
-                tmdb_id = safe_int(row.get('id'))
-                if not tmdb_id:
-                    logger.warning(f"Skipping row {i} due to missing TMDB ID.")
-                    continue
-
-                if tmdb_id in existing_tmdb_ids:
-                    skipped_count += 1
-                    continue
-
-                movie_values = (
-                    str(uuid.uuid4()), tmdb_id, row.get('title'), row.get('original_title'),
-                    row.get('overview'), safe_date(row.get('release_date')), safe_int(row.get('runtime')),
-                    safe_int(row.get('budget')), safe_int(row.get('revenue')), row.get('poster_path'),
-                    row.get('backdrop_path'), row.get('imdb_id'), row.get('original_language'),
-                    safe_float(row.get('popularity')), safe_float(row.get('vote_average')),
-                    safe_int(row.get('vote_count')), row.get('status'), row.get('tagline'),
-                    row.get('homepage'), safe_bool(row.get('adult')), False,
-                    datetime.now(timezone.utc), datetime.now(timezone.utc)
-                )
+        if bulk_schema.has_pending_snapshot() and not restore_bulk_load_schema(bulk_schema, logger, interrupted=True):
+            return False
+
+        progress = ProgressStore(LOAD_PROGRESS_PATH)
+        identity = csv_identity(CSV_FILE_PATH, refresh)
+        resume_offset = 0
+        if progress.get_meta('csv_identity') == identity and not restart:
+            resume_offset = int(progress.get_meta('csv_offset') or 0)
+        progress.set_meta('csv_identity', identity)
+        progress.set_meta('csv_offset', str(resume_offset))
+        if resume_offset:
+            logger.info(f"[RESUME] An interrupted load committed {CSV_FILE_PATH.name} up to byte {resume_offset:,}; continuing from there. Pass --restart to read it from the start.")
+            if bulk_initial_load:
+                logger.info("[RESUME] Movies already holds the rows of the interrupted load, so the rest is loaded without --bulk-initial-load.")
+                bulk_initial_load = False
+        if parse_workers > 1 and CSV_FILE_PATH.suffix in COMPRESSED_SUFFIXES:
+            logger.info(f"[PARSE] {CSV_FILE_PATH.name} is compressed and cannot be split into byte ranges; parsing it in the main process.")
+            parse_workers = 0
+
+        if bulk_initial_load:
+            with DB_POOL.connection() as conn:
+                snapshot = bulk_schema.begin(conn)
+            bulk_started = True
+            logger.info(f"[BULK] Dropped {len(snapshot['indexes'])} secondary indexes and {len(snapshot['foreign_keys'])} foreign keys for the load. Snapshot: {BULK_LOAD_SNAPSHOT_PATH}")
+
+        if resume_offset and not refresh:
+            # Rows re-sent from the last uncheckpointed batch are skipped by ON CONFLICT instead
+            logger.info("[RESUME] Not loading the existing TMDB IDs; movies already in the database are skipped on insert.")
+            existing_tmdb_ids = TmdbIdSet()
+            stored_hashes = None
+        else:
+            with DB_POOL.connection() as conn:
+                with PROFILER.stage('load_existing_ids'):
+                    existing_tmdb_ids = get_existing_tmdb_ids(conn)
+                    stored_hashes = get_content_hashes(conn) if refresh else None
+
+        if refresh and mode == 'copy':
+            logger.info("[REFRESH] Refresh runs write through staged batches; --mode copy is ignored.")
+            mode = 'batch'
+        if links:
+            with DB_POOL.connection() as conn, PROFILER.stage('load_name_indexes'):
+                LINKS = MovieLinkCollector(load_name_indexes(conn, seed_files or {}), spool=mode == 'copy')
+        logger.info(f"Starting to process CSV file: {CSV_FILE_PATH} in '{'refresh' if refresh else mode}' mode with batch size: {batch_size}")
+        started_at = time.perf_counter()
+        # A refresh looks at every row, so only duplicates within the file are filtered out up front
+        seen_tmdb_ids = TmdbIdSet() if refresh else existing_tmdb_ids
+        write = (lambda rows: write_refresh_batch(rows, stats)) if refresh else (lambda rows: write_batch(rows, stats))
+
+        if parse_workers > 1:
+            stats['offset'] = resume_offset
+            movie_rows = iter_new_movie_rows_parallel(CSV_FILE_PATH, parse_workers, chunk_mb * 1024 * 1024, seen_tmdb_ids, stats, resume_offset)
+            committed_offset = lambda: stats['offset']
+        else:
+            csv_input = CsvInput(CSV_FILE_PATH)
+            if resume_offset and csv_input.compressed:
+                logger.info(f"[RESUME] Decompressing and skipping the first {resume_offset:,} bytes of {CSV_FILE_PATH.name} without parsing them...")
+            with PROFILER.stage('seek'):
+                csv_input.seek(resume_offset)
+            movie_rows = iter_new_movie_rows(csv_input.rows(), seen_tmdb_ids, stats)
+            # The reader pulls lines lazily, so at a flush the input has been consumed up to the end of the last row
+            committed_offset = lambda: csv_input.offset
+        if refresh:
+            movie_rows = iter_refresh_rows(movie_rows, existing_tmdb_ids, stored_hashes, stats)
+
+        def flush(rows) -> int:
+            try:
+                inserted = write(rows)
+            finally:
+                if LINKS:
+                    LINKS.discard(rows)
+            progress.set_meta('csv_offset', str(committed_offset()))
+            return inserted
+
+        if mode == 'copy':
+            # Parsing happens inside the COPY stream, so copy_load includes it
+            with DB_POOL.connection() as conn, conn.cursor() as cursor, PROFILER.stage('copy_load'):
+                total_inserted_count = execute_copy_load(conn, cursor, movie_rows)
+            METRICS.observe_flush(total_inserted_count, time.perf_counter() - started_at)
+            METRICS.add_rows("Movies", total_inserted_count)
+            METRICS.add_committed(total_inserted_count)
+        else:
+            PROFILER.start_batch(batch_num)
+            for movie_values in movie_rows:
                 movies_to_insert.append(movie_values)
-                existing_tmdb_ids.add(tmdb_id)
 
                 if len(movies_to_insert) >= batch_size:
-                    inserted = execute_insert_batch(conn, cursor, movies_to_insert)
+                    PROFILER.lap('parse')
+                    with PROFILER.stage('insert'):
+                        inserted = flush(movies_to_insert)
+                    PROFILER.end_batch(batch_num)
                     total_inserted_count += inserted
                     movies_to_insert.clear()
+                    batch_num += 1
+                    PROFILER.start_batch(batch_num)
 
         if movies_to_insert:
-            inserted = execute_insert_batch(conn, cursor, movies_to_insert)
+            PROFILER.lap('parse')
+            with PROFILER.stage('insert'):
+                inserted = flush(movies_to_insert)
+            PROFILER.end_batch(batch_num)
             total_inserted_count += inserted
+        # The file is fully loaded; the next run of it reads it from the start again
+        progress.set_meta('csv_offset', '0')
+
+        skipped_count = stats['skipped']
+        log_throughput("TOTAL", total_inserted_count, started_at)
 
         logger.info("--------------------------------------------------")
         logger.info("CSV Processing Complete!")
-        logger.info(f"Skipped {skipped_count} movies that already exist in the database.")
+        if refresh:
+            logger.info(f"[REFRESH] {stats['unchanged']} existing movies unchanged, {stats['changed']} changed, {stats['updated']} updated. Skipped {skipped_count} duplicate rows.")
+        else:
+            logger.info(f"Skipped {skipped_count} movies that already exist in the database.")
         logger.info(f"[SUCCESS] Inserted a total of {total_inserted_count} new movies.")
-        logger.warning("""
-        NOTE: Only data for the main 'Movies' table was inserted. 
-        Relational data such as genres, keywords, production companies, etc., was NOT inserted.
-        This is because the source CSV file contains only names for these entities (e.g., 'Action'), 
-        but the database schema requires unique IDs (e.g., TMDB Genre ID) which are not present in the CSV.
-        To populate this related data, a more complex script would be needed to either fetch the correct IDs from an API 
-        or modify the database schema.
-        """)
+        if CACHE_INVALIDATOR:
+            if CACHE_INVALIDATOR.warm_top_k:
+                warmed = CACHE_INVALIDATOR.warm()
+                logger.info(f"[API-CACHE] Pre-warmed {warmed} of the most popular updated movies through {api_url}.")
+            logger.info(f"[API-CACHE] Invalidated {CACHE_INVALIDATOR.invalidated} movies ({CACHE_INVALIDATOR.deleted} cached entries deleted, {CACHE_INVALIDATOR.errors} errors).")
+        if LINKS:
+            unresolved = ', '.join(f"{table} {count}" for table, count in LINKS.unresolved().items() if count)
+            logger.info("[LINKS] Genres, keywords and production companies were linked from their CSV names."
+                        + (f" Names not found: {unresolved}; pass a newer TMDB id export with --seed-names and re-run to link them." if unresolved else ""))
+            logger.info("[LINKS] Only credits (and videos/images) still need the API: python fetch_other_values.py --credits-only")
+        else:
+            logger.warning("NOTE: --skip-links was given, so only the 'Movies' table was loaded; genres, keywords and production companies are left to fetch_other_values.py.")
+        if PROFILER.enabled:
+            logger.info("[PROFILE] Time per stage (insert = execute_values + link_rows + commit):")
+            for line in PROFILER.summary_lines():
+                logger.info(f"[PROFILE] {line}")
+        succeeded = True
 
     except FileNotFoundError:
         logger.error(f"CSV file not found at path: {CSV_FILE_PATH}")
     except Exception as e:
-        conn.rollback()
         logger.error(f"A critical error occurred: {e}")
     finally:
-        cursor.close()
-        conn.close()
+        if bulk_started and not restore_bulk_load_schema(bulk_schema, logger):
+            succeeded = False
+        if csv_input:
+            csv_input.close()
+        if progress:
+            progress.close()
+        DB_POOL.close()
+        METRICS.close()
+        if CACHE_INVALIDATOR:
+            CACHE_INVALIDATOR.close()
+        if LINKS:
+            LINKS.close()
+        for kind, path in PROFILER.close().items():
+            logger.info(f"[PROFILE] Wrote {kind} to {path}")
         logger.info("Database connection closed.")
+    return succeeded
 
 
 if __name__ == '__main__':
@@ -290,9 +1019,128 @@ if __name__ == '__main__':
         default='neon',
         help='Database to use: "local" for local PostgreSQL or "neon" for Neon cloud database. Default is neon.'
     )
+    parser.add_argument(
+        '--mode',
+        type=str,
+        choices=['batch', 'copy'],
+        default='batch',
+        help='Load strategy: "batch" inserts with execute_values per batch, "copy" streams all rows through COPY into a staging table and merges them in one statement. Default is batch.'
+    )
+    parser.add_argument(
+        '--parse-workers',
+        type=int,
+        default=0,
+        help='Number of processes parsing the CSV in parallel byte-range chunks. 0 or 1 parses in the main process. Default is 0.'
+    )
+    parser.add_argument(
+        '--chunk-mb',
+        type=int,
+        default=16,
+        help='Size of each CSV chunk handed to a parser process, in MB. Default is 16.'
+    )
+    parser.add_argument(
+        '--bulk-initial-load',
+        action='store_true',
+        help='First load into an empty Movies table: drop its secondary indexes and foreign keys during the load and rebuild them in parallel at the end. An interrupted load is restored on the next start.'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=None,
+        help='Serve Prometheus metrics on this port (the ingestion scrape job expects 9109). Requires prometheus-client. Default is off.'
+    )
+    parser.add_argument(
+        '--pushgateway',
+        type=str,
+        default=None,
+        help='Push Prometheus metrics to this Pushgateway (host:port, localhost:9091 with docker-compose.telemetry.yml) every 15 seconds and at the end of the run. Default is off.'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Record wall and CPU time per stage (parse, execute_values, commit) per batch and print a summary at the end.'
+    )
+    parser.add_argument(
+        '--profile-window',
+        type=parse_window,
+        default=None,
+        help='With --profile, also capture batches START:END (1-based, e.g. 10:20) with --profile-mode. Default is none.'
+    )
+    parser.add_argument(
+        '--profile-mode',
+        type=str,
+        choices=['cprofile', 'sample'],
+        default='cprofile',
+        help='"cprofile" writes a .pstats file; "sample" writes wall-clock stack samples in folded format for flamegraph.pl/speedscope. Default is cprofile.'
+    )
+    parser.add_argument(
+        '--profile-dir',
+        type=Path,
+        default=PROFILE_DIR,
+        help=f'Directory for the per-batch stage breakdown and captured profiles. Default is {PROFILE_DIR}.'
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Also update existing movies whose CSV fields changed since the last refresh, detected by a content hash per movie stored in MovieContentHashes. The first refresh has no hashes yet and rewrites every existing movie once.'
+    )
+    parser.add_argument(
+        '--invalidate-cache',
+        action='store_true',
+        help="With --refresh, invalidate the API's cached GetMovieDetail entries of updated movies in Redis and notify the API instances."
+    )
+    parser.add_argument(
+        '--redis',
+        type=str,
+        default=ENV_VARS.get('REDIS_CONNECTION_STRING', 'localhost:6379'),
+        help='Redis used by the API, as "host:port[,password=...]" or a redis:// URL. Default is REDIS_CONNECTION_STRING from .env, else localhost:6379.'
+    )
+    parser.add_argument(
+        '--warm-top-k',
+        type=int,
+        default=0,
+        help='With --invalidate-cache, request the K most popular updated movies from the API at the end of the run to pre-warm its cache. Default is 0 (off).'
+    )
+    parser.add_argument(
+        '--api-url',
+        type=str,
+        default=ENV_VARS.get('API_URL', 'http://localhost:5000'),
+        help='Base URL of the API used by --warm-top-k. Default is API_URL from .env, else http://localhost:5000.'
+    )
+    parser.add_argument(
+        '--skip-links',
+        action='store_true',
+        help='Only load the Movies table, without resolving the genres, keywords and production_companies name lists into link rows.'
+    )
+    parser.add_argument(
+        '--seed-names',
+        type=parse_seed_file_arg,
+        action='append',
+        default=[],
+        metavar='COLUMN=PATH',
+        help='Seed the names of a CSV list column (keywords or production_companies) from a TMDB daily id export, '
+             'e.g. keywords=keyword_ids_05_01_2025.json.gz. Only missing TmdbIds are inserted. Can be repeated. Genres need no seed.'
+    )
+    parser.add_argument(
+        '--csv-file',
+        type=Path,
+        default=CSV_FILE_PATH,
+        help=f'Movie dataset to load: a plain .csv, or a .csv.gz/.csv.zst streamed without decompressing it to disk (.zst requires zstandard). Default is {CSV_FILE_PATH}.'
+    )
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help=f'Read the CSV from the start even if an interrupted load of the same file left a byte offset in {LOAD_PROGRESS_PATH.name}.'
+    )
     args = parser.parse_args()
 
     # Set global DB_CONFIG based on database type
     DB_CONFIG = get_db_config(args.db)
+    CSV_FILE_PATH = args.csv_file
 
-    process_csv_and_insert(args.batch_size)
+    succeeded = process_csv_and_insert(args.batch_size, args.mode, args.parse_workers, args.chunk_mb, args.bulk_initial_load,
+                                       args.metrics_port, args.pushgateway,
+                                       args.profile, args.profile_window, args.profile_mode, args.profile_dir,
+                                       args.refresh, args.invalidate_cache, args.redis, args.warm_top_k, args.api_url,
+                                       not args.skip_links, dict(args.seed_names), args.restart)
+    sys.exit(0 if succeeded else 1)
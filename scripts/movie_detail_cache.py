@@ -0,0 +1,140 @@
+import hashlib
+import heapq
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+
+try:
+    import redis
+except ImportError:  # redis is optional; only needed with --invalidate-cache
+    redis = None
+
+# Redis key of a cached GetMovieDetail result, as written by the API:
+#   "CineSocial:"  RedisCache InstanceName (InfrastructureServiceExtensions.AddCachingServices)
+#   "v2:"          FusionCache's distributed cache wire format prefix
+#   followed by the FusionCache key built by QueryCachingBehavior.GenerateCacheKey (movie_detail_cache_key)
+REDIS_KEY_PREFIX = 'CineSocial:v2:'
+
+# GetMovieDetailQuery.CacheDuration, as serialized by System.Text.Json (part of the hashed key)
+MOVIE_DETAIL_CACHE_DURATION = '01:00:00'
+
+# Channel the API's MovieCacheInvalidationSubscriber listens on to drop its in-memory (L1) copies
+CHANGED_MOVIES_CHANNEL = 'cinesocial:movies:changed'
+
+# Movie ids per DEL + PUBLISH round trip
+INVALIDATION_CHUNK_SIZE = 500
+
+
+def movie_detail_cache_key(movie_id: str) -> str:
+    """FusionCache key of GetMovieDetailQuery(movie_id): the first 16 hex chars of the MD5 of the query's JSON."""
+    # Same property order and formats as System.Text.Json: lowercase GUID, TimeSpan as hh:mm:ss, no whitespace
+    query_json = json.dumps({'Id': str(movie_id).lower(), 'CacheDuration': MOVIE_DETAIL_CACHE_DURATION,
+                             'CacheKeyPrefix': 'GetMovieDetail'}, separators=(',', ':'))
+    return f"query:getmoviedetailquery:{hashlib.md5(query_json.encode('utf-8')).hexdigest()[:16]}"
+
+
+def connect_redis(connection: str):
+    """
+    Connects to Redis from a redis:// URL or a StackExchange.Redis connection string
+    ("host:port[,password=...][,ssl=True]"), the format the API reads from REDIS_CONNECTION_STRING.
+    """
+    if redis is None:
+        raise RuntimeError("redis is not installed (pip install redis)")
+    if '://' in connection:
+        return redis.Redis.from_url(connection)
+
+    endpoint, *options = [part.strip() for part in connection.split(',')]
+    host, _, port = endpoint.rpartition(':') if ':' in endpoint else (endpoint, '', '')
+    kwargs = {'host': host, 'port': int(port or 6379)}
+    for option in options:
+        name, _, value = option.partition('=')
+        name = name.strip().lower()
+        if name == 'password':
+            kwargs['password'] = value
+        elif name == 'user':
+            kwargs['username'] = value
+        elif name == 'ssl':
+            kwargs['ssl'] = value.strip().lower() == 'true'
+    return redis.Redis(**kwargs)
+
+
+class MovieDetailCacheInvalidator:
+    """
+    Keeps the API's GetMovieDetail cache in step with ingestion. invalidate() deletes the Redis (L2)
+    entries of movies whose data was just committed and publishes their ids, so every API instance
+    drops its in-memory (L1) copy as well. The warm_top_k most popular invalidated movies are
+    remembered, and warm() requests them from the API at the end of a run so the first visitors
+    after a bulk load do not all miss at once.
+    Redis and API failures are counted in `errors`, never raised: entries expire on their own anyway.
+    """
+
+    def __init__(self, connection: str, api_url: Optional[str] = None, warm_top_k: int = 0):
+        self.client = connect_redis(connection)
+        self.api_url = api_url.rstrip('/') if api_url else None
+        self.warm_top_k = warm_top_k if self.api_url else 0
+        self.invalidated = 0
+        self.deleted = 0
+        self.errors = 0
+        self._top: List[Tuple[float, str]] = []  # min-heap of (popularity, movie id)
+        self._lock = threading.Lock()
+
+    def ping(self):
+        """Raises if Redis cannot be reached, so a misconfiguration shows up before the run."""
+        self.client.ping()
+
+    def invalidate(self, movies: Iterable[Tuple[str, Optional[float]]]):
+        """Invalidates the detail entries of (movie id, popularity) pairs whose data changed."""
+        movies = list(movies)
+        for start in range(0, len(movies), INVALIDATION_CHUNK_SIZE):
+            movie_ids = [str(movie_id) for movie_id, _ in movies[start:start + INVALIDATION_CHUNK_SIZE]]
+            try:
+                pipeline = self.client.pipeline(transaction=False)
+                pipeline.delete(*[REDIS_KEY_PREFIX + movie_detail_cache_key(movie_id) for movie_id in movie_ids])
+                pipeline.publish(CHANGED_MOVIES_CHANNEL, ','.join(movie_ids))
+                deleted, _ = pipeline.execute()
+            except redis.RedisError:
+                with self._lock:
+                    self.errors += 1
+                continue
+            with self._lock:
+                self.invalidated += len(movie_ids)
+                self.deleted += deleted
+
+        if self.warm_top_k:
+            with self._lock:
+                for movie_id, popularity in movies:
+                    item = (popularity or 0.0, str(movie_id))
+                    if len(self._top) < self.warm_top_k:
+                        heapq.heappush(self._top, item)
+                    elif item > self._top[0]:
+                        heapq.heapreplace(self._top, item)
+
+    def warm(self, workers: int = 8) -> int:
+        """Requests the remembered top-K movies from the API, most popular first. Returns how many succeeded."""
+        with self._lock:
+            movie_ids = list(dict.fromkeys(movie_id for _, movie_id in sorted(self._top, reverse=True)))
+        if not movie_ids:
+            return 0
+
+        session = requests.Session()
+
+        def fetch(movie_id: str) -> bool:
+            try:
+                return session.get(f"{self.api_url}/api/movies/{movie_id}", timeout=30).ok
+            except requests.RequestException:
+                return False
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                warmed = sum(executor.map(fetch, movie_ids))
+        finally:
+            session.close()
+        with self._lock:
+            self.errors += len(movie_ids) - warmed
+        return warmed
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,127 @@
+import sys
+from typing import Optional, Tuple
+
+# TMDB lists are capped when a response is projected, so every in-flight movie has a bounded size
+MAX_CAST = 20
+# The images response lists every poster/backdrop/logo ever uploaded; keep the best voted of each type
+MAX_IMAGES_PER_TYPE = 10
+IMAGE_TYPES = {'posters': 'poster', 'backdrops': 'backdrop', 'logos': 'logo'}
+# Crew, videos, keywords, genres, companies, countries and languages; only blockbusters' videos come close
+MAX_LIST_ITEMS = 100
+CREW_JOBS = frozenset(('Director', 'Producer', 'Writer', 'Screenplay'))
+
+# Upper bound of MovieRecord.approx_bytes(), measured with every list at its cap and every string at its
+# column length. A well-known movie (60 cast, 120 crew, 240 images in the response) takes about 24 KB,
+# versus about 290 KB for its decoded response.
+MAX_RECORD_BYTES = 420 * 1024
+
+
+def _clip(value, length: int):
+    """Truncates strings to their column length (see the EF configurations); other values pass through."""
+    return value[:length] if isinstance(value, str) else value
+
+
+def _code(value):
+    """Interns short, highly repeated strings (sites, video types, jobs, departments, ISO codes)."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _person(person: dict) -> tuple:
+    """("TmdbId", "Name", "ProfilePath", "Popularity", "Gender", "KnownForDepartment") of a cast or crew entry."""
+    return (person['id'], _clip(person['name'], 200), _clip(person.get('profile_path'), 200), person.get('popularity'),
+            person.get('gender'), _code(_clip(person.get('known_for_department'), 100)))
+
+
+class MovieRecord:
+    """
+    The part of a TMDB movie details response that batch_save_related_data persists, projected right
+    after decode so the full response is dropped immediately. Entities are kept as tuples in the shape
+    of their rows, strings are clipped to their column lengths and lists are capped, so a record never
+    exceeds MAX_RECORD_BYTES however large the response was.
+    """
+
+    __slots__ = ('id', 'internal_uuid', 'title', 'popularity', 'replace_existing', 'save_error', 'genres', 'companies',
+                 'cast', 'crew', 'keywords', 'countries', 'languages', 'collection', 'videos', 'images')
+
+    def __init__(self, tmdb_id: int, internal_uuid: str, title: Optional[str] = None, popularity: Optional[float] = None):
+        self.id = tmdb_id
+        self.internal_uuid = internal_uuid
+        self.title = title
+        self.popularity = popularity
+        # Set for movies of reclaimed lease ranges, whose existing link rows must be replaced
+        self.replace_existing = False
+        # Set when the database rejected the movie's rows on their own, so saving it again cannot help
+        self.save_error: Optional[str] = None
+        self.genres: Tuple[tuple, ...] = ()
+        self.companies: Tuple[tuple, ...] = ()
+        self.cast: Tuple[tuple, ...] = ()
+        self.crew: Tuple[tuple, ...] = ()
+        self.keywords: Tuple[tuple, ...] = ()
+        self.countries: Tuple[tuple, ...] = ()
+        self.languages: Tuple[tuple, ...] = ()
+        self.collection: Optional[tuple] = None
+        self.videos: Tuple[tuple, ...] = ()
+        self.images: Tuple[tuple, ...] = ()
+
+    @classmethod
+    def from_tmdb(cls, details: dict, internal_uuid: str) -> 'MovieRecord':
+        """Projects a decoded /movie/{id}?append_to_response=videos,images,keywords,credits response."""
+        record = cls(details['id'], internal_uuid, _clip(details.get('title'), 500), details.get('popularity'))
+
+        # (TmdbId, Name)
+        record.genres = tuple((genre['id'], _clip(genre['name'], 100))
+                              for genre in (details.get('genres') or [])[:MAX_LIST_ITEMS])
+        # (TmdbId, Name, LogoPath, OriginCountry)
+        record.companies = tuple((company['id'], _clip(company['name'], 200), _clip(company.get('logo_path'), 200),
+                                  _code(_clip(company.get('origin_country'), 10)))
+                                 for company in (details.get('production_companies') or [])[:MAX_LIST_ITEMS])
+
+        credits = details.get('credits') or {}
+        # (person, Character, CastOrder)
+        record.cast = tuple((_person(person), _clip(person.get('character'), 500), person.get('order'))
+                            for person in (credits.get('cast') or [])[:MAX_CAST])
+        # (person, Job, Department)
+        crew = [person for person in credits.get('crew') or [] if person.get('job') in CREW_JOBS]
+        record.crew = tuple((_person(person), _code(person['job']), _code(_clip(person.get('department'), 200)))
+                            for person in crew[:MAX_LIST_ITEMS])
+
+        # (TmdbId, Name)
+        record.keywords = tuple((keyword['id'], _clip(keyword['name'], 200))
+                                for keyword in ((details.get('keywords') or {}).get('keywords') or [])[:MAX_LIST_ITEMS])
+        # (Iso31661, Name)
+        record.countries = tuple((_code(country['iso_3166_1']), _clip(country['name'], 100))
+                                 for country in (details.get('production_countries') or [])[:MAX_LIST_ITEMS])
+        # (Iso6391, Name, EnglishName); TMDB leaves the native name empty for some languages
+        record.languages = tuple((_code(language['iso_639_1']),
+                                  _clip(language.get('name') or language.get('english_name') or language['iso_639_1'], 100),
+                                  _clip(language.get('english_name'), 100))
+                                 for language in (details.get('spoken_languages') or [])[:MAX_LIST_ITEMS])
+
+        # (TmdbId, Name, PosterPath, BackdropPath)
+        collection = details.get('belongs_to_collection')
+        if collection:
+            record.collection = (collection['id'], _clip(collection['name'], 200), _clip(collection.get('poster_path'), 200),
+                                 _clip(collection.get('backdrop_path'), 200))
+
+        # (VideoKey, Name, Site, Type, Official)
+        videos = [video for video in (details.get('videos') or {}).get('results') or [] if video.get('key')]
+        record.videos = tuple((_clip(video['key'], 50), _clip(video.get('name') or '', 200) or None, _code(_clip(video.get('site'), 50)),
+                               _code(_clip(video.get('type'), 50)), bool(video.get('official')))
+                              for video in videos[:MAX_LIST_ITEMS])
+
+        # (FilePath, ImageType, Language, VoteAverage, VoteCount, Width, Height)
+        images = details.get('images') or {}
+        record.images = tuple((_clip(image['file_path'], 200), image_type, _code(_clip(image.get('iso_639_1'), 10)),
+                               image.get('vote_average'), image.get('vote_count'), image.get('width'), image.get('height'))
+                              for response_key, image_type in IMAGE_TYPES.items()
+                              for image in (images.get(response_key) or [])[:MAX_IMAGES_PER_TYPE]
+                              if image.get('file_path'))
+        return record
+
+    def approx_bytes(self) -> int:
+        """Approximate deep size of the record (interned strings counted as if they were not shared)."""
+        def size(value) -> int:
+            if isinstance(value, tuple):
+                return sys.getsizeof(value) + sum(size(item) for item in value)
+            return sys.getsizeof(value)
+        return sys.getsizeof(self) + sum(size(getattr(self, slot)) for slot in self.__slots__)
@@ -0,0 +1,109 @@
+import gzip
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from psycopg2.extras import execute_values
+
+# TMDB's movie genres (GET /genre/movie/list). The list is fixed, so it doubles as the genre seed.
+TMDB_MOVIE_GENRES = {
+    28: "Action", 12: "Adventure", 16: "Animation", 35: "Comedy", 80: "Crime", 99: "Documentary",
+    18: "Drama", 10751: "Family", 14: "Fantasy", 36: "History", 27: "Horror", 10402: "Music",
+    9648: "Mystery", 10749: "Romance", 878: "Science Fiction", 10770: "TV Movie", 53: "Thriller",
+    10752: "War", 37: "Western",
+}
+
+# Longest run of comma-separated parts tried as a single name ("Universal Pictures, Inc.")
+MAX_NAME_PARTS = 4
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_name(name: str) -> str:
+    return _WHITESPACE.sub(' ', name).strip().casefold()
+
+
+def read_seed_file(path: Path) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (TmdbId, Name) from a TMDB daily ID export (keyword_ids_MM_DD_YYYY.json.gz,
+    production_company_ids_MM_DD_YYYY.json.gz): one JSON object with "id" and "name" per line.
+    The file may be gzipped or plain.
+    """
+    opener = gzip.open if Path(path).suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('id') and entry.get('name'):
+                yield int(entry['id']), entry['name']
+
+
+class NameIdIndex:
+    """
+    Normalized name -> internal "Id" of one TMDB dimension table (genres, keywords, production companies),
+    so the comma-separated name lists of the CSV dataset can be turned into link rows without the API.
+    A name TMDB uses for several entities resolves to the one with the lowest TmdbId, since the CSV
+    cannot tell them apart; such names are counted in `ambiguous`, names not found in `unresolved`.
+    """
+
+    def __init__(self, table: str, name_length: int):
+        self.table = table
+        self.name_length = name_length
+        self.ambiguous = 0
+        self.unresolved = 0
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def seed(self, conn, entries: Iterable[Tuple[int, str]], page_size: int = 10000) -> int:
+        """Inserts the (TmdbId, Name) entries missing from the table. Returns how many were inserted; the caller commits."""
+        rows = [(tmdb_id, name[:self.name_length]) for tmdb_id, name in entries]
+        if not rows:
+            return 0
+        with conn.cursor() as cursor:
+            inserted = execute_values(
+                cursor,
+                f'INSERT INTO "{self.table}" ("TmdbId", "Name") VALUES %s ON CONFLICT ("TmdbId") DO NOTHING RETURNING 1',
+                rows,
+                page_size=page_size,
+                fetch=True
+            )
+        return len(inserted)
+
+    def load(self, conn, itersize: int = 50000):
+        """Loads every name of the table with a server-side cursor."""
+        ids = {}
+        self.ambiguous = 0
+        with conn.cursor(name=f"names_{self.table.lower()}") as cursor:
+            cursor.itersize = itersize
+            cursor.execute(f'SELECT "Name", "Id" FROM "{self.table}" WHERE "Name" IS NOT NULL ORDER BY "TmdbId" DESC')
+            for name, internal_id in cursor:
+                key = normalize_name(name)
+                if key in ids:
+                    self.ambiguous += 1
+                ids[key] = internal_id
+        conn.rollback()
+        self._ids = ids
+
+    def resolve(self, names: str) -> List[int]:
+        """
+        Internal ids of a comma-separated name list, in order and without duplicates. Runs of up to
+        MAX_NAME_PARTS parts are tried longest first, so names containing ", " still match.
+        """
+        parts = [part for part in (normalize_name(p) for p in names.split(',')) if part]
+        ids = {}
+        i = 0
+        while i < len(parts):
+            for n in range(min(MAX_NAME_PARTS, len(parts) - i), 0, -1):
+                internal_id = self._ids.get(', '.join(parts[i:i + n]))
+                if internal_id is not None:
+                    ids[internal_id] = None
+                    i += n
+                    break
+            else:
+                self.unresolved += 1
+                i += 1
+        return list(ids)
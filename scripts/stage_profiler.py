@@ -0,0 +1,211 @@
+import cProfile
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_NULL_STAGE = nullcontext()
+
+
+def parse_window(value: str) -> Tuple[int, int]:
+    """Parses a batch window 'START:END' (or a single batch 'N'), 1-based and inclusive."""
+    start, _, end = value.partition(':')
+    start, end = int(start), int(end or start)
+    if start < 1 or end < start:
+        raise ValueError(f"invalid batch window {value!r}")
+    return start, end
+
+
+class _StageTimer:
+    __slots__ = ('profiler', 'name', 'wall', 'cpu')
+
+    def __init__(self, profiler: 'StageProfiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.wall, time.thread_time() - self.cpu)
+        return False
+
+
+class StageProfiler:
+    """
+    Wall and CPU time per pipeline stage per batch, for finding where a slow run spends its time.
+    CPU time is per thread (time.thread_time), so stages running in worker threads are measured correctly.
+    Stages recorded from any thread are attributed to the batch most recently started.
+
+    For the batches inside `window` it can additionally capture either a cProfile of the thread
+    running each batch (mode='cprofile', written as .pstats) or wall-clock stack samples of every
+    thread (mode='sample', written as folded stacks for flamegraph.pl or speedscope).
+
+    When disabled, stage() returns a shared no-op context manager and every other method returns
+    immediately, so the instrumentation can stay in the hot paths.
+    """
+
+    def __init__(self, enabled: bool = False, name: str = 'ingestion', window: Optional[Tuple[int, int]] = None,
+                 mode: str = 'cprofile', out_dir: Optional[Path] = None, sample_interval: float = 0.005):
+        self.enabled = enabled
+        self.name = name
+        self.window = window
+        self.mode = mode
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.sample_interval = sample_interval
+        self.current_batch = 0
+        self._batch_counter = 0
+        self._started_at = time.perf_counter()
+        self._totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0])  # stage -> [calls, wall, cpu, max wall]
+        self._batches = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0]))  # batch -> stage -> [wall, cpu]
+        self._laps = threading.local()
+        self._lock = threading.Lock()
+        self._cprofile = cProfile.Profile() if enabled and window and mode == 'cprofile' else None
+        self._cprofile_owner = None
+        self._samples = Counter()
+        self._sampler_stop = threading.Event()
+        self._sampler = None
+
+    def stage(self, name: str):
+        """Context manager timing one execution of a stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self, name)
+
+    def record(self, name: str, wall: float, cpu: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            totals[3] = max(totals[3], wall)
+            per_batch = self._batches[self.current_batch][name]
+            per_batch[0] += wall
+            per_batch[1] += cpu
+
+    def mark(self):
+        """Starts a lap on the calling thread (see lap())."""
+        if self.enabled:
+            self._laps.wall = time.perf_counter()
+            self._laps.cpu = time.thread_time()
+
+    def lap(self, name: str):
+        """Records the time since the previous mark()/lap() on this thread as one execution of `name`."""
+        if not self.enabled:
+            return
+        wall, cpu = time.perf_counter(), time.thread_time()
+        self.record(name, wall - getattr(self._laps, 'wall', wall), cpu - getattr(self._laps, 'cpu', cpu))
+        self._laps.wall, self._laps.cpu = wall, cpu
+
+    def _in_window(self, batch: int) -> bool:
+        return self.window is not None and self.window[0] <= batch <= self.window[1]
+
+    def start_batch(self, batch: int):
+        """Marks the start of a batch; starts cProfile/sampling when the batch is inside the window."""
+        if not self.enabled:
+            return
+        self.current_batch = batch
+        self.mark()
+        if not self._in_window(batch):
+            return
+        if self._cprofile is not None:
+            with self._lock:
+                # cProfile follows a single thread; concurrent batches of other writers are not captured
+                if self._cprofile_owner is None:
+                    self._cprofile_owner = threading.get_ident()
+                    self._cprofile.enable()
+        elif self.mode == 'sample' and self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, name="stack-sampler", daemon=True)
+            self._sampler.start()
+
+    def next_batch(self) -> int:
+        """Starts the batch after the most recently started one (for concurrent writers). Returns its number."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            self._batch_counter += 1
+            batch = self._batch_counter
+        self.start_batch(batch)
+        return batch
+
+    def end_batch(self, batch: int):
+        """Marks the end of a batch; stops cProfile/sampling at the end of the window."""
+        if not self.enabled or not self._in_window(batch):
+            return
+        if self._cprofile is not None:
+            with self._lock:
+                if self._cprofile_owner == threading.get_ident():
+                    self._cprofile.disable()
+                    self._cprofile_owner = None
+        elif batch == self.window[1]:
+            self._sampler_stop.set()
+
+    def _sample_loop(self):
+        own_ident = threading.get_ident()
+        while not self._sampler_stop.wait(self.sample_interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._samples[';'.join(reversed(stack))] += 1
+
+    def summary_lines(self) -> List[str]:
+        """Formats the per-stage totals as a table, slowest stage first."""
+        run_wall = time.perf_counter() - self._started_at
+        header = f"{'stage':<20} {'calls':>8} {'wall s':>10} {'% run':>7} {'cpu s':>10} {'mean ms':>9} {'max ms':>9}"
+        lines = [header, '-' * len(header)]
+        with self._lock:
+            rows = sorted(self._totals.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (calls, wall, cpu, max_wall) in rows:
+            lines.append(f"{name:<20} {calls:>8} {wall:>10.2f} {100 * wall / run_wall:>6.1f}% {cpu:>10.2f} "
+                         f"{1000 * wall / calls:>9.2f} {1000 * max_wall:>9.2f}")
+        lines.append(f"Run wall time: {run_wall:.2f}s. Stages in worker threads overlap, so percentages can add up to more than 100%.")
+        return lines
+
+    def close(self) -> Dict[str, Path]:
+        """Stops any capture and writes the per-batch breakdown and profiles to out_dir. Returns the written files."""
+        if not self.enabled:
+            return {}
+        self._sampler_stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._cprofile is not None and self._cprofile_owner == threading.get_ident():
+            self._cprofile.disable()
+        if self.out_dir is None:
+            return {}
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        written = {}
+        stages_path = self.out_dir / f"stages_{self.name}.json"
+        with self._lock:
+            batches = {str(batch): {stage: {'wall': round(wall, 6), 'cpu': round(cpu, 6)} for stage, (wall, cpu) in stages.items()}
+                       for batch, stages in sorted(self._batches.items())}
+        with open(stages_path, 'w', encoding='utf-8') as f:
+            json.dump({'window': self.window, 'batches': batches}, f, indent=2)
+        written['stages'] = stages_path
+
+        if self._cprofile is not None:
+            pstats_path = self.out_dir / f"{self.name}.pstats"
+            self._cprofile.dump_stats(str(pstats_path))
+            written['pstats'] = pstats_path
+        if self._samples:
+            folded_path = self.out_dir / f"{self.name}.folded"
+            with open(folded_path, 'w', encoding='utf-8') as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            written['folded'] = folded_path
+        return written
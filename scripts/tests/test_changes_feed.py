@@ -0,0 +1,51 @@
+import unittest
+from datetime import date, timedelta
+
+from changes_feed import CHANGES_WINDOW_DAYS, change_windows, changed_movie_ids
+
+
+class ChangeWindowsTests(unittest.TestCase):
+
+    def test_single_day(self):
+        day = date(2025, 3, 1)
+        self.assertEqual(list(change_windows(day, day)), [(day, day)])
+
+    def test_exactly_one_window(self):
+        since = date(2025, 3, 1)
+        until = since + timedelta(days=CHANGES_WINDOW_DAYS - 1)
+        self.assertEqual(list(change_windows(since, until)), [(since, until)])
+
+    def test_one_day_past_a_window_starts_another(self):
+        since = date(2025, 3, 1)
+        until = since + timedelta(days=CHANGES_WINDOW_DAYS)
+        self.assertEqual(list(change_windows(since, until)), [
+            (since, date(2025, 3, 14)),
+            (until, until),
+        ])
+
+    def test_windows_cover_the_range_without_gaps_or_overlap(self):
+        since, until = date(2024, 12, 20), date(2025, 3, 2)
+        windows = list(change_windows(since, until))
+        self.assertEqual(windows[0][0], since)
+        self.assertEqual(windows[-1][1], until)
+        for (start, end), (next_start, _) in zip(windows, windows[1:]):
+            self.assertEqual(next_start, end + timedelta(days=1))
+        for start, end in windows:
+            self.assertLessEqual((end - start).days + 1, CHANGES_WINDOW_DAYS)
+
+    def test_empty_when_since_is_after_until(self):
+        self.assertEqual(list(change_windows(date(2025, 3, 2), date(2025, 3, 1))), [])
+
+
+class ChangedMovieIdsTests(unittest.TestCase):
+
+    def test_skips_adult_titles(self):
+        page = {'results': [{'id': 1, 'adult': False}, {'id': 2, 'adult': True}, {'id': 3}], 'total_pages': 1}
+        self.assertEqual(changed_movie_ids(page), [1, 3])
+
+    def test_page_without_results(self):
+        self.assertEqual(changed_movie_ids({'total_pages': 0}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from movie_detail_cache import REDIS_KEY_PREFIX, movie_detail_cache_key
+
+MOVIE_ID = '3f2504e0-4f89-11d3-9a0c-0305e82c3301'
+# QueryCachingBehavior.GenerateCacheKey(new GetMovieDetailQuery(Guid.Parse(MOVIE_ID))) on .NET 8, whose
+# System.Text.Json output is {"Id":"3f2504e0-...","CacheDuration":"01:00:00","CacheKeyPrefix":"GetMovieDetail"}
+DOTNET_CACHE_KEY = 'query:getmoviedetailquery:50f8f60fcc96adb3'
+
+
+class MovieDetailCacheKeyTests(unittest.TestCase):
+
+    def test_matches_the_key_generated_by_the_api(self):
+        self.assertEqual(movie_detail_cache_key(MOVIE_ID), DOTNET_CACHE_KEY)
+
+    def test_guid_case_does_not_matter(self):
+        # The API serializes Guids in lowercase, whatever case the database driver returns them in
+        self.assertEqual(movie_detail_cache_key(MOVIE_ID.upper()), DOTNET_CACHE_KEY)
+
+    def test_distinct_movies_get_distinct_keys(self):
+        self.assertNotEqual(movie_detail_cache_key(MOVIE_ID), movie_detail_cache_key('00000000-0000-0000-0000-000000000001'))
+
+    def test_redis_key_layout(self):
+        self.assertEqual(REDIS_KEY_PREFIX + movie_detail_cache_key(MOVIE_ID), 'CineSocial:v2:' + DOTNET_CACHE_KEY)
+
+
+if __name__ == '__main__':
+    unittest.main()
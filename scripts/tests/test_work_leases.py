@@ -0,0 +1,89 @@
+import unittest
+
+from work_leases import Lease, LeaseBook
+
+
+class RecordingLeaseManager:
+    """Stands in for LeaseManager: records how LeaseBook finishes each range instead of updating "IngestionLeases"."""
+
+    def __init__(self):
+        self.calls = []
+
+    def complete(self, lease, failed_ids=()):
+        self.calls.append(('done', lease.range_start, sorted(failed_ids)))
+
+    def release(self, lease):
+        self.calls.append(('pending', lease.range_start))
+
+
+class LeaseTests(unittest.TestCase):
+
+    def test_only_a_repeated_claim_is_reclaimed(self):
+        self.assertFalse(Lease(0, 100, 1).reclaimed)
+        self.assertTrue(Lease(0, 100, 2).reclaimed)
+
+
+class LeaseBookTests(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = RecordingLeaseManager()
+        self.book = LeaseBook(self.manager)
+        self.lease = Lease(0, 100, 1)
+
+    def test_completes_once_every_movie_committed(self):
+        self.book.add(self.lease, [1, 2, 3])
+        self.book.settle([1, 2], committed=True)
+        self.assertEqual(self.manager.calls, [])
+        self.book.settle([3], committed=True)
+        self.assertEqual(self.manager.calls, [('done', 0, [])])
+        self.assertEqual((self.book.completed, self.book.released), (1, 0))
+
+    def test_empty_range_completes_immediately(self):
+        self.book.add(self.lease, [])
+        self.assertEqual(self.manager.calls, [('done', 0, [])])
+
+    def test_transient_failure_releases_the_range(self):
+        self.book.add(self.lease, [1, 2])
+        self.book.settle([1], committed=False)
+        self.book.settle([2], committed=True)
+        self.assertEqual(self.manager.calls, [('pending', 0)])
+        self.assertEqual((self.book.completed, self.book.released), (0, 1))
+
+    def test_permanent_failure_completes_and_records_the_movie(self):
+        self.book.add(self.lease, [1, 2, 3])
+        self.book.settle([2], committed=False, permanent=True)
+        self.book.settle([1, 3], committed=True)
+        self.assertEqual(self.manager.calls, [('done', 0, [2])])
+        self.assertEqual((self.book.completed, self.book.rejected), (1, 1))
+
+    def test_transient_failure_wins_over_permanent_ones(self):
+        self.book.add(self.lease, [1, 2])
+        self.book.settle([1], committed=False, permanent=True)
+        self.book.settle([2], committed=False)
+        self.assertEqual(self.manager.calls, [('pending', 0)])
+        self.assertEqual(self.book.rejected, 0)
+
+    def test_ranges_are_settled_independently(self):
+        other = Lease(100, 200, 2)
+        self.book.add(self.lease, [1, 2])
+        self.book.add(other, [101])
+        self.book.settle([101], committed=False)
+        self.book.settle([1, 2], committed=True)
+        self.assertEqual(self.manager.calls, [('pending', 100), ('done', 0, [])])
+
+    def test_needs_replace_only_for_movies_of_reclaimed_ranges(self):
+        self.book.add(self.lease, [1])
+        self.book.add(Lease(100, 200, 2), [101])
+        self.assertFalse(self.book.needs_replace(1))
+        self.assertTrue(self.book.needs_replace(101))
+        self.assertFalse(self.book.needs_replace(999))
+
+    def test_movies_of_unknown_or_settled_ranges_are_ignored(self):
+        self.book.add(self.lease, [1])
+        self.book.settle([1], committed=True)
+        self.book.settle([1, 999], committed=False)
+        self.assertEqual(self.manager.calls, [('done', 0, [])])
+
+
+if __name__ == '__main__':
+    unittest.main()
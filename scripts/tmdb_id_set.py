@@ -0,0 +1,155 @@
+import uuid
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+def _sorted_unique(ids: array) -> array:
+    """Returns a sorted, de-duplicated copy of an array('q')."""
+    result = array('q')
+    previous = None
+    for tmdb_id in sorted(ids):
+        if tmdb_id != previous:
+            result.append(tmdb_id)
+            previous = tmdb_id
+    return result
+
+
+class TmdbIdSet:
+    """
+    Memory-compact set of TMDB IDs shared by the ingestion scripts.
+    IDs live in a sorted array('q') (8 bytes each, versus roughly 60-80 bytes per int in a Python set)
+    and membership is a binary search. New IDs go into a small pending set that is merged into the
+    array once it grows past a fraction of the array size, so add() stays amortised cheap.
+    """
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._sorted = _sorted_unique(array('q', ids))
+        self._pending = set()
+
+    @classmethod
+    def from_sorted(cls, ids: array) -> 'TmdbIdSet':
+        """Adopts an array('q') of unique IDs already in ascending order, without copying or re-sorting it."""
+        id_set = cls()
+        id_set._sorted = ids
+        return id_set
+
+    @classmethod
+    def from_query(cls, conn, query: str, params: tuple = None, itersize: int = 100000) -> 'TmdbIdSet':
+        """Builds the set from the first column of a query, streamed through a server-side cursor."""
+        ids = array('q')
+        with conn.cursor(name='tmdb_id_set_load') as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            for row in cursor:
+                ids.append(row[0])
+        conn.rollback()
+
+        id_set = cls()
+        id_set._sorted = _sorted_unique(ids)
+        return id_set
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._pending)
+
+    def __contains__(self, tmdb_id: int) -> bool:
+        if tmdb_id in self._pending:
+            return True
+        i = bisect_left(self._sorted, tmdb_id)
+        return i < len(self._sorted) and self._sorted[i] == tmdb_id
+
+    def __iter__(self) -> Iterator[int]:
+        self._merge()
+        return iter(self._sorted)
+
+    def add(self, tmdb_id: int):
+        if tmdb_id not in self:
+            self._pending.add(tmdb_id)
+            if len(self._pending) > max(4096, len(self._sorted) // 8):
+                self._merge()
+
+    def update(self, tmdb_ids: Iterable[int]):
+        for tmdb_id in tmdb_ids:
+            self.add(tmdb_id)
+
+    def _merge(self):
+        if self._pending:
+            merged = array('q', self._sorted)
+            merged.extend(self._pending)
+            self._sorted = _sorted_unique(merged)
+            self._pending = set()
+
+    def memory_bytes(self) -> int:
+        """Approximate memory footprint, for logging."""
+        return self._sorted.buffer_info()[1] * self._sorted.itemsize + len(self._pending) * 72
+
+
+class MovieIdList:
+    """
+    Compact list of (internal movie UUID, TMDB ID) pairs: 24 bytes per movie instead of a tuple
+    holding a UUID string (~200 bytes). Iterating yields the same (str, int) tuples the DB returns.
+    """
+
+    def __init__(self):
+        self._tmdb_ids = array('q')
+        self._uuids = bytearray()
+
+    def append(self, internal_uuid, tmdb_id: int):
+        self._uuids += uuid.UUID(str(internal_uuid)).bytes
+        self._tmdb_ids.append(tmdb_id)
+
+    def __len__(self) -> int:
+        return len(self._tmdb_ids)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        for i, tmdb_id in enumerate(self._tmdb_ids):
+            yield str(uuid.UUID(bytes=bytes(self._uuids[i * 16:(i + 1) * 16]))), tmdb_id
+
+    def tmdb_ids(self) -> Iterator[int]:
+        return iter(self._tmdb_ids)
+
+    def filter(self, keep) -> 'MovieIdList':
+        """Returns a new list with the pairs for which keep((internal_uuid, tmdb_id)) is true."""
+        result = MovieIdList()
+        for movie in self:
+            if keep(movie):
+                result.append(*movie)
+        return result
+
+
+class TmdbHashMap:
+    """
+    Read-only, memory-compact mapping of TMDB ID -> 64-bit content hash: two parallel sorted
+    array('q') columns (16 bytes per movie, versus well over 100 bytes per entry in a dict).
+    Lookups are a binary search.
+    """
+
+    def __init__(self):
+        self._tmdb_ids = array('q')
+        self._hashes = array('q')
+
+    @classmethod
+    def from_query(cls, conn, query: str, params: tuple = None, itersize: int = 100000) -> 'TmdbHashMap':
+        """Builds the map from a query returning (tmdb_id, hash) ordered by tmdb_id, streamed through a server-side cursor."""
+        hash_map = cls()
+        with conn.cursor(name='tmdb_hash_map_load') as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            for tmdb_id, content_hash in cursor:
+                hash_map._tmdb_ids.append(tmdb_id)
+                hash_map._hashes.append(content_hash)
+        conn.rollback()
+        return hash_map
+
+    def __len__(self) -> int:
+        return len(self._tmdb_ids)
+
+    def get(self, tmdb_id: int) -> Optional[int]:
+        i = bisect_left(self._tmdb_ids, tmdb_id)
+        if i < len(self._tmdb_ids) and self._tmdb_ids[i] == tmdb_id:
+            return self._hashes[i]
+        return None
+
+    def memory_bytes(self) -> int:
+        """Approximate memory footprint, for logging."""
+        return 2 * self._tmdb_ids.buffer_info()[1] * self._tmdb_ids.itemsize
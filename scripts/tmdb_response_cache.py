@@ -0,0 +1,125 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+class TmdbResponseCache:
+    """
+    On-disk cache of raw TMDB responses, keyed by endpoint and TMDB ID.
+    Payloads are zlib-compressed into files named by a hash of endpoint and TMDB ID
+    (<root>/<hash[:2]>/<hash>.zz), so identical payloads are not deduplicated, and tracked in a small SQLite index that drives TTL expiry and least-recently-used eviction
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, ttl_seconds: Optional[float] = None, compression_level: int = 6):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.compression_level = compression_level
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / 'index.sqlite3'), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                tmdb_id INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_entries_endpoint ON entries (endpoint, tmdb_id)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)')
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    @staticmethod
+    def _key(endpoint: str, tmdb_id: int) -> str:
+        return hashlib.sha256(f"{endpoint}:{tmdb_id}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.zz"
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, endpoint: str, tmdb_id: int) -> Optional[bytes]:
+        """Returns the raw response body, or None if it is not cached or older than the TTL."""
+        key = self._key(endpoint, tmdb_id)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT fetched_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None or (self.ttl_seconds is not None and now - row[0] > self.ttl_seconds):
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+
+        try:
+            with open(self._path(key), 'rb') as f:
+                payload = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, endpoint: str, tmdb_id: int, payload: bytes):
+        """Stores a raw response body, evicting least recently used entries if the cache is over budget."""
+        key = self._key(endpoint, tmdb_id)
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        compressed = zlib.compress(payload, self.compression_level)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (key, endpoint, tmdb_id, size, fetched_at, last_access) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, tmdb_id, len(compressed), now, now)
+            )
+            self._total_bytes += len(compressed) - (row[0] if row else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target_bytes: int):
+        """Deletes least recently used entries until the cache is at most target_bytes. Caller holds the lock."""
+        while self._total_bytes > target_bytes:
+            rows = self._conn.execute('SELECT key, size FROM entries ORDER BY last_access LIMIT 500').fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                try:
+                    os.remove(self._path(key))
+                except FileNotFoundError:
+                    pass
+                self._total_bytes -= size
+            self._conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key, _ in rows])
+
+    def iter_tmdb_ids(self, endpoint: str) -> Iterable[int]:
+        """Yields the TMDB IDs cached for an endpoint, ignoring the TTL (used by replay)."""
+        with self._lock:
+            rows = self._conn.execute('SELECT tmdb_id FROM entries WHERE endpoint = ? ORDER BY tmdb_id', (endpoint,)).fetchall()
+        for (tmdb_id,) in rows:
+            yield tmdb_id
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,291 @@
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import psycopg2
+
+# Ranges are half-open [RangeStart, RangeEnd); the last one is open-ended so movies added later are covered
+OPEN_RANGE_END = 2 ** 63 - 1
+
+# A range that failed this many times is left alone instead of being claimed again and again.
+# Only transient failures hand a range back; permanently failing movies are recorded in "FailedIds".
+MAX_LEASE_ATTEMPTS = 3
+
+CREATE_LEASES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS "IngestionLeases" (
+        "Job" text NOT NULL,
+        "RangeStart" bigint NOT NULL,
+        "RangeEnd" bigint NOT NULL,
+        "Status" text NOT NULL DEFAULT 'pending',
+        "Owner" text NULL,
+        "ExpiresAt" timestamp with time zone NULL,
+        "Attempts" integer NOT NULL DEFAULT 0,
+        "CompletedAt" timestamp with time zone NULL,
+        "Priority" double precision NULL,
+        "FailedIds" bigint[] NULL,
+        CONSTRAINT "PK_IngestionLeases" PRIMARY KEY ("Job", "RangeStart")
+    );
+    ALTER TABLE "IngestionLeases" ADD COLUMN IF NOT EXISTS "Priority" double precision NULL;
+    ALTER TABLE "IngestionLeases" ADD COLUMN IF NOT EXISTS "FailedIds" bigint[] NULL
+'''
+
+# Splits the catalog into ranges of about lease_size movies each, by TmdbId.
+# A range's priority is its most popular movie, so ranges holding hot titles are claimed first.
+SEED_LEASES = '''
+    INSERT INTO "IngestionLeases" ("Job", "RangeStart", "RangeEnd", "Priority")
+    SELECT %(job)s,
+           CASE WHEN row_number() OVER (ORDER BY range_start) = 1 THEN 0 ELSE range_start END,
+           COALESCE(lead(range_start) OVER (ORDER BY range_start), %(open_end)s),
+           priority
+    FROM (
+        SELECT min("TmdbId") AS range_start, max("Popularity") AS priority
+        FROM (SELECT "TmdbId", "Popularity", (row_number() OVER (ORDER BY "TmdbId") - 1) / %(lease_size)s AS bucket FROM "Movies") numbered
+        GROUP BY bucket
+    ) ranges
+    ON CONFLICT DO NOTHING
+'''
+
+# Pending ranges, or leased ranges whose owner stopped heartbeating, one at a time without blocking other nodes
+CLAIM_LEASE = '''
+    UPDATE "IngestionLeases" l
+    SET "Status" = 'leased', "Owner" = %(owner)s, "ExpiresAt" = now() + %(lease_seconds)s * interval '1 second',
+        "Attempts" = l."Attempts" + 1
+    FROM (
+        SELECT "Job", "RangeStart" FROM "IngestionLeases"
+        WHERE "Job" = %(job)s
+          AND "Attempts" < %(max_attempts)s
+          AND ("Status" = 'pending' OR ("Status" = 'leased' AND "ExpiresAt" < now()))
+        ORDER BY "Priority" DESC NULLS LAST, "RangeStart"
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ) candidate
+    WHERE l."Job" = candidate."Job" AND l."RangeStart" = candidate."RangeStart"
+    RETURNING l."RangeStart", l."RangeEnd", l."Attempts"
+'''
+
+
+@dataclass(frozen=True)
+class Lease:
+    range_start: int
+    range_end: int
+    attempts: int
+
+    @property
+    def reclaimed(self) -> bool:
+        """True if an earlier owner may have written part of this range before it crashed or gave up."""
+        return self.attempts > 1
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseManager:
+    """
+    Database-backed work leases, so several ingestion processes (on one or many hosts) can split
+    the catalog without duplicating work. The catalog is divided once into TmdbId ranges in the
+    "IngestionLeases" table; each node claims a range with FOR UPDATE SKIP LOCKED, keeps its
+    leases alive with a heartbeat thread, and marks them done (or hands them back) when finished.
+    A crashed node stops heartbeating, its leases expire and other nodes reclaim them.
+    Uses its own connection, so heartbeats are never stuck behind a long DB flush.
+    """
+
+    def __init__(self, db_config: dict, job: str, lease_seconds: float = 300.0, node_id: Optional[str] = None):
+        self.job = job
+        self.lease_seconds = lease_seconds
+        self.node_id = node_id or default_node_id()
+        self.lost_leases = 0
+        self._held: Set[int] = set()
+        self._conn = psycopg2.connect(**db_config)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _execute(self, query: str, params=None, fetch: bool = False):
+        with self._lock:
+            try:
+                with self._conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall() if fetch else cursor.rowcount
+                self._conn.commit()
+                return rows
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def ensure_leases(self, lease_size: int) -> Tuple[int, bool]:
+        """Creates the lease table and, if this job has no ranges yet, splits the catalog. Returns (ranges, seeded)."""
+        self._execute(CREATE_LEASES_TABLE)
+        with self._lock:
+            try:
+                with self._conn.cursor() as cursor:
+                    # Only the first node to get here seeds; the others wait and then see the ranges
+                    cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (f'IngestionLeases:{self.job}',))
+                    cursor.execute('SELECT COUNT(*) FROM "IngestionLeases" WHERE "Job" = %s', (self.job,))
+                    ranges = cursor.fetchone()[0]
+                    seeded = not ranges
+                    if seeded:
+                        cursor.execute(SEED_LEASES, {'job': self.job, 'open_end': OPEN_RANGE_END, 'lease_size': lease_size})
+                        ranges = cursor.rowcount
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return ranges, seeded
+
+    def reset(self) -> int:
+        """Deletes every range of this job, so the next ensure_leases() starts over. Returns the number deleted."""
+        self._execute(CREATE_LEASES_TABLE)
+        return self._execute('DELETE FROM "IngestionLeases" WHERE "Job" = %s', (self.job,))
+
+    def progress(self) -> Dict[str, int]:
+        """Number of ranges per status for this job."""
+        rows = self._execute('SELECT "Status", COUNT(*) FROM "IngestionLeases" WHERE "Job" = %s GROUP BY "Status"',
+                             (self.job,), fetch=True)
+        return dict(rows)
+
+    def claim(self) -> Optional[Lease]:
+        """Claims the next free or expired range, or returns None when no work is left."""
+        rows = self._execute(CLAIM_LEASE, {'owner': self.node_id, 'lease_seconds': self.lease_seconds,
+                                           'job': self.job, 'max_attempts': MAX_LEASE_ATTEMPTS}, fetch=True)
+        if not rows:
+            return None
+        lease = Lease(*rows[0])
+        with self._lock:
+            self._held.add(lease.range_start)
+        return lease
+
+    def complete(self, lease: Lease, failed_ids: Iterable[int] = ()):
+        """Marks a range done, recording the TMDB IDs of its movies that failed permanently."""
+        self._finish(lease, 'done', sorted(failed_ids) or None)
+
+    def release(self, lease: Lease):
+        """Hands a range back so another node (or a later run) picks it up."""
+        self._finish(lease, 'pending')
+
+    def _finish(self, lease: Lease, status: str, failed_ids: Optional[List[int]] = None):
+        # A range that was reclaimed after we lost it is left to its new owner
+        self._execute(
+            '''UPDATE "IngestionLeases"
+               SET "Status" = %s, "CompletedAt" = CASE WHEN %s = 'done' THEN now() END, "Owner" = NULL, "ExpiresAt" = NULL,
+                   "FailedIds" = %s::bigint[]
+               WHERE "Job" = %s AND "RangeStart" = %s AND "Owner" = %s''',
+            (status, status, failed_ids, self.job, lease.range_start, self.node_id)
+        )
+        with self._lock:
+            self._held.discard(lease.range_start)
+
+    def start_heartbeat(self):
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                rows = self._execute(
+                    '''UPDATE "IngestionLeases" SET "ExpiresAt" = now() + %s * interval '1 second'
+                       WHERE "Job" = %s AND "Owner" = %s AND "Status" = 'leased' AND "RangeStart" = ANY(%s)
+                       RETURNING "RangeStart"''',
+                    (self.lease_seconds, self.job, self.node_id, held), fetch=True
+                )
+            except psycopg2.Error:
+                # Missed heartbeats are tolerated until the lease actually expires
+                continue
+            renewed = {row[0] for row in rows}
+            with self._lock:
+                # Ranges another node reclaimed after we missed heartbeats are no longer ours
+                lost = self._held.intersection(held) - renewed
+                self._held -= lost
+                self.lost_leases += len(lost)
+
+    def close(self):
+        """Stops the heartbeat and hands back every range still held."""
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join()
+        with self._lock:
+            held = list(self._held)
+        if held and not self._conn.closed:
+            self._execute(
+                '''UPDATE "IngestionLeases" SET "Status" = 'pending', "Owner" = NULL, "ExpiresAt" = NULL
+                   WHERE "Job" = %s AND "Owner" = %s AND "RangeStart" = ANY(%s)''',
+                (self.job, self.node_id, held)
+            )
+        self._conn.close()
+
+
+class LeaseBook:
+    """
+    Tracks which claimed range every pending movie belongs to, so a range can be completed once all
+    of its movies are settled (committed or given up). Ranges with transient failures (network errors,
+    a lost connection) are handed back so they are retried. Permanent failures (TMDB has no such movie,
+    the database rejects its rows) would fail again, so they do not hold a range back: it is completed
+    and the movies are recorded in its "FailedIds".
+    Thread-safe: the DB writers and the fetch dispatcher settle movies concurrently.
+    """
+
+    def __init__(self, manager: LeaseManager):
+        self.manager = manager
+        self.completed = 0
+        self.released = 0
+        # Movies recorded as permanently failed in completed ranges
+        self.rejected = 0
+        self._lease_of: Dict[int, Lease] = {}
+        self._outstanding: Dict[Lease, int] = {}
+        self._failed: Set[Lease] = set()
+        self._rejected: Dict[Lease, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, lease: Lease, tmdb_ids: Iterable[int]):
+        with self._lock:
+            count = 0
+            for tmdb_id in tmdb_ids:
+                self._lease_of[tmdb_id] = lease
+                count += 1
+            self._outstanding[lease] = count
+        if not count:
+            self._finish(lease)
+
+    def needs_replace(self, tmdb_id: int) -> bool:
+        """True if the movie's existing related rows must be replaced (its range was reclaimed)."""
+        with self._lock:
+            lease = self._lease_of.get(tmdb_id)
+        return lease is not None and lease.reclaimed
+
+    def settle(self, tmdb_ids: List[int], committed: bool, permanent: bool = False):
+        """Settles movies as committed, or as failed transiently or (with permanent) for good."""
+        finished = []
+        with self._lock:
+            for tmdb_id in tmdb_ids:
+                lease = self._lease_of.pop(tmdb_id, None)
+                if lease is None:
+                    continue
+                if not committed and permanent:
+                    self._rejected.setdefault(lease, []).append(tmdb_id)
+                elif not committed:
+                    self._failed.add(lease)
+                self._outstanding[lease] -= 1
+                if not self._outstanding[lease]:
+                    del self._outstanding[lease]
+                    finished.append(lease)
+        for lease in finished:
+            self._finish(lease)
+
+    def _finish(self, lease: Lease):
+        with self._lock:
+            failed = lease in self._failed
+            self._failed.discard(lease)
+            rejected = self._rejected.pop(lease, [])
+        if failed:
+            self.manager.release(lease)
+            self.released += 1
+        else:
+            self.manager.complete(lease, rejected)
+            self.completed += 1
+            self.rejected += len(rejected)
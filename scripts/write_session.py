@@ -0,0 +1,250 @@
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import psycopg2
+
+from batch_bisect import write_with_bisect
+
+
+class UnnestInsert:
+    """
+    INSERT of a batch sent as one array per column and unnested server side. The statement is
+    prepared once per connection, so a batch of any size is a single short EXECUTE whose plan is
+    reused, instead of a VALUES list with a placeholder per field that is re-parsed every time.
+    """
+
+    def __init__(self, table: str, columns: Tuple[Tuple[str, str], ...], suffix: str = 'ON CONFLICT DO NOTHING'):
+        self.table = table
+        self.columns = columns  # (column, PostgreSQL element type)
+        self.suffix = suffix
+        self.name = f"insert_{table.lower()}"
+
+    def prepare_sql(self) -> str:
+        types = ', '.join(f'{pg_type}[]' for _, pg_type in self.columns)
+        column_list = ', '.join(f'"{column}"' for column, _ in self.columns)
+        params = ', '.join(f'${n}' for n in range(1, len(self.columns) + 1))
+        return f'PREPARE {self.name} ({types}) AS INSERT INTO "{self.table}" ({column_list}) SELECT * FROM unnest({params}) {self.suffix}'
+
+    def execute_sql(self, cursor, rows: Sequence[tuple]) -> bytes:
+        """The EXECUTE statement inserting rows (tuples in column order), for sending along with others."""
+        placeholders = ', '.join(f'%s::{pg_type}[]' for _, pg_type in self.columns)
+        return cursor.mogrify(f'EXECUTE {self.name} ({placeholders})', [list(column) for column in zip(*rows)])
+
+
+class WriteSession:
+    """
+    A DB writer's connection, held for the whole run with its UnnestInserts prepared, and the
+    transaction it keeps open across flushes: commit_every flushes are written before one COMMIT.
+
+    With synchronous_commit=False the session runs with synchronous_commit off, so a COMMIT does not
+    wait for the WAL flush; every durable_interval seconds a commit is made synchronous, which also
+    makes every earlier one durable. Items count as committed (on_commit runs and they are returned)
+    only once such a durable commit succeeded, so a server crash can never lose checkpointed work.
+
+    A failed write rolls back the open transaction and rewrites each pending flush on its own with
+    write_with_bisect, so only the bad items are lost. If the connection drops, every uncommitted or
+    unconfirmed item is reported as failed, last_error is set and the next write reconnects.
+    """
+
+    def __init__(self, pool, inserts: Sequence[UnnestInsert] = (), commit_every: int = 1,
+                 synchronous_commit: bool = True, max_pending_age: float = 5.0, durable_interval: float = 2.0):
+        self.pool = pool
+        self.inserts = tuple(inserts)
+        self.commit_every = max(1, commit_every)
+        self.synchronous_commit = synchronous_commit
+        self.max_pending_age = max_pending_age
+        self.durable_interval = durable_interval
+        self.commit_count = 0
+        self.conn = None
+        self.cursor = None
+        # (items, write_fn result, write_fn, on_failure, on_commit) of flushes in the open transaction
+        self._pending = []
+        self._pending_since = None
+        # (items, write_fn result, on_commit) of relaxed commits not yet known to be durable
+        self._unconfirmed = []
+        self._last_durable = time.monotonic()
+        self._last_used = 0.0
+        # Error that dropped the connection, for the caller to log with the items it lost
+        self.last_error: Optional[Exception] = None
+
+    def _connect(self):
+        self.conn = self.pool.acquire()
+        try:
+            self.cursor = self.conn.cursor()
+            statements = ['DEALLOCATE ALL'] + [insert.prepare_sql() for insert in self.inserts]
+            if not self.synchronous_commit:
+                statements.append('SET synchronous_commit TO off')
+            self.cursor.execute('; '.join(statements))
+            self.conn.commit()
+        except Exception:
+            self.pool.release(self.conn)
+            self.conn = self.cursor = None
+            raise
+        self._last_used = time.monotonic()
+
+    def _disconnect(self):
+        if self.conn is None:
+            return
+        if not self.conn.closed:
+            try:
+                # The connection goes back to the pool as its other users expect it
+                self.cursor.execute('DEALLOCATE ALL; RESET synchronous_commit')
+                self.conn.commit()
+            except psycopg2.Error:
+                pass
+            self.cursor.close()
+        self.pool.release(self.conn)
+        self.conn = self.cursor = None
+
+    def _ensure_connected(self):
+        if self.conn is not None and not self.conn.closed and not self._pending and not self._unconfirmed \
+                and time.monotonic() - self._last_used > self.pool.health_check_interval:
+            # Idle long enough for the server or a proxy to have dropped it
+            try:
+                self.cursor.execute('SELECT 1')
+                self.conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                pass
+        if self.conn is not None and self.conn.closed:
+            self._disconnect()
+        if self.conn is None:
+            self._connect()
+
+    def due_at(self) -> Optional[float]:
+        """time.monotonic() by which commit() should run even if no further flush arrives, if any."""
+        deadlines = []
+        if self._pending:
+            deadlines.append(self._pending_since + self.max_pending_age)
+        if self._unconfirmed:
+            deadlines.append(self._last_durable + self.durable_interval)
+        return min(deadlines) if deadlines else None
+
+    def write(self, items: Sequence, write_fn: Callable[[object, Sequence], object],
+              on_failure: Callable[[object, Exception], None],
+              on_commit: Optional[Callable[[Sequence, object], None]] = None) -> Tuple[List, List]:
+        """
+        Writes items in the open transaction with write_fn(cursor, items), committing once commit_every
+        flushes are pending. on_commit(items, result) runs once they are durably committed and
+        on_failure(item, error) for each item that fails on its own.
+        Returns (items committed by this call, of this flush or earlier ones; items that failed).
+        """
+        if not items:
+            return [], []
+        flush = (items, None, write_fn, on_failure, on_commit)
+        try:
+            self._ensure_connected()
+            result = write_fn(self.cursor, items)
+        except Exception as e:
+            if self.conn is None or self.conn.closed:
+                return self._lose_all(e, self._pending + [flush])
+            self.conn.rollback()
+            return self._rewrite_pending(flush)
+
+        self._last_used = time.monotonic()
+        if not self._pending:
+            self._pending_since = self._last_used
+        self._pending.append((items, result, write_fn, on_failure, on_commit))
+        if len(self._pending) >= self.commit_every:
+            return self.commit()
+        return [], []
+
+    def commit(self, durable: bool = False) -> Tuple[List, List]:
+        """
+        Commits the open transaction, and confirms relaxed commits when durable is set or
+        durable_interval has passed. Returns (newly committed items, failed items).
+        """
+        durable = durable or self.synchronous_commit or time.monotonic() - self._last_durable >= self.durable_interval
+        if not self._pending and not (durable and self._unconfirmed):
+            return [], []
+        try:
+            if durable and not self.synchronous_commit:
+                self._commit_durably()
+            else:
+                self.conn.commit()
+        except Exception as e:
+            if self.conn.closed:
+                return self._lose_all(e, self._pending)
+            self.conn.rollback()
+            return self._rewrite_pending()
+
+        self.commit_count += 1
+        self._last_used = time.monotonic()
+        self._unconfirmed.extend((items, result, on_commit) for items, result, _, _, on_commit in self._pending)
+        self._pending = []
+        if not durable:
+            return [], []
+        return self._confirm(), []
+
+    def _commit_durably(self):
+        # txid_current() gives the transaction an xid even if nothing is pending, so its COMMIT
+        # writes a record and waits until the WAL up to it, earlier relaxed commits included, is flushed
+        self.cursor.execute('SET LOCAL synchronous_commit TO on; SELECT txid_current()')
+        self.conn.commit()
+
+    def _confirm(self) -> List:
+        self._last_durable = time.monotonic()
+        committed = []
+        for items, result, on_commit in self._unconfirmed:
+            if on_commit:
+                on_commit(items, result)
+            committed.extend(items)
+        self._unconfirmed = []
+        return committed
+
+    def _rewrite_pending(self, *extra) -> Tuple[List, List]:
+        """Rewrites every pending flush in its own transactions, bisecting to isolate the bad items."""
+        flushes, self._pending = self._pending + list(extra), []
+        failed = []
+        for n, (items, _, write_fn, on_failure, on_commit) in enumerate(flushes):
+            written = []
+
+            def committed_part(batch, result, on_commit=on_commit):
+                self._unconfirmed.append((batch, result, on_commit))
+                written.extend(batch)
+
+            try:
+                write_with_bisect(self.conn, items, lambda batch: write_fn(self.cursor, batch), on_failure,
+                                  on_commit=committed_part)
+            except Exception as e:
+                if not self.conn.closed:
+                    raise
+                # Committed parts of this flush are in _unconfirmed and reported lost with them
+                written_ids = {id(item) for item in written}
+                failed.extend(item for item in items if id(item) not in written_ids)
+                committed, lost = self._lose_all(e, flushes[n + 1:])
+                return committed, failed + lost
+            written_ids = {id(item) for item in written}
+            failed.extend(item for item in items if id(item) not in written_ids)
+
+        self._last_used = time.monotonic()
+        if self._unconfirmed and not self.synchronous_commit:
+            try:
+                self._commit_durably()
+            except Exception as e:
+                if not self.conn.closed:
+                    raise
+                committed, lost = self._lose_all(e, [])
+                return committed, failed + lost
+        return self._confirm(), failed
+
+    def _lose_all(self, error: Exception, flushes: list) -> Tuple[List, List]:
+        """The connection dropped: nothing uncommitted, or committed but unconfirmed, can be trusted."""
+        if self.synchronous_commit:
+            # Parts of a rewrite committed before the drop; their COMMITs were synchronous
+            committed, lost = self._confirm(), []
+        else:
+            committed, lost = [], [item for items, _, _ in self._unconfirmed for item in items]
+        lost.extend(item for flush in flushes for item in flush[0])
+        self._pending, self._unconfirmed = [], []
+        self.last_error = error
+        self._disconnect()
+        return committed, lost
+
+    def close(self) -> Tuple[List, List]:
+        """Durably commits what is left and gives the connection back to the pool."""
+        try:
+            if self.conn is not None and not self.conn.closed:
+                return self.commit(durable=True)
+            return self._lose_all(psycopg2.InterfaceError("connection already closed"), self._pending) if self._pending else ([], [])
+        finally:
+            self._disconnect()